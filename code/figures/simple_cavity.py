@@ -9,21 +9,21 @@ import matplotlib.pyplot as plt
 import style.my_style as style
 import sw
 
-def setup(f):
-    # f: frequency.
+def setup(fs):
+    # fs: evenly spaced frequencies.
     # Networks.
     n_inside = 1  # Refractive index.
     n_outside = 1.5
     L = .5  # Length of the cavity.
     m0 = sw.networks.InterfaceNormal(n_outside, n_inside)
-    space = sw.networks.Distance(n_inside, L, f)
+    space = sw.networks.Distance(n_inside, L, fs, uniform=True)
     m1 = sw.networks.InterfaceNormal(n_inside, n_outside)
     # Ports.
     #    0 [m0] 1  -  2 [space] 3  -  4 [m1] 5
     couplings = sw.ExpandCouplingsTo3d(({1, 2}, {3, 4}))
     nb_ports = 6 * 3  # *3 because 3D.
     networks = (m0, space, m1)
-    presolve = sw.Solver(nb_ports, couplings)
+    presolve = sw.solver.BatchSolver(nb_ports, couplings)
     solve = presolve(networks)
     # Inputs.
     a = np.zeros(nb_ports, dtype=complex)
@@ -31,9 +31,9 @@ def setup(f):
     a[0:3] = np.array([1, 0, 0])  # x-polarized.
 #     c[3:6] = np.array([1, 0, 0])  # x-polarized.
     b = solve(a, c)
-    b0 = b[0 * 3:0 * 3 + 3]
-    b5 = b[5 * 3:5 * 3 + 3]
-    return b0[0], b5[0]
+    b0 = b[:, 0 * 3:0 * 3 + 3]
+    b5 = b[:, 5 * 3:5 * 3 + 3]
+    return b0[:, 0], b5[:, 0]
 
 def plot():
     nb_points = 4001
@@ -42,10 +42,7 @@ def plot():
     f_stop = f_start + f_range
     fs = np.linspace(f_start, f_stop, nb_points)
     observable = fs <= 504e9
-    b0s = np.zeros(nb_points, dtype=complex)
-    b5s = np.zeros(nb_points, dtype=complex)
-    for i, f in enumerate(fs):
-        b0s[i], b5s[i] = setup(f)
+    b0s, b5s = setup(fs)
     y0s = np.abs(b0s) ** 2
     y5s = np.abs(b5s) ** 2
     # Direct.
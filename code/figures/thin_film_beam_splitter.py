@@ -28,10 +28,24 @@ Z0 = scipy.constants.value('characteristic impedance of vacuum')
 #                               10
 lo_freq = 500e9
 
+def MakeBench():
+    bench = sw.bench.Bench()
+    bench.add("source", 1)
+    bench.add("space1", 2)
+    bench.add("film", 4)
+    bench.add("space2", 2)
+    bench.add("receiver", 2)
+    bench.connect("source.0", "space1.0")
+    bench.connect("space1.1", "film.0")
+    bench.connect("film.1", "space2.0")
+    bench.connect("space2.1", "receiver.0")
+    return bench.compile()
+
+BENCH = MakeBench()
+
 def compute():
-    couplings = sw.ExpandCouplingsTo3d(({0, 1}, {2, 3}, {4, 7}, {8, 9}))
-    n_ports = 11 * 3
-    presolve = sw.Solver(n_ports, couplings)
+    couplings = BENCH.couplings
+    n_ports = BENCH.n
 
     # Frequency independent networks.
     # -------------------------------
@@ -47,7 +61,9 @@ def compute():
     receiver_t = np.sqrt(.9)
     receiver = sw.networks.SemiTransparentMirrorNormal(receiver_r, receiver_t)
 
-    networks = [source, None, None, None, receiver]
+    networks = sw.bench.Networks(BENCH, {"source": source, "receiver": receiver})
+    # The source and the receiver are eliminated once for the whole sweep.
+    presolve = sw.solver.StaticSolver(n_ports, couplings, networks)
 
     n1 = 1.00
     n2 = 1.83 + 0.018j  # Turn off imaginary part when making thick films.
@@ -61,11 +77,9 @@ def compute():
     lo_field = (2 * Z0 * lo_power) ** .5
     sky_field = (2 * Z0 * sky_power) ** .5
     a_lo = np.zeros(n_ports, dtype=complex)
-    a_sky = np.zeros(n_ports, dtype=complex)
-    c_lo = np.zeros(n_ports, dtype=complex)
     c_sky = np.zeros(n_ports, dtype=complex)
-    c_lo[0:0 + 3] = np.array([1, 1, 0]) * lo_field
-    a_sky[6 * 3:6 * 3 + 3] = np.array([1, 0, 1]) * sky_field
+    c_lo = sw.bench.Vector(BENCH, {"source.0": np.array([1, 1, 0]) * lo_field})
+    a_sky = sw.bench.Vector(BENCH, {"film.3": np.array([1, 0, 1]) * sky_field})
 
     # Frequency loop.
     n_frequencies = 1001
@@ -74,15 +88,15 @@ def compute():
     frequencies_lsb = np.linspace(lo_freq - if_max, lo_freq - if_min, n_frequencies)[::-1]
     frequencies_usb = np.linspace(lo_freq + if_min, lo_freq + if_max, n_frequencies)
     frequencies = np.concatenate((frequencies_lsb, frequencies_usb))
-    b_lo = np.zeros((len(frequencies), n_ports), dtype=complex)
-    b_sky = np.zeros((len(frequencies), n_ports), dtype=complex)
-    for i, frequency in enumerate(frequencies):
-        networks[1] = sw.networks.Distance(n1, .7, frequency)
-        networks[2], _, _, _ = sw.networks.ThinFilmOblique(n1, n2, l2, frequency, tb, att, k1)
-        networks[3] = sw.networks.Distance(n1, .3, frequency)
-        solve = presolve(networks)
-        b_lo[i, :] = solve(a_lo, c_lo)
-        b_sky[i, :] = solve(a_sky, c_sky)
+    # All the frequencies at once.
+    space1 = sw.networks.Distance(n1, .7, frequencies)
+    film, _, _, _ = sw.networks.ThinFilmOblique(n1, n2, l2, frequencies, tb, att, k1)
+    space2 = sw.networks.Distance(n1, .3, frequencies)
+    solve = presolve([space1, film, space2])
+    # Both excitations share the factorization of each frequency.
+    b = solve(np.column_stack((a_lo, a_sky)), np.column_stack((c_lo, c_sky)), columns=True)
+    b_lo = b[..., 0]
+    b_sky = b[..., 1]
     return frequencies, b_lo, b_sky
 
 def plot(width, frequencies, b_lo, b_sky):
@@ -94,10 +108,11 @@ def plot(width, frequencies, b_lo, b_sky):
     def power(field):
         return np.abs(field) ** 2 / Z0 / 2
 
-    lo_h_f = b_lo[:, 10 * 3 + 0]
-    lo_v_f = b_lo[:, 10 * 3 + 2]
-    sky_h_f = b_sky[:, 10 * 3 + 0]
-    sky_v_f = b_sky[:, 10 * 3 + 2]
+    receiver = BENCH.slices["receiver.1"]
+    lo_h_f = b_lo[:, receiver][:, 0]
+    lo_v_f = b_lo[:, receiver][:, 2]
+    sky_h_f = b_sky[:, receiver][:, 0]
+    sky_v_f = b_sky[:, receiver][:, 2]
 
     lo_h = power(lo_h_f)
     lo_v = power(lo_v_f)
@@ -1,3 +1,7 @@
+import bench
+import cache
 import geometry
 import networks
 import solver
+import sweep
+import transverse
@@ -0,0 +1,157 @@
+"""
+.. module:: sw.bench
+   :platform: Unix, Windows
+   :synopsis: Benches described by named networks and named ports.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+Instead of numbering the ports by hand, add the networks by name and connect
+their ports as "name.port":
+
+    bench = Bench()
+    bench.add("source", 1)
+    bench.add("space", 2)
+    bench.add("film", 4)
+    bench.connect("source.0", "space.0")
+    bench.connect("space.1", "film.0")
+    plan = bench.compile()
+    solve = solver.Solver(plan.n, plan.couplings)(Networks(plan, networks))
+    b = solve(a, c)
+    b[plan.slices["film.2"]]
+
+Each port has `dimensions` components, 3 by default.  The ports of the
+networks follow each other in the order the networks were added, which is
+also the order the solver expects the networks in.
+
+"""
+import collections
+import numpy as np
+import solver
+
+BenchPlan = collections.namedtuple("BenchPlan", "n couplings plan names slices")
+
+def SplitPortName(port):
+    """"film.2" -> ("film", 2)."""
+    name, sep, index = port.rpartition(".")
+    if not sep or not index.isdigit():
+        raise ValueError("Port %r is not of the form \"name.index\"." % port)
+    return name, int(index)
+
+class Bench(object):
+    """Networks and connections, by name, compiled once into a solver plan.
+
+    The compiled plan is kept until the bench changes, so a bench can serve a
+    whole sweep, or several.
+
+    """
+    def __init__(self):
+        object.__init__(self)
+        self.names = []
+        self.index = {}  # Name -> position in names.
+        self.ports = []
+        self.dimensions = []
+        self.links = []
+        self.compiled = None
+    def add(self, name, ports, dimensions=3):
+        """Add a network of `ports` ports of `dimensions` components each."""
+        if name in self.index:
+            raise ValueError("There already is a network named %r." % name)
+        if "." in name:
+            raise ValueError("Network names cannot contain dots: %r." % name)
+        self.index[name] = len(self.names)
+        self.names.append(name)
+        self.ports.append(ports)
+        self.dimensions.append(dimensions)
+        self.compiled = None
+        return self
+    def connect(self, portA, portB):
+        """Couple two ports, each given as "name.index"."""
+        self.links.append((SplitPortName(portA), SplitPortName(portB)))
+        self.compiled = None
+        return self
+    def compile(self):
+        if self.compiled is None:
+            self.compiled = self.compileNow()
+        return self.compiled
+    def compileNow(self):
+        ports = np.array(self.ports, dtype=int)
+        dimensions = np.array(self.dimensions, dtype=int)
+        sizes = ports * dimensions
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        n = int(offsets[-1])
+        try:
+            networks = np.array([[self.index[name] for name, _ in link]
+                                 for link in self.links], dtype=int).reshape(-1, 2)
+        except KeyError as e:
+            raise ValueError("Unknown network %r." % e.args[0])
+        indices = np.array([[index for _, index in link]
+                            for link in self.links], dtype=int).reshape(-1, 2)
+        # Validation, for all the links at once.
+        missing = indices >= ports[networks]
+        if missing.any():
+            link, side = np.argwhere(missing)[0]
+            name, index = self.links[link][side]
+            raise ValueError("Network %r has no port %i." % (name, index))
+        mismatch = dimensions[networks[:, 0]] != dimensions[networks[:, 1]]
+        if mismatch.any():
+            (a, _), (b, _) = self.links[np.flatnonzero(mismatch)[0]]
+            raise ValueError("Cannot connect %r and %r, their ports differ in size." % (a, b))
+        # Flat indices of each component of each port, and the couplings.
+        starts = offsets[networks] + indices * dimensions[networks]
+        component = np.arange(dimensions.max() if len(dimensions) else 0)
+        valid = component < dimensions[networks[:, 0]][:, np.newaxis]
+        A = (starts[:, 0, np.newaxis] + component)[valid]
+        B = (starts[:, 1, np.newaxis] + component)[valid]
+        ports_of = np.concatenate((starts[:, 0], starts[:, 1]))
+        counts = np.bincount(ports_of, minlength=n)
+        if (counts > 1).any():
+            start = np.flatnonzero(counts > 1)[0]
+            network = np.searchsorted(offsets, start, side="right") - 1
+            index = (start - offsets[network]) // dimensions[network]
+            raise ValueError("Port %s.%i is connected more than once." % (self.names[network], index))
+        plan = solver.CompilePairs(n, A, B)
+        couplings = [{a, b} for a, b in zip(A.tolist(), B.tolist())]
+        slices = {}
+        for name, offset, size, d in zip(self.names, offsets.tolist(), sizes.tolist(), dimensions.tolist()):
+            slices[name] = slice(offset, offset + size)
+            for index, start in enumerate(xrange(offset, offset + size, d)):
+                slices["%s.%i" % (name, index)] = slice(start, start + d)
+        return BenchPlan(n=n, couplings=couplings, plan=plan,
+                         names=list(self.names), slices=slices)
+
+def Vector(benchplan, values, dtype=complex):
+    """Vector of the bench, zero except for the named ports or networks.
+
+    values: {"source.0": [1, 1, 0], ...}.  Also works with a stack of vectors
+    by giving arrays with a leading axis, for instance over frequency.
+
+    """
+    values = dict((key, np.asarray(value)) for key, value in values.iteritems())
+    shape = ()
+    for value in values.itervalues():
+        shape = np.broadcast(np.empty(shape), np.empty(value.shape[:-1])).shape
+    v = np.zeros(shape + (benchplan.n,), dtype=dtype)
+    for key, value in values.iteritems():
+        v[..., benchplan.slices[key]] = value
+    return v
+
+def Networks(benchplan, networks):
+    """List of the networks in the order of the bench.
+
+    networks: {name: network}.  Names missing from it give None, as expected
+    by sw.solver.StaticSolver.
+
+    """
+    unknown = set(networks).difference(benchplan.names)
+    if unknown:
+        raise ValueError("Unknown networks: %r." % sorted(unknown))
+    return [networks.get(name) for name in benchplan.names]
+
+def Ports(benchplan, names):
+    """Indices of the components of the named ports or networks, in order.
+
+    For instance the inputs and outputs of sw.solver.TransferSolver.
+
+    """
+    indices = np.arange(benchplan.n)
+    return np.concatenate([indices[benchplan.slices[name]] for name in names] + [np.zeros(0, dtype=int)])
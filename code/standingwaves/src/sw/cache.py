@@ -0,0 +1,109 @@
+"""
+.. module:: sw.cache
+   :platform: Unix, Windows
+   :synopsis: Bounded least-recently-used caches with statistics.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+"""
+import collections
+import threading
+import numpy as np
+
+CacheInfo = collections.namedtuple("CacheInfo",
+                                   "hits misses evictions size maxsize")
+
+_MISSING = object()  # Tells a miss from a cached None.
+
+class LRUCache(object):
+    """Dictionary that forgets its least recently used entries.
+
+    It keeps at most `maxsize` entries and counts hits, misses and evictions.
+    All the operations hold a lock, so the cache can be shared by threads.
+
+    """
+    def __init__(self, maxsize):
+        object.__init__(self)
+        if maxsize < 1:
+            raise ValueError("The size of the cache must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+    def __len__(self):
+        return len(self._entries)
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries[key] = value  # Now the most recently used.
+            self.hits += 1
+            return value
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    def clear(self):
+        """Forget all the entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    def info(self):
+        with self._lock:
+            return CacheInfo(hits=self.hits, misses=self.misses,
+                             evictions=self.evictions,
+                             size=len(self._entries), maxsize=self.maxsize)
+
+def Key(*values):
+    """Hashable key made of numbers, strings, tuples and numpy arrays.
+
+    Arrays are replaced by their dtype, shape and bytes, so equal arrays give
+    equal keys.
+
+    """
+    key = []
+    for value in values:
+        if isinstance(value, np.ndarray):
+            key.append((value.dtype.str, value.shape, value.tobytes()))
+        elif isinstance(value, (tuple, list)):
+            key.append(Key(*value))
+        else:
+            key.append(value)
+    return tuple(key)
+
+def Freeze(value):
+    """Make the arrays of value, or of the tuple value, read-only; return value.
+
+    Cached values are shared by all the callers: none of them may modify them.
+
+    """
+    for item in (value if isinstance(value, tuple) else (value,)):
+        if isinstance(item, np.ndarray):
+            item.flags.writeable = False
+    return value
+
+def Cached(lru, key, compute):
+    """Value of `key` in the cache `lru`, from compute() and frozen on a miss.
+
+    With a None cache, just return compute().  Two threads missing the same key
+    at the same time both compute it, and the last one is kept: the values are
+    equal, so it does not matter.
+
+    """
+    if lru is None:
+        return compute()
+    value = lru.get(key, _MISSING)
+    if value is _MISSING:
+        value = Freeze(compute())
+        lru.put(key, value)
+    return value
@@ -1,29 +1,54 @@
 from __future__ import division
 import warnings
 import numpy as np
+import cache
 
 TAU = 2 * np.pi
 
+# Opt-in cache of TaitBryan.rot, see EnableRotationCache.
+rotation_cache = None
+
+def EnableRotationCache(maxsize=1024):
+    """Memoize TaitBryan.rot on the convention and the attitude.
+
+    Sweeps ask for the same attitudes again and again, for every frequency and
+    every network.  The cached matrices are read-only.  Return the cache, for
+    its statistics.
+
+    """
+    global rotation_cache
+    rotation_cache = cache.LRUCache(maxsize)
+    return rotation_cache
+
+def DisableRotationCache():
+    global rotation_cache
+    rotation_cache = None
+
+def AxisRotations(axis, angles):
+    """Rotation matrices (..., 3, 3) for (...) angles around x, y or z (0, 1, 2)."""
+    c = np.cos(angles)
+    s = np.sin(angles)
+    M = np.zeros(np.shape(c) + (3, 3), dtype=np.result_type(c, float))
+    i, j = [(1, 2), (2, 0), (0, 1)][axis]
+    M[..., axis, axis] = 1
+    M[..., i, i] = c
+    M[..., i, j] = -s
+    M[..., j, i] = s
+    M[..., j, j] = c
+    return M
+
+def MatMulBatch(A, B):
+    """Matrix products of two stacks (..., 3, 3), broadcast against each other."""
+    return np.einsum('...ij,...jk->...ik', A, B)
+
 def rotX(angle):
-    c = np.cos(angle)
-    s = np.sin(angle)
-    return np.array([[1, 0, 0],
-                     [0, c, -s],
-                     [0, s, c]])
+    return AxisRotations(0, angle)
 
 def rotY(angle):
-    c = np.cos(angle)
-    s = np.sin(angle)
-    return np.array([[c, 0, s],
-                     [0, 1, 0],
-                     [-s, 0, c]])
+    return AxisRotations(1, angle)
 
 def rotZ(angle):
-    c = np.cos(angle)
-    s = np.sin(angle)
-    return np.array([[c, -s, 0],
-                     [s, c, 0],
-                     [0, 0, 1]])
+    return AxisRotations(2, angle)
 
 class TaitBryan(object):
     def __init__(self, H, P, R):
@@ -52,7 +77,20 @@ class TaitBryan(object):
         transpose it. Indeed, the inverse of a rotation matrix is its transpose.
 
         """
-        return self.rotH(h).dot(self.rotP(p)).dot(self.rotR(r))
+        if rotation_cache is None:
+            return self.rotBatch(h, p, r)
+        key = cache.Key(self.H, self.P, self.R, h, p, r)
+        return cache.Cached(rotation_cache, key, lambda: self.rotBatch(h, p, r))
+    def rotBatch(self, h, p, r):
+        """Stack of rotation matrices (..., 3, 3) for (...) headings, pitches and rolls.
+
+        The three angles are broadcast against each other.
+
+        """
+        Mh = AxisRotations(self.H, h)
+        Mp = AxisRotations(self.P, p)
+        Mr = AxisRotations(self.R, r)
+        return MatMulBatch(MatMulBatch(Mh, Mp), Mr)
     def hp(self, v):
         norm = np.linalg.norm(v)
         if norm == 0:
@@ -72,52 +110,56 @@ class TaitBryan(object):
         universe = self.rotH(h).dot(self.rotP(p))
         return universe.dot(self.rotR(r)).dot(universe.T)
 
-def Snell(ni, nt, anglei):
-    # Also works for negative angles.
-    # ni si = nt st
-    # st = si ni / nt
-    # t = arcsin(si ni / nt)
-    if TAU / 4 < anglei % TAU < 3 * TAU / 4:
-        warnings.warn(u"Snell: Angle-of-incidence greater than pi/2.")
-        return np.nan
-    # The following arcsin may return nan if its argument is out of -1..1. It
-    # will also raise a warning.  This is why I do the same with the check
-    # regarding the limits of anglei.  I can understand why they return nan
-    # rather than crash: they're trying to have total functions.  I may consider
-    # trigger a crash if a flag is raised to help with debugging, but by default
-    # I stick to numpy's behavior.
-    sin = np.sin(anglei) * ni.real / nt.real
-    if sin < -1 or sin > 1:
-        crit = np.arcsin(nt / ni)
-        msg = u"Snell: angle=%f\u00B0 > critical=%f\u00B0" % (np.degrees(anglei), np.degrees(crit))
-        warnings.warn(msg)
-        print msg
-    return np.arcsin(sin)
+def IncidenceOutOfRange(anglei):
+    """Mask of the angles of incidence beyond pi/2, either way."""
+    anglei = np.real(anglei) % TAU
+    return (TAU / 4 < anglei) & (anglei < 3 * TAU / 4)
 
-def FresnelOblique(ni, nt, anglei):
-    """
-    Returns:
-        rp, tp, rs, ts
-        rp: parallel reflection
-        tp: parallel transmission
-        rs: perpendicular reflection
-        ts: perpendicular transmission
+def TotalInternalReflection(ni, nt, anglei):
+    """Mask of the angles of incidence beyond the critical angle."""
+    return np.abs(np.sin(np.real(anglei)) * np.real(ni) / np.real(nt)) > 1
 
-    The terms "parallel" and "perpendicular" are relative to the plane of
-    incidence, defined as the plane that contains the normal to the surface of
-    the thin film and the direction of propagation.  For this plane to exist,
-    the direction of propagation must not be collinear to the normal to the
-    surface, or in other words, the light should not arrive at normal incidence.
+def SnellBatch(ni, nt, anglei):
+    """Angles of transmission for arrays of indices and angles of incidence.
 
-    Reference: Echt 2002, chapter 4.
+    Also works for negative angles.  Beyond the critical angle, the angle of
+    transmission is complex: its sine still follows Snell's law, and its cosine
+    is on the positive imaginary axis so that the transmitted wave decays
+    away from the surface, given the exp(1j * k * length) of
+    ComputeSpaceGain.  The result is only complex when it has to be.
+
+    Angles of incidence on the wrong side of the surface give nan, with a
+    single warning for the whole batch.  IncidenceOutOfRange and
+    TotalInternalReflection return the masks.
 
     """
-    anglet = Snell(ni, nt, anglei)
-    if np.isnan(anglet):
-        # Frankly, getting it to work may just be a matter of working with
-        # complex values instead of complaining with nans.  But that's not
-        # needed for now.
-        warnings.warn("Fresnel: Total internal reflection.")
+    anglei = np.asarray(anglei)
+    # ni si = nt st
+    sin = np.sin(anglei) * np.real(ni) / np.real(nt)
+    if np.iscomplexobj(sin):
+        # Already an evanescent wave, coming back through an interface.
+        anglet = np.arcsin(sin)
+    else:
+        tir = np.abs(sin) > 1
+        anglet = np.arcsin(np.clip(sin, -1, 1))
+        if tir.any():
+            # sin(pi/2 - iy) = cosh(y), cos(pi/2 - iy) = i sinh(y).
+            evanescent = np.sign(sin) * (TAU / 4 - 1j * np.arccosh(np.maximum(np.abs(sin), 1)))
+            anglet = np.where(tir, evanescent, anglet)
+    wrong = IncidenceOutOfRange(anglei)
+    if wrong.any():
+        warnings.warn(u"Snell: %i angle(s)-of-incidence greater than pi/2." % wrong.sum())
+        anglet = np.where(wrong, np.nan, anglet)
+    return anglet
+
+def FresnelObliqueBatch(ni, nt, anglei):
+    """FresnelOblique for arrays of indices and angles.
+
+    Beyond the critical angle, the reflections have a modulus of 1 and the
+    transmissions feed the evanescent wave.
+
+    """
+    anglet = SnellBatch(ni, nt, anglei)
     cosi = np.cos(anglei)
     cost = np.cos(anglet)
     den_p = ni * cost + nt * cosi
@@ -139,6 +181,32 @@ def FresnelOblique(ni, nt, anglei):
     ts = (2 * ni * cosi) / den_s
     return rp, tp, rs, ts
 
+def Snell(ni, nt, anglei):
+    """SnellBatch for one angle."""
+    return SnellBatch(ni, nt, anglei)[()]
+
+def FresnelOblique(ni, nt, anglei):
+    """
+    Returns:
+        rp, tp, rs, ts
+        rp: parallel reflection
+        tp: parallel transmission
+        rs: perpendicular reflection
+        ts: perpendicular transmission
+
+    The terms "parallel" and "perpendicular" are relative to the plane of
+    incidence, defined as the plane that contains the normal to the surface of
+    the thin film and the direction of propagation.  For this plane to exist,
+    the direction of propagation must not be collinear to the normal to the
+    surface, or in other words, the light should not arrive at normal incidence.
+
+    Total internal reflection is handled, see FresnelObliqueBatch.
+
+    Reference: Echt 2002, chapter 4.
+
+    """
+    return tuple(np.asarray(x)[()] for x in FresnelObliqueBatch(ni, nt, anglei))
+
 def FresnelNormal(ni, nt):
     """Fresnel equations for normal incidence.
 
@@ -219,6 +287,44 @@ def ComputeIncidencePlaneNormal(surface_normal, propagation_direction):
     incidence_normal /= norm
     return incidence_normal
 
+def ComputeAnglesBetween(v1, v2):
+    """ComputeAngleBetween for stacks of vectors (..., 3)."""
+    cos = np.einsum('...i,...i', v1, v2) / (np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1))
+    return np.arccos(cos)
+
+def ComputeIncidencePlaneNormals(surface_normals, propagation_directions):
+    """ComputeIncidencePlaneNormal for stacks of vectors (..., 3).
+
+    The errors are the same, raised if any of the pairs is at fault.
+
+    """
+    n, k = np.broadcast_arrays(np.asarray(surface_normals, dtype=float),
+                               np.asarray(propagation_directions, dtype=float))
+    if np.any(np.einsum('...i,...i', n, k) < 0):
+        raise ValueError("Incidence from the wrong side of the surface.")
+    incidence_normals = np.cross(n, k)
+    norm = np.linalg.norm(incidence_normals, axis=-1)
+    if np.any(norm == 0):
+        raise ZeroDivisionError("Normal incidence detected.")
+    return incidence_normals / norm[..., np.newaxis]
+
+def TransverseFrames(directions):
+    """Two unit vectors orthogonal to each direction, for stacks (..., 3).
+
+    Return (..., 3, 2): the columns u and v make a direct frame (u, v, k) with
+    the normalized direction k.  u is taken orthogonal to the axis the least
+    aligned with k, so that it never degenerates.  k and -k give the same v and
+    opposite u.
+
+    """
+    k = np.asarray(directions, dtype=float)
+    k = k / np.linalg.norm(k, axis=-1)[..., np.newaxis]
+    reference = np.eye(3)[np.argmin(np.abs(k), axis=-1)]
+    u = np.cross(reference, k)
+    u /= np.linalg.norm(u, axis=-1)[..., np.newaxis]
+    v = np.cross(k, u)
+    return np.stack((u, v), axis=-1)
+
 def MakeParaPerpDecompositionMatrices(plane_normal):
     """Useful for Fresnel equations for instance.
 
@@ -250,34 +356,45 @@ def MakeParaPerpDecompositionMatrices(plane_normal):
     P = np.identity(3) - S
     return P, S
 
-def RotationAroundAxisQuaternion(axis, angle):
+def RotationAroundAxisQuaternions(axes, angles):
+    """Quaternions (..., 4) for (..., 3) unit axes and (...) angles."""
     # Source: wikipedia.  Need better source.
     # I can probably go back to Hamilton's book, if I can find it.
-    x, y, z = axis
-    c = np.cos(.5 * angle)
-    s = np.sin(.5 * angle)
-    return np.array([c, x * s, y * s, z * s])
-
-def RotationMatrixFromQuaternion(quat):
+    axes = np.asarray(axes)
+    half = .5 * np.asarray(angles)
+    c = np.cos(half)
+    s = np.sin(half)
+    q = np.empty(np.broadcast(axes[..., 0], c).shape + (4,), dtype=np.result_type(axes, c))
+    q[..., 0] = c
+    q[..., 1:] = axes * s[..., np.newaxis]
+    return q
+
+def RotationMatricesFromQuaternions(quats):
+    """Rotation matrices (..., 3, 3) for (..., 4) unit quaternions."""
     # Source: wikipedia.  Need better source.
-    w, x, y, z = quat
+    quats = np.asarray(quats)
+    w, x, y, z = [quats[..., i] for i in xrange(4)]
     x2 = x * x
     y2 = y * y
     z2 = z * z
-    return np.array([[1 - 2 * y2 - 2 * z2,
-                      2 * x * y - 2 * z * w,
-                      2 * x * z + 2 * y * w],
-                     [2 * x * y + 2 * z * w,
-                      1 - 2 * x2 - 2 * z2,
-                      2 * y * z - 2 * x * w],
-                     [2 * x * z - 2 * y * w,
-                      2 * y * z + 2 * x * w,
-                      1 - 2 * x2 - 2 * y2]])
-
-def RotationAroundAxisMatrix(axis, angle):
-    return RotationMatrixFromQuaternion(RotationAroundAxisQuaternion(axis, angle))
-
-def QuatMult(p, q):
+    M = np.empty(quats.shape[:-1] + (3, 3), dtype=np.result_type(quats, float))
+    M[..., 0, 0] = 1 - 2 * y2 - 2 * z2
+    M[..., 0, 1] = 2 * x * y - 2 * z * w
+    M[..., 0, 2] = 2 * x * z + 2 * y * w
+    M[..., 1, 0] = 2 * x * y + 2 * z * w
+    M[..., 1, 1] = 1 - 2 * x2 - 2 * z2
+    M[..., 1, 2] = 2 * y * z - 2 * x * w
+    M[..., 2, 0] = 2 * x * z - 2 * y * w
+    M[..., 2, 1] = 2 * y * z + 2 * x * w
+    M[..., 2, 2] = 1 - 2 * x2 - 2 * y2
+    return M
+
+def RotationAroundAxisMatrices(axes, angles):
+    """RotationAroundAxisMatrix for (..., 3) axes and (...) angles: (..., 3, 3)."""
+    return RotationMatricesFromQuaternions(RotationAroundAxisQuaternions(axes, angles))
+
+def QuatMultBatch(p, q):
+    """Products of two stacks of quaternions (..., 4)."""
     # While waiting to find Hamilton's book:
     # @article{vicci2001quaternions,
     #  title={Quaternions and rotations in 3-space: The algebra and its geometric interpretation},
@@ -286,21 +403,48 @@ def QuatMult(p, q):
     #  year={2001},
     #  publisher={Citeseer}
     # }
-    p1, p2, p3, p4 = p
-    q1, q2, q3, q4 = q
-    return np.array([p1 * q1 - p2 * q2 - p3 * q3 - p4 * q4,
+    p = np.asarray(p)
+    q = np.asarray(q)
+    p1, p2, p3, p4 = [p[..., i] for i in xrange(4)]
+    q1, q2, q3, q4 = [q[..., i] for i in xrange(4)]
+    return np.stack([p1 * q1 - p2 * q2 - p3 * q3 - p4 * q4,
                      p1 * q2 + p2 * q1 + p3 * q4 - p4 * q3,
                      p1 * q3 + p3 * q1 + p4 * q2 - p2 * q4,
-                     p1 * q4 + p4 * q1 + p2 * q3 - p3 * q2])
+                     p1 * q4 + p4 * q1 + p2 * q3 - p3 * q2], axis=-1)
+
+def QuatConjBatch(q):
+    q = np.asarray(q)
+    return np.concatenate((q[..., :1], -q[..., 1:]), axis=-1)
+
+def QuatHamiltonBatch(p, q):
+    """Return qpq* for stacks of quaternions (..., 4)."""
+    return QuatMultBatch(q, QuatMultBatch(p, QuatConjBatch(q)))
+
+def QuatRotateBatch(q, v):
+    """Rotate (..., 3) vectors by (..., 4) quaternions."""
+    v = np.asarray(v)
+    p = np.zeros(v.shape[:-1] + (4,), dtype=v.dtype)
+    p[..., 1:] = v
+    return QuatHamiltonBatch(p, q)[..., 1:]
+
+def RotationAroundAxisQuaternion(axis, angle):
+    return RotationAroundAxisQuaternions(axis, angle)
+
+def RotationMatrixFromQuaternion(quat):
+    return RotationMatricesFromQuaternions(quat)
+
+def RotationAroundAxisMatrix(axis, angle):
+    return RotationAroundAxisMatrices(axis, angle)
+
+def QuatMult(p, q):
+    return QuatMultBatch(p, q)
 
 def QuatConj(q):
-    return np.array([q[0], -q[1], -q[2], -q[3]])
+    return QuatConjBatch(q)
 
 def QuatHamilton(p, q):
     """Return qpq*, quaternion Hamilton product."""
-    return QuatMult(q, QuatMult(p, QuatConj(q)))
+    return QuatHamiltonBatch(p, q)
 
 def QuatRotate(q, v):
-    p = np.array([0, v[0], v[1], v[2]])
-    p1 = QuatHamilton(p, q)
-    return p1[1:]
+    return QuatRotateBatch(q, v)
@@ -13,6 +13,9 @@ from gain import Gain1
 from grid import Grid
 from interface import InterfaceNormal
 from interface import InterfaceOblique
+from interface import InterfaceObliqueBatch
+from memo import DisableGeometryCache
+from memo import EnableGeometryCache
 from mirror import AnisotropicMirrorNormal
 from mirror import MirrorNormal
 from mirror import MirrorNormal1
@@ -22,5 +25,27 @@ from mirror import TwoWayMirrorNormal
 from mirror import Rooftop
 from mirror import PolarizationScrambler
 from mixer import Mixer
+from network import Network
+from network import StaticNetwork
+from network import AnisotropicMirrorNormalNetwork
+from network import DistanceNetwork
+from network import Distance1Network
+from network import GainNetwork
+from network import Gain1Network
+from network import GridNetwork
+from network import InterfaceNormalNetwork
+from network import InterfaceObliqueNetwork
+from network import MirrorNormalNetwork
+from network import MirrorNormal1Network
+from network import MixerNetwork
+from network import PolarizationScramblerNetwork
+from network import RooftopNetwork
+from network import SemiTransparentMirrorNormalNetwork
+from network import SemiTransparentMirrorNormal1Network
+from network import TwoWayMirrorNormalNetwork
+from network import ThinFilmNormalNetwork
+from network import ThinFilmObliqueNetwork
 from thinfilm import ThinFilmOblique
+from thinfilm import ThinFilmObliqueGeometry
+from thinfilm import ThinFilmObliqueS
 from thinfilm import ThinFilmNormal
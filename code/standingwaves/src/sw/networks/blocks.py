@@ -0,0 +1,34 @@
+"""
+.. module:: sw.networks.blocks
+   :platform: Unix, Windows
+   :synopsis: Assembly of scattering matrices from 3x3 blocks.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+The blocks may be stacked over leading axes, for instance one block per
+frequency.  They are broadcast against each other, so a block that does not
+depend on the frequency can stay (3, 3).
+
+"""
+import numpy as np
+
+def FourPort(S12, S13, S21, S24, S31, S34, S42, S43):
+    """Scattering matrix of a four port network with 1-2, 1-3, 2-4, 3-4 paths.
+
+    This is the layout of oblique films and interfaces, and of grids:
+
+        [[ZZZ, S12, S13, ZZZ],
+         [S21, ZZZ, ZZZ, S24],
+         [S31, ZZZ, ZZZ, S34],
+         [ZZZ, S42, S43, ZZZ]]
+
+    """
+    blocks = ((0, 1, S12), (0, 2, S13),
+              (1, 0, S21), (1, 3, S24),
+              (2, 0, S31), (2, 3, S34),
+              (3, 1, S42), (3, 2, S43))
+    shape = np.broadcast(*[np.empty(np.shape(block)[:-2]) for _, _, block in blocks]).shape
+    S = np.zeros(shape + (12, 12), dtype=complex)
+    for i, j, block in blocks:
+        S[..., 3 * i:3 * i + 3, 3 * j:3 * j + 3] = block
+    return S
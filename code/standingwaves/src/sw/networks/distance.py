@@ -7,14 +7,57 @@ import numpy as np
 import scipy.constants
 import gain
 TAU = 2 * np.pi
+# In uniform mode, an exact exp every ANCHOR frequencies stops the rounding
+# errors of the cumulative rotation, and the drift of the steps, from piling up.
+ANCHOR = 64
+# Largest relative spread of the frequency steps accepted in uniform mode.
+UNIFORM_TOLERANCE = 1e-6
 
 def ComputeSpaceGain(n, length, frequency):
     k0 = TAU * frequency / scipy.constants.speed_of_light  # In vacuum.
     k = k0 * n  # In the medium.  Handles n complex.
     return np.exp(1j * k * length)
 
-def Distance(n, length, frequency):
-    return gain.Gain(ComputeSpaceGain(n, length, frequency))
+def ComputeSpaceGainUniform(n, length, frequencies):
+    """Same as ComputeSpaceGain for evenly spaced frequencies.
 
-def Distance1(n, length, frequency):
-    return gain.Gain1(ComputeSpaceGain(n, length, frequency))
+    Going from one frequency to the next multiplies the gain by the same
+    complex factor.  So instead of one exp per frequency, we rotate: one exp
+    per block of ANCHOR frequencies, and the same ANCHOR rotation factors for
+    all the blocks.
+
+    A scalar frequency, or arrays of n or length, go to ComputeSpaceGain.
+    Frequencies that are not evenly spaced raise ValueError.
+
+    """
+    frequencies = np.asarray(frequencies)
+    if frequencies.ndim != 1 or np.ndim(n) or np.ndim(length) or len(frequencies) < 2:
+        return ComputeSpaceGain(n, length, frequencies)
+    count = len(frequencies)
+    step = frequencies[1] - frequencies[0]
+    spread = np.abs(np.diff(frequencies) - step).max()
+    if not spread <= UNIFORM_TOLERANCE * abs(step):
+        raise ValueError("The frequencies are not evenly spaced.")
+    rotation = np.empty(ANCHOR, dtype=complex)
+    rotation[0] = 1
+    rotation[1:] = ComputeSpaceGain(n, length, step)
+    rotation = np.cumprod(rotation)
+    anchors = ComputeSpaceGain(n, length, frequencies[::ANCHOR])
+    return (anchors[:, np.newaxis] * rotation).ravel()[:count]
+
+def SpaceGain(n, length, frequency, uniform):
+    if uniform:
+        return ComputeSpaceGainUniform(n, length, frequency)
+    return ComputeSpaceGain(n, length, frequency)
+
+def Distance(n, length, frequency, uniform=False):
+    """Free space between two 3D ports.
+
+    frequency or length can be arrays, the result is then a (F, 6, 6) stack.
+    uniform: the frequencies are evenly spaced, use ComputeSpaceGainUniform.
+
+    """
+    return gain.Gain(SpaceGain(n, length, frequency, uniform))
+
+def Distance1(n, length, frequency, uniform=False):
+    return gain.Gain1(SpaceGain(n, length, frequency, uniform))
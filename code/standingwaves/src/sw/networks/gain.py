@@ -6,12 +6,19 @@ Created on Jun 18, 2013
 import numpy as np
 
 def Gain(g):
-    return np.array([[0, 0, 0, g, 0, 0],
-                     [0, 0, 0, 0, g, 0],
-                     [0, 0, 0, 0, 0, g],
-                     [g, 0, 0, 0, 0, 0],
-                     [0, g, 0, 0, 0, 0],
-                     [0, 0, g, 0, 0, 0]], dtype=complex)
+    """Two 3D ports with a gain g between them.
+
+    g can be an array of gains, for instance one per frequency.  The result is
+    then stacked: (F, 6, 6) for g of shape (F,).
+
+    """
+    g = np.asarray(g)
+    S = np.zeros(g.shape + (6, 6), dtype=complex)
+    S[..., [0, 1, 2, 3, 4, 5], [3, 4, 5, 0, 1, 2]] = g[..., np.newaxis]
+    return S
 
 def Gain1(g):
-    return np.array([[0, g], [g, 0]], dtype=complex)
+    g = np.asarray(g)
+    S = np.zeros(g.shape + (2, 2), dtype=complex)
+    S[..., [0, 1], [1, 0]] = g[..., np.newaxis]
+    return S
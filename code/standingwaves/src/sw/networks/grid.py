@@ -10,6 +10,8 @@ from __future__ import division
 import numpy as np
 import scipy.constants
 import sw.geometry as geo
+from blocks import FourPort
+import memo
 
 c0 = scipy.constants.c
 mu0 = scipy.constants.mu_0
@@ -17,8 +19,12 @@ mu0 = scipy.constants.mu_0
 # Insane amount of digits taken from wikipedia.
 euler = 0.57721566490153286060651209008240243104215933593992
 
-def _GridRT(a, d, s, f, propdir):
-    kx, ky, kz = propdir
+def _GridCommon(a, d, s, f, kx, kz):
+    """The terms of _GridRT that only depend on kx ** 2 and kz.
+
+    kx, kz and f are broadcast against each other.
+
+    """
     l = c0 / f  # Wavelength (lambda).
     k = (2 * np.pi) / l  # Wave number.
     w = (2 * np.pi) * f  # Pulsation (omega).
@@ -57,33 +63,47 @@ def _GridRT(a, d, s, f, propdir):
 
     common_x = Nx / Dx * l / (np.pi * d)
     common_c = Nc / Dc * a / d
-    Rxx = -common_x * (1 - kx * kx) / kz
-    Rxy = 0
-    Rxz = 0
-    Ryx = +common_x * kx * ky / kz
-    Ryy = +common_c * kz
-    Ryz = -common_c * ky
-    Rzx = -common_x * kx
-    Rzy = +common_c * ky
-    Rzz = -common_c * ky * ky / kz
-    Txx = 1 + Rxx
-    Txy = 0
-    Txz = 0
-    Tyx = +common_x * kx * ky / kz
-    Tyy = -common_c * kz + 1
-    Tyz = +common_c * ky
-    Tzx = +common_x * kx
-    Tzy = +common_c * ky
-    Tzz = -common_c * ky * ky / kz + 1
-    R = np.array([[Rxx, Rxy, Rxz],
-                  [Ryx, Ryy, Ryz],
-                  [Rzx, Rzy, Rzz]])
-    T = np.array([[Txx, Txy, Txz],
-                  [Tyx, Tyy, Tyz],
-                  [Tzx, Tzy, Tzz]])
+    return common_x, common_c
+
+def _GridRTFromCommon(common_x, common_c, kx, ky, kz):
+    shape = np.broadcast(common_x, kx, ky, kz).shape
+    R = np.zeros(shape + (3, 3), dtype=complex)
+    T = np.zeros(shape + (3, 3), dtype=complex)
+    R[..., 0, 0] = -common_x * (1 - kx * kx) / kz
+    R[..., 1, 0] = +common_x * kx * ky / kz
+    R[..., 1, 1] = +common_c * kz
+    R[..., 1, 2] = -common_c * ky
+    R[..., 2, 0] = -common_x * kx
+    R[..., 2, 1] = +common_c * ky
+    R[..., 2, 2] = -common_c * ky * ky / kz
+    T[..., 0, 0] = 1 + R[..., 0, 0]
+    T[..., 1, 0] = +common_x * kx * ky / kz
+    T[..., 1, 1] = -common_c * kz + 1
+    T[..., 1, 2] = +common_c * ky
+    T[..., 2, 0] = +common_x * kx
+    T[..., 2, 1] = +common_c * ky
+    T[..., 2, 2] = -common_c * ky * ky / kz + 1
     return R, T
 
-def Grid(a, d, s, f, tb, attitude, k1):
+def _GridRT(a, d, s, f, propdir):
+    """Reflection and transmission matrices in the frame of the grid.
+
+    propdir can be a stack of directions (..., 3), and f an array of
+    frequencies: they are broadcast against each other.
+
+    """
+    propdir = np.asarray(propdir)
+    kx, ky, kz = propdir[..., 0], propdir[..., 1], propdir[..., 2]
+    common_x, common_c = _GridCommon(a, d, s, f, kx, kz)
+    return _GridRTFromCommon(common_x, common_c, kx, ky, kz)
+
+def _GridGeometry(tb, attitude, k1):
+    """Attitude matrix and directions of propagation of the 4 ports.
+
+    The directions of propagation sent to _GridRT must be in the reference
+    frame of the grid: kg stacks them as (4, 3).
+
+    """
     grid_rest = np.array([0, 0, 1])
     A = tb.rot(*attitude)
     At = A.T
@@ -92,30 +112,31 @@ def Grid(a, d, s, f, tb, attitude, k1):
     k2 = geo.QuatRotate(q, k1)
     k3 = -k1
     k4 = -k2
+    kg = np.array([At.dot(k1), At.dot(k2), At.dot(k3), At.dot(k4)])
+    return A, kg
 
-    # It is probably possible to use symmetries in order to compute R and T only
-    # once.  This is a possible optimization that I may consider later if
-    # profiling shows this to be a bottleneck.  Note that computing R and T once
-    # only, then using rotation matrices to generate the other Rs and Ts may
-    # take as long.
-    # The direction of propagations sent to _GridRT must be in the reference
-    # frame of the grid.
-    R1, T1 = _GridRT(a, d, s, f, At.dot(k1))
-    R2, T2 = _GridRT(a, d, s, f, At.dot(k2))
-    R3, T3 = _GridRT(a, d, s, f, At.dot(k3))
-    R4, T4 = _GridRT(a, d, s, f, At.dot(k4))
-    #
-    R1 = A.dot(R1).dot(At)
-    R2 = A.dot(R2).dot(At)
-    R3 = A.dot(R3).dot(At)
-    R4 = A.dot(R4).dot(At)
-    T1 = A.dot(T1).dot(At)
-    T2 = A.dot(T2).dot(At)
-    T3 = A.dot(T3).dot(At)
-    T4 = A.dot(T4).dot(At)
-    ZZ = np.zeros_like(R1)
-    S = np.bmat([[ZZ, R2, T3, ZZ],
-                 [R1, ZZ, ZZ, T4],
-                 [T1, ZZ, ZZ, R4],
-                 [ZZ, T2, R3, ZZ]])
-    return np.array(S)
+def Grid(a, d, s, f, tb, attitude, k1):
+    """Wire grid, 4 ports.
+
+    f can be an array of F frequencies, the result is then an (F, 12, 12)
+    stack.
+
+    """
+    A, kg = memo.CachedGeometry(("grid", tb.H, tb.P, tb.R, attitude, k1),
+                                lambda: _GridGeometry(tb, attitude, k1))
+    At = A.T
+    # In the frame of the grid, k2 is k1 turned by half a turn around the
+    # normal: (-kx, -ky, kz).  The costly terms only see kx ** 2 and kz, so
+    # ports 1 and 2 share them.  So do ports 3 and 4, with the opposite kz.
+    # The four sets of R and T then come in one vectorized pass.
+    f = np.asarray(f)[..., np.newaxis]  # Frequencies along the first axis.
+    common_x, common_c = _GridCommon(a, d, s, f, kg[[0, 2], 0], kg[[0, 2], 2])
+    common_x = common_x[..., [0, 0, 1, 1]]
+    common_c = common_c[..., [0, 0, 1, 1]]
+    R, T = _GridRTFromCommon(common_x, common_c, kg[:, 0], kg[:, 1], kg[:, 2])
+    # Back to the frame of the world.
+    R = np.matmul(np.matmul(A, R), At)
+    T = np.matmul(np.matmul(A, T), At)
+    R1, R2, R3, R4 = [R[..., i, :, :] for i in xrange(4)]
+    T1, T2, T3, T4 = [T[..., i, :, :] for i in xrange(4)]
+    return FourPort(R2, T3, R1, T4, T1, R4, T2, R3)
@@ -10,6 +10,8 @@
 
 import numpy as np
 import sw.geometry as geo
+from blocks import FourPort
+import memo
 import collections
 
 InterfaceGeometry = collections.namedtuple("InterfaceGeometry",
@@ -48,44 +50,56 @@ def _InterfaceGeometry(na, nb, n, k1):
     nb: refractive index on the side of the ports 2 and 3 (B side).
     n : normal to the surface, point to the A side.
     k1: direction of incidence for the port 0.
+
+    _InterfaceGeometryBatch for one incidence.
     """
-    u = geo.ComputeIncidencePlaneNormal(n, k1)
-    # Because of the way we made u, theta_a is always going to be positive.
-    # So instead of this:
-    #     theta_a = geo.ComputeSignedAngleBetween(u, n, k1)
-    # We can just use the sign-less version.
-    theta_a = geo.ComputeAngleBetween(n, k1)
-    if not (0 <= theta_a % geo.TAU <= geo.TAU / 4):
-        raise ValueError(u"Wrong side of the surface.")
+    ig = _InterfaceGeometryBatch(na, nb, n, np.asarray(k1)[np.newaxis])
+    return InterfaceGeometry._make(x[0] for x in ig)
+
+def InterfaceOblique(na, nb, n, k1):
+    """InterfaceObliqueBatch for one incidence: S (12, 12), k2, k3, k4.
+
+    The geometry, a batch of one, is cached, see memo.CachedGeometry.
+
+    """
+    ig = memo.CachedGeometry(("interface", na, nb, n, k1),
+                             lambda: _InterfaceGeometryBatch(na, nb, n, np.asarray(k1)[np.newaxis]))
+    S, k2, k3, k4 = _InterfaceObliqueS(na, nb, ig)
+    return S[0], k2[0], k3[0], k4[0]
+
+def _InterfaceGeometryBatch(na, nb, n, k1):
+    """_InterfaceGeometry for N incidences at once.
 
-    theta_b = geo.Snell(na, nb, theta_a)
-    # Incident field decomposition.
-    P, S = geo.MakeParaPerpDecompositionMatrices(u)
+    na, nb: scalars or (N,) arrays of refractive indices.
+    n: (3,) or (N, 3) normals to the surface.
+    k1: (N, 3) directions of incidence.
 
-    # The steeper the angle, the smaller the cross section of a finite-size
-    # beam. Going from low n to high n increases the angle. It also yields t >
-    # 1. Energy is conserved because there is more field in a smaller region.
-    # With infinite plane wave, it's a matter of density. Anyway, this is why we
-    # have these parameters that compensate for the change of area after a
-    # transmission.
+    Every field of the result is stacked over N.
+
+    """
+    n, k1 = np.broadcast_arrays(np.asarray(n, dtype=float), np.asarray(k1, dtype=float))
+    u = geo.ComputeIncidencePlaneNormals(n, k1)
+    theta_a = geo.ComputeAnglesBetween(n, k1)
+    if not np.all((0 <= theta_a % geo.TAU) & (theta_a % geo.TAU <= geo.TAU / 4)):
+        raise ValueError(u"Wrong side of the surface.")
+    theta_b = geo.SnellBatch(na, nb, theta_a)
+    # Incident field decomposition, u being a unit vector.
+    S = u[..., :, np.newaxis] * u[..., np.newaxis, :]
+    P = np.identity(3) - S
     area_compensation_b = np.sqrt(np.cos(theta_a) / np.cos(theta_b))
     area_compensation_a = np.sqrt(np.cos(theta_b) / np.cos(theta_a))
     a21 = -2 * theta_a
     a31 = theta_b - theta_a
     a41 = -theta_a - theta_b
     a43 = -2 * theta_b
-    R12 = geo.RotationAroundAxisMatrix(u, -a21)
-    R13 = geo.RotationAroundAxisMatrix(u, -a31)
-    R21 = geo.RotationAroundAxisMatrix(u, a21)
-    R31 = geo.RotationAroundAxisMatrix(u, a31)
-    R34 = geo.RotationAroundAxisMatrix(u, -a43)
-    R41 = geo.RotationAroundAxisMatrix(u, a41)
-    R43 = geo.RotationAroundAxisMatrix(u, a43)
+    # All the rotations share the axis u: build them in one go.
+    angles = np.array([-a21, -a31, a21, a31, -a43, a41, a43])
+    R12, R13, R21, R31, R34, R41, R43 = geo.RotationAroundAxisMatrices(u, angles)
     R24 = R31
     R42 = R13
-    k2 = -R21.dot(k1)
-    k3 = R31.dot(k1)
-    k4 = R41.dot(k1)
+    k2 = -np.einsum('...ij,...j->...i', R21, k1)
+    k3 = np.einsum('...ij,...j->...i', R31, k1)
+    k4 = np.einsum('...ij,...j->...i', R41, k1)
     return InterfaceGeometry(theta_a=theta_a, theta_b=theta_b,
                              area_compensation_a=area_compensation_a,
                              area_compensation_b=area_compensation_b,
@@ -93,42 +107,34 @@ def _InterfaceGeometry(na, nb, n, k1):
                              R12=R12, R13=R13, R21=R21, R24=R24,
                              R31=R31, R34=R34, R42=R42, R43=R43,
                              k2=k2, k3=k3, k4=k4)
-#     return ((theta_a, theta_b),
-#             (area_compensation_a, area_compensation_b),
-#             (P, S),
-#             (R12, R13, R21, R31, R34, R43, R24, R42),
-#             (k2, k3, k4))
 
-def InterfaceOblique(na, nb, n, k1):
-    ig = _InterfaceGeometry(na, nb, n, k1)
-#     theta_a, theta_b = intgeo.theta_a, intgeo.theta_b
-#     area_compensation_a, area_compensation_b = intgeo[1]
-#     P, S = intgeo[2]
-#     R12, R13, R21, R31, R34, R43, R24, R42 = intgeo[3]
-#     k2, k3, k4 = intgeo[4]
-    #
-    rpa, tpa, rsa, tsa = geo.FresnelOblique(na, nb, ig.theta_a)
-    rpb, tpb, rsb, tsb = geo.FresnelOblique(nb, na, ig.theta_b)
-    tpa *= ig.area_compensation_a
-    tsa *= ig.area_compensation_a
-    tpb *= ig.area_compensation_b
-    tsb *= ig.area_compensation_b
-    ra = rpa * ig.P + rsa * ig.S
-    rb = rpb * ig.P + rsb * ig.S
-    ta = tpa * ig.P + tsa * ig.S
-    tb = tpb * ig.P + tsb * ig.S
-    S12 = ig.R12.dot(ra)
-    S13 = ig.R13.dot(tb)
-    S21 = ig.R21.dot(ra)
-    S24 = ig.R24.dot(tb)
-    S31 = ig.R31.dot(ta)
-    S34 = ig.R34.dot(rb)
-    S42 = ig.R42.dot(ta)
-    S43 = ig.R43.dot(rb)
-    ZZZ = np.zeros((3, 3), dtype=complex)
-    S = np.array(np.bmat([[ZZZ, S12, S13, ZZZ],
-                          [S21, ZZZ, ZZZ, S24],
-                          [S31, ZZZ, ZZZ, S34],
-                          [ZZZ, S42, S43, ZZZ]]))
+def InterfaceObliqueBatch(na, nb, n, k1):
+    """InterfaceOblique for N incidences and index pairs at once.
+
+    Return the (N, 12, 12) stack of scattering matrices and the (N, 3) stacks
+    k2, k3 and k4.  See _InterfaceGeometryBatch for the arguments.
+
+    """
+    return _InterfaceObliqueS(na, nb, _InterfaceGeometryBatch(na, nb, n, k1))
 
+def _InterfaceObliqueS(na, nb, ig):
+    """InterfaceObliqueBatch for the geometry made by _InterfaceGeometryBatch."""
+    rpa, tpa, rsa, tsa = geo.FresnelObliqueBatch(na, nb, ig.theta_a)
+    rpb, tpb, rsb, tsb = geo.FresnelObliqueBatch(nb, na, ig.theta_b)
+    tpa = tpa * ig.area_compensation_a
+    tsa = tsa * ig.area_compensation_a
+    tpb = tpb * ig.area_compensation_b
+    tsb = tsb * ig.area_compensation_b
+    def Jones(p, s):
+        p = p[..., np.newaxis, np.newaxis]
+        s = s[..., np.newaxis, np.newaxis]
+        return p * ig.P + s * ig.S
+    ra = Jones(rpa, rsa)
+    rb = Jones(rpb, rsb)
+    ta = Jones(tpa, tsa)
+    tb = Jones(tpb, tsb)
+    S = FourPort(np.matmul(ig.R12, ra), np.matmul(ig.R13, tb),
+                 np.matmul(ig.R21, ra), np.matmul(ig.R24, tb),
+                 np.matmul(ig.R31, ta), np.matmul(ig.R34, rb),
+                 np.matmul(ig.R42, ta), np.matmul(ig.R43, rb))
     return S, ig.k2, ig.k3, ig.k4
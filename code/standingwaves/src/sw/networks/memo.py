@@ -0,0 +1,37 @@
+"""
+.. module:: sw.networks.memo
+   :platform: Unix, Windows
+   :synopsis: Opt-in cache of the frequency independent geometry of networks.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+The geometry of a thin film, an interface or a grid only depends on its
+attitude, its normal, the direction of incidence and the refractive indices.
+Sweeps rebuild the same networks at every frequency, so once enabled, the
+geometry is computed once per set of arguments and shared, read-only.
+
+"""
+import sw.cache as cache
+
+geometry_cache = None
+
+def EnableGeometryCache(maxsize=256):
+    """Start caching the geometry of the networks; return the cache."""
+    global geometry_cache
+    geometry_cache = cache.LRUCache(maxsize)
+    return geometry_cache
+
+def DisableGeometryCache():
+    global geometry_cache
+    geometry_cache = None
+
+def CachedGeometry(key, compute):
+    """compute(), looked up by `key` when the cache is enabled.
+
+    key: tuple starting with the name of the network, followed by the
+        arguments the geometry depends on, arrays included.
+
+    """
+    if geometry_cache is None:
+        return compute()
+    return cache.Cached(geometry_cache, cache.Key(*key), compute)
@@ -0,0 +1,152 @@
+"""
+.. module:: sw.networks.network
+   :platform: Unix, Windows
+   :synopsis: Networks that know their ports and build their S when asked.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+The functions of sw.networks return bare scattering matrices, for one
+frequency or an array of them.  A Network wraps such a function together with
+what the solver and the user need to know without evaluating it: the size of
+S, the number of ports, the directions of propagation and whether it depends
+on the frequency at all.
+
+The factories below build Networks from the usual constructors, leaving the
+frequency out.  Those of the gains, mirrors, interfaces and the mixer do not
+depend on the frequency and give static Networks.  The solvers of sw.solver accept them wherever they accept
+matrices, the frequency, or the array of frequencies, being given along with
+the networks.  See sw.solver.EvaluateNetworks.
+
+"""
+import numpy as np
+from distance import Distance
+from distance import Distance1
+from gain import Gain
+from gain import Gain1
+from grid import Grid
+from grid import _GridGeometry
+from interface import InterfaceNormal
+from interface import InterfaceOblique
+from mirror import AnisotropicMirrorNormal
+from mirror import MirrorNormal
+from mirror import MirrorNormal1
+from mirror import PolarizationScrambler
+from mirror import Rooftop
+from mirror import SemiTransparentMirrorNormal
+from mirror import SemiTransparentMirrorNormal1
+from mirror import TwoWayMirrorNormal
+from mixer import Mixer
+from thinfilm import ThinFilmNormal
+from thinfilm import ThinFilmObliqueGeometry
+from thinfilm import ThinFilmObliqueS
+import memo
+
+class Network(object):
+    """Scattering matrix of a network, evaluated lazily.
+
+    evaluate: function of the frequency, a scalar or an array, returning S as
+        (size, size) or (F, size, size).  Static networks ignore it.
+    size: number of rows of S.
+    ports: number of ports, size / ports components per port.
+    directions: directions of propagation of the input of each port, when the
+        network defines them, else None.
+    dynamic: False when S does not depend on the frequency.
+
+    The last evaluation is kept: asking again for the same frequency, or for
+    any frequency when static, returns the same matrix.
+
+    """
+    __slots__ = ("evaluate", "size", "ports", "directions", "dynamic", "last")
+    def __init__(self, evaluate, size, ports, directions=None, dynamic=True):
+        object.__init__(self)
+        if size % ports:
+            raise ValueError("%i ports cannot share %i components." % (ports, size))
+        self.evaluate = evaluate
+        self.size = size
+        self.ports = ports
+        self.directions = directions
+        self.dynamic = dynamic
+        self.last = None  # (frequency, S)
+    def S(self, frequency=None):
+        if self.last is not None:
+            last_frequency, last_S = self.last
+            if not self.dynamic or np.array_equal(last_frequency, frequency):
+                return last_S
+        S = self.evaluate(frequency)
+        self.last = (np.copy(frequency), S)
+        return S
+    def clear(self):
+        """Forget the last evaluation."""
+        self.last = None
+
+def StaticNetwork(S, directions=None, dimensions=3):
+    """Network for a matrix that does not depend on the frequency.
+
+    dimensions: components per port, 3 for the 3D networks, 1 for the scalar
+        ones.
+
+    """
+    size = np.shape(S)[0]
+    return Network(lambda frequency: S, size, size // dimensions, directions, dynamic=False)
+
+def DistanceNetwork(n, length, uniform=False):
+    return Network(lambda frequency: Distance(n, length, frequency, uniform), 6, 2)
+
+def Distance1Network(n, length, uniform=False):
+    return Network(lambda frequency: Distance1(n, length, frequency, uniform), 2, 2)
+
+def GridNetwork(a, d, s, tb, attitude, k1):
+    A, kg = memo.CachedGeometry(("grid", tb.H, tb.P, tb.R, attitude, k1),
+                                lambda: _GridGeometry(tb, attitude, k1))
+    directions = tuple(A.dot(k) for k in kg)
+    return Network(lambda frequency: Grid(a, d, s, frequency, tb, attitude, k1),
+                   12, 4, directions)
+
+def ThinFilmObliqueNetwork(n1, n2, thickness, tb, att, k1):
+    tg = ThinFilmObliqueGeometry(tb, att, k1)
+    return Network(lambda frequency: ThinFilmObliqueS(n1, n2, thickness, frequency, tg),
+                   12, 4, (k1, tg.k2, tg.k3, tg.k4))
+
+def ThinFilmNormalNetwork(n1, n2, n3, thickness, tb, attitude):
+    return Network(lambda frequency: ThinFilmNormal(n1, n2, n3, thickness, frequency, tb, attitude),
+                   6, 2)
+
+def InterfaceObliqueNetwork(na, nb, n, k1):
+    S, k2, k3, k4 = InterfaceOblique(na, nb, n, k1)
+    return StaticNetwork(S, (k1, k2, k3, k4))
+
+def InterfaceNormalNetwork(na, nb):
+    return StaticNetwork(InterfaceNormal(na, nb))
+
+def GainNetwork(g):
+    return StaticNetwork(Gain(g))
+
+def Gain1Network(g):
+    return StaticNetwork(Gain1(g), dimensions=1)
+
+def MirrorNormalNetwork(r):
+    return StaticNetwork(MirrorNormal(r))
+
+def MirrorNormal1Network(r):
+    return StaticNetwork(MirrorNormal1(r), dimensions=1)
+
+def SemiTransparentMirrorNormalNetwork(r, t):
+    return StaticNetwork(SemiTransparentMirrorNormal(r, t))
+
+def SemiTransparentMirrorNormal1Network(r, t):
+    return StaticNetwork(SemiTransparentMirrorNormal1(r, t), dimensions=1)
+
+def TwoWayMirrorNormalNetwork(r11, r22, t12, t21, tb, attitude):
+    return StaticNetwork(TwoWayMirrorNormal(r11, r22, t12, t21, tb, attitude))
+
+def AnisotropicMirrorNormalNetwork(rx, ry, rot):
+    return StaticNetwork(AnisotropicMirrorNormal(rx, ry, rot))
+
+def RooftopNetwork(perfection, na, nb, rot):
+    return StaticNetwork(Rooftop(perfection, na, nb, rot))
+
+def PolarizationScramblerNetwork(r, rot):
+    return StaticNetwork(PolarizationScrambler(r, rot))
+
+def MixerNetwork(rx, ry, tx, ty, rot):
+    return StaticNetwork(Mixer(rx, ry, tx, ty, rot))
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+import distance
+import gain
+
+class TestGain(unittest.TestCase):
+    def testScalar(self):
+        S = gain.Gain(2)
+        self.assertEquals(S.shape, (6, 6))
+        self.assertTrue(np.array_equal(S[:3, 3:], 2 * np.identity(3)))
+        self.assertTrue(np.array_equal(S[3:, :3], 2 * np.identity(3)))
+        self.assertTrue(np.array_equal(S[:3, :3], np.zeros((3, 3))))
+    def testStacked(self):
+        g = np.array([1, 2j, 3])
+        S = gain.Gain(g)
+        self.assertEquals(S.shape, (3, 6, 6))
+        for i in xrange(3):
+            self.assertTrue(np.array_equal(S[i], gain.Gain(g[i])))
+    def testStacked1(self):
+        g = np.array([1, 2j])
+        S = gain.Gain1(g)
+        self.assertEquals(S.shape, (2, 2, 2))
+        self.assertTrue(np.array_equal(S[1], np.array([[0, 2j], [2j, 0]])))
+
+class TestDistance(unittest.TestCase):
+    def testStacked(self):
+        frequencies = np.linspace(500e9, 504e9, 5)
+        S = distance.Distance(1.5, .3, frequencies)
+        for i, frequency in enumerate(frequencies):
+            self.assertTrue(np.allclose(S[i], distance.Distance(1.5, .3, frequency)))
+    def testUniform(self):
+        frequencies = np.linspace(500e9, 504e9, 1001)
+        n = 1.83 + 0.018j
+        exact = distance.ComputeSpaceGain(n, .7, frequencies)
+        uniform = distance.ComputeSpaceGainUniform(n, .7, frequencies)
+        self.assertTrue(np.allclose(uniform, exact, rtol=0, atol=1e-9))
+        S = distance.Distance1(n, .7, frequencies, uniform=True)
+        self.assertEquals(S.shape, (1001, 2, 2))
+    def testUniformAnchors(self):
+        # Steps drifting within UNIFORM_TOLERANCE: the anchors are the real frequencies.
+        steps = 1e9 * (1 + distance.UNIFORM_TOLERANCE * np.linspace(0, 1, 999))
+        frequencies = 500e9 + np.concatenate(([0], np.cumsum(steps)))
+        exact = distance.ComputeSpaceGain(1, 1e3, frequencies)
+        uniform = distance.ComputeSpaceGainUniform(1, 1e3, frequencies)
+        self.assertTrue(np.allclose(uniform[::distance.ANCHOR], exact[::distance.ANCHOR],
+                                    rtol=0, atol=1e-12))
+    def testUniformShort(self):
+        gains = distance.ComputeSpaceGainUniform(1, .7, np.array([500e9]))
+        self.assertTrue(np.allclose(gains, distance.ComputeSpaceGain(1, .7, 500e9)))
+    def testUniformUneven(self):
+        self.assertRaises(ValueError, distance.Distance, 1, .5, [1e11, 2e11, 5e11], uniform=True)
+    def testUniformFallback(self):
+        exact = distance.Distance(1, .5, 5e11)
+        self.assertTrue(np.array_equal(distance.Distance(1, .5, 5e11, uniform=True), exact))
+        frequencies = np.linspace(500e9, 504e9, 3)
+        lengths = np.array([.5, .6, .7])
+        self.assertTrue(np.array_equal(distance.Distance(1, lengths, frequencies, uniform=True),
+                                       distance.Distance(1, lengths, frequencies)))
+
+if __name__ == "__main__":
+    unittest.main()
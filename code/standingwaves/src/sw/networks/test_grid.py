@@ -209,6 +209,32 @@ class TestRT(unittest.TestCase):
         a = np.array([0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
         b = np.abs((G.dot(a))) ** 2  # Work in power.
         print b
+    def testFrequencyStack(self):
+        a = 1e-6
+        d = 10e-6
+        s = 1e7
+        fs = np.linspace(900e9, 1100e9, 5)
+        tb = geo.TaitBryan(0, 1, 2)
+        attitude = (.1, -.4, 1.2)
+        k1 = np.array([.1, .2, .97])
+        k1 /= np.linalg.norm(k1)
+        G = grid.Grid(a, d, s, fs, tb, attitude, k1)
+        self.assertEquals(G.shape, (5, 12, 12))
+        for i, f in enumerate(fs):
+            self.assertTrue(np.allclose(G[i], grid.Grid(a, d, s, f, tb, attitude, k1)))
+    def testStackedDirections(self):
+        a = 1e-6
+        d = 10e-6
+        s = 1e7
+        fs = np.array([900e9, 1e12])
+        propdirs = np.array([[0, 0, 1], [.6, 0, .8], [0, -.6, -.8]])
+        R, T = grid._GridRT(a, d, s, fs, propdirs[:, np.newaxis])
+        self.assertEquals(R.shape, (3, 2, 3, 3))
+        for i, propdir in enumerate(propdirs):
+            for j, f in enumerate(fs):
+                Rs, Ts = grid._GridRT(a, d, s, f, propdir)
+                self.assertTrue(np.allclose(R[i, j], Rs))
+                self.assertTrue(np.allclose(T[i, j], Ts))
 
 
 if __name__ == "__main__":
@@ -97,6 +97,31 @@ class TestInterfaceGeometry(unittest.TestCase):
         self.assertTrue(np.allclose(ep4, ep4_hope))
 
 
+class TestInterfaceObliqueBatch(unittest.TestCase):
+    def testMatchesScalar(self):
+        tb = geo.TaitBryan(2, 0, 1)  # Like in Panda3d.
+        n = tb.rotH(np.radians(60)).dot(tb.rest)
+        angles = np.radians([10, 30, 45, 55])
+        k1 = np.array([tb.rotH(angle).dot(tb.rest) for angle in angles])
+        na = np.array([1, 1.5, 1, 1.2])
+        nb = np.array([1.5, 1, 1.3 + .01j, 1])
+        S, k2, k3, k4 = interface.InterfaceObliqueBatch(na, nb, n, k1)
+        self.assertEquals(S.shape, (4, 12, 12))
+        self.assertEquals(k2.shape, (4, 3))
+        for i in xrange(4):
+            Si, k2i, k3i, k4i = interface.InterfaceOblique(na[i], nb[i], n, k1[i])
+            self.assertTrue(np.allclose(S[i], Si))
+            self.assertTrue(np.allclose(k2[i], k2i))
+            self.assertTrue(np.allclose(k3[i], k3i))
+            self.assertTrue(np.allclose(k4[i], k4i))
+    def testNormalIncidence(self):
+        n = np.array([0, 0, 1])
+        k1 = np.array([[0, .1, 1], [0, 0, 1]])
+        self.assertRaises(ZeroDivisionError, interface.InterfaceObliqueBatch, 1, 1.5, n, k1)
+    def testWrongSide(self):
+        n = np.array([0, 0, 1])
+        k1 = np.array([[0, .1, 1], [0, .1, -1]])
+        self.assertRaises(ValueError, interface.InterfaceObliqueBatch, 1, 1.5, n, k1)
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import sw.geometry as geo
+import network
+import distance
+import thinfilm
+
+class TestNetwork(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        def evaluate(frequency):
+            self.calls.append(frequency)
+            return distance.Distance1(1, .5, frequency)
+        self.network = network.Network(evaluate, 2, 2)
+    def testLastEvaluationKept(self):
+        S = self.network.S(500e9)
+        self.assertTrue(self.network.S(500e9) is S)
+        self.network.S(501e9)
+        self.assertEquals(len(self.calls), 2)
+    def testArrayOfFrequencies(self):
+        frequencies = np.linspace(500e9, 501e9, 4)
+        S = self.network.S(frequencies)
+        self.assertEquals(S.shape, (4, 2, 2))
+        self.assertTrue(self.network.S(frequencies.copy()) is S)
+        self.assertEquals(len(self.calls), 1)
+    def testClear(self):
+        self.network.S(500e9)
+        self.network.clear()
+        self.network.S(500e9)
+        self.assertEquals(len(self.calls), 2)
+    def testStatic(self):
+        mirror = network.StaticNetwork(np.array([[-.3, .9], [.9, .3]]), dimensions=1)
+        self.assertFalse(mirror.dynamic)
+        self.assertEquals((mirror.size, mirror.ports), (2, 2))
+        self.assertTrue(mirror.S(1) is mirror.S(2))
+    def testBadPorts(self):
+        self.assertRaises(ValueError, network.Network, None, 12, 5)
+
+class TestFactories(unittest.TestCase):
+    def testDistance(self):
+        space = network.DistanceNetwork(1, .5)
+        self.assertTrue(space.dynamic)
+        self.assertEquals((space.size, space.ports), (6, 2))
+        self.assertTrue(np.array_equal(space.S(500e9), distance.Distance(1, .5, 500e9)))
+    def testThinFilmOblique(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        att = (geo.TAU / 8, 0, 0)
+        k1 = np.array([0, 0, 1])
+        film = network.ThinFilmObliqueNetwork(1, 1.5, 10e-6, tb, att, k1)
+        e, k2, k3, k4 = thinfilm.ThinFilmOblique(1, 1.5, 10e-6, 500e9, tb, att, k1)
+        self.assertTrue(np.array_equal(film.S(500e9), e))
+        self.assertEquals(film.ports, 4)
+        self.assertTrue(np.allclose(film.directions[1], k2))
+    def testThinFilmNormalSweep(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        film = network.ThinFilmNormalNetwork(1, 1.5, 1, 10e-6, tb, (0, 0, 0))
+        frequencies = np.array([500e9, 501e9])
+        S = film.S(frequencies)
+        self.assertEquals(S.shape, (2, 6, 6))
+        for f, Sf in zip(frequencies, S):
+            self.assertTrue(np.allclose(Sf, thinfilm.ThinFilmNormal(1, 1.5, 1, 10e-6, f, tb, (0, 0, 0))))
+    def testStaticFactories(self):
+        mirror = network.SemiTransparentMirrorNormal1Network(-.3, .9)
+        self.assertFalse(mirror.dynamic)
+        self.assertEquals((mirror.size, mirror.ports), (2, 2))
+        mixer = network.MixerNetwork(.1, .2, .9, .8, np.identity(3))
+        self.assertEquals((mixer.size, mixer.ports), (6, 2))
+        self.assertEquals(network.GainNetwork(.5).S(500e9).shape, (6, 6))
+    def testGridDirections(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        k1 = np.array([0, 0, 1])
+        grid = network.GridNetwork(1e-6, 10e-6, 1e7, tb, (geo.TAU / 8, 0, 0), k1)
+        self.assertTrue(np.allclose(grid.directions[0], k1))
+        self.assertTrue(np.allclose(grid.directions[2], -k1))
+        self.assertEquals(grid.S(np.array([1e12, 1.1e12])).shape, (2, 12, 12))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+import sw.geometry as geo
+import blocks
+import thinfilm
+import memo
+
+class TestFourPort(unittest.TestCase):
+    def testLayout(self):
+        names = ["S12", "S13", "S21", "S24", "S31", "S34", "S42", "S43"]
+        values = [np.full((3, 3), i + 1) for i in xrange(len(names))]
+        S = blocks.FourPort(*values)
+        for value, name in zip(values, names):
+            i, j = int(name[1]) - 1, int(name[2]) - 1
+            self.assertTrue(np.array_equal(S[3 * i:3 * i + 3, 3 * j:3 * j + 3], value))
+        self.assertTrue(np.array_equal(S[0:3, 0:3], np.zeros((3, 3))))
+    def testBroadcast(self):
+        I = np.identity(3)
+        stacked = np.array([I, 2 * I])
+        S = blocks.FourPort(stacked, I, I, I, I, I, I, I)
+        self.assertEquals(S.shape, (2, 12, 12))
+        self.assertTrue(np.array_equal(S[1, 0:3, 3:6], 2 * I))
+        self.assertTrue(np.array_equal(S[1, 0:3, 6:9], I))
+
+class TestThinFilmOblique(unittest.TestCase):
+    def testStacked(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        att = (-geo.TAU / 8, 0, 0)
+        k1 = np.array([0, 0, 1])
+        frequencies = np.linspace(496e9, 504e9, 5)
+        n2 = 1.83 + 0.018j
+        S, k2, k3, k4 = thinfilm.ThinFilmOblique(1, n2, 10e-6, frequencies, tb, att, k1)
+        self.assertEquals(S.shape, (5, 12, 12))
+        for i, frequency in enumerate(frequencies):
+            Si, k2i, _, _ = thinfilm.ThinFilmOblique(1, n2, 10e-6, frequency, tb, att, k1)
+            self.assertEquals(Si.shape, (12, 12))
+            self.assertTrue(np.allclose(S[i], Si))
+            self.assertTrue(np.allclose(k2, k2i))
+    def testGeometryReuse(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        att = (geo.TAU / 8, 0, 0)
+        k1 = np.array([0, 0, 1])
+        tg = thinfilm.ThinFilmObliqueGeometry(tb, att, k1)
+        S = thinfilm.ThinFilmObliqueS(1, 1.5, 10e-6, 500e9, tg)
+        e, _, _, _ = thinfilm.ThinFilmOblique(1, 1.5, 10e-6, 500e9, tb, att, k1)
+        self.assertTrue(np.array_equal(S, e))
+
+class TestGeometryCache(unittest.TestCase):
+    def setUp(self):
+        self.lru = memo.EnableGeometryCache()
+    def tearDown(self):
+        memo.DisableGeometryCache()
+    def testSweep(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        att = (geo.TAU / 8, 0, 0)
+        k1 = np.array([0, 0, 1])
+        frequencies = np.linspace(496e9, 504e9, 5)
+        for frequency in frequencies:
+            S, _, _, _ = thinfilm.ThinFilmOblique(1, 1.5, 10e-6, frequency, tb, att, k1)
+            memo.DisableGeometryCache()
+            e, _, _, _ = thinfilm.ThinFilmOblique(1, 1.5, 10e-6, frequency, tb, att, k1)
+            memo.geometry_cache = self.lru
+            self.assertTrue(np.array_equal(S, e))
+        info = self.lru.info()
+        self.assertEquals((info.hits, info.misses), (4, 1))
+    def testInputWriteable(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        k1 = np.array([0., 0., 1.])
+        _, _, k3, _ = thinfilm.ThinFilmOblique(1, 1.5, 10e-6, 500e9, tb, (geo.TAU / 8, 0, 0), k1)
+        self.assertFalse(k3 is k1)
+        k1 *= 2
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 import numpy as np
 import sw.geometry as geo
 from distance import ComputeSpaceGain
+from blocks import FourPort
+import memo
 import collections
 
 ThinFilmGeometry = collections.namedtuple("ThinFilmGeometry",
@@ -64,40 +66,62 @@ def _ThinFilmGeometry(n, k1):
     R41 = Rneg
     R43 = Rneg
     k2 = -R21.dot(k1)
-    k3 = k1
+    k3 = np.array(k1)  # Not k1 itself: the cache makes k3 read-only.
     k4 = R41.dot(k1)
     return ThinFilmGeometry(theta_a=theta_a,
                             P=P, S=S,
                             R12=R12, R21=R21, R34=R34, R43=R43,
                             k2=k2, k3=k3, k4=k4)
 
-def ThinFilmOblique(n1, n2, thickness, frequency, tb, att, k1):
-    """Thin film of material n2 at non-normal incidence.  4 ports.
+def ThinFilmObliqueGeometry(tb, att, k1):
+    """Frequency independent part of ThinFilmOblique.
+
+    Compute it once and hand it to ThinFilmObliqueS for each frequency, or
+    for all of them at once.
+
+    """
+    def compute():
+        normal_rest = np.array([0, 0, 1])
+        n = tb.rot(*att).dot(normal_rest)
+        return _ThinFilmGeometry(n, k1)
+    return memo.CachedGeometry(("thinfilm", tb.H, tb.P, tb.R, att, k1), compute)
+
+def ThinFilmObliqueS(n1, n2, thickness, frequency, tg):
+    """Scattering matrix of the film for a ThinFilmGeometry `tg`.
+
+    `frequency` can be an array of F frequencies: the result is then stacked
+    as (F, 12, 12).
 
     """
-    normal_rest = np.array([0, 0, 1])
-    n = tb.rot(*att).dot(normal_rest)
-    tg = _ThinFilmGeometry(n, k1)
     rp, tp, rs, ts = _ThinFilmRT(n1, n2, thickness, frequency, tg.theta_a)
+    # Broadcast the coefficients against the 3x3 matrices.
+    rp, tp, rs, ts = [np.asarray(x)[..., np.newaxis, np.newaxis] for x in (rp, tp, rs, ts)]
     # Reflections: rotations.
     Sr = rp * tg.P + rs * tg.S
-    S12 = tg.R12.dot(Sr)
-    S21 = tg.R21.dot(Sr)
-    S34 = tg.R34.dot(Sr)
-    S43 = tg.R43.dot(Sr)
+    S12 = np.matmul(tg.R12, Sr)
+    S21 = np.matmul(tg.R21, Sr)
+    S34 = np.matmul(tg.R34, Sr)
+    S43 = np.matmul(tg.R43, Sr)
     # Transmission: no rotation.
-    S13 = S24 = S31 = S42 = tp * tg.P + ts * tg.S
-    # Impossible paths.
-    ZZZ = np.zeros((3, 3), dtype=complex)
-    S = np.array(np.bmat([[ZZZ, S12, S13, ZZZ],
-                          [S21, ZZZ, ZZZ, S24],
-                          [S31, ZZZ, ZZZ, S34],
-                          [ZZZ, S42, S43, ZZZ]]))
+    St = tp * tg.P + ts * tg.S
+    return FourPort(S12, St, S21, St, St, S34, St, S43)
+
+def ThinFilmOblique(n1, n2, thickness, frequency, tb, att, k1):
+    """Thin film of material n2 at non-normal incidence.  4 ports.
+
+    `frequency` can be an array: the geometry is computed once and the result
+    is an (F, 12, 12) stack.
+
+    """
+    tg = ThinFilmObliqueGeometry(tb, att, k1)
+    S = ThinFilmObliqueS(n1, n2, thickness, frequency, tg)
     return S, tg.k2, tg.k3, tg.k4
 
 def ThinFilmNormal(n1, n2, n3, thickness, frequency, tb, attitude):
     """Thin film of material n2 at normal incidence.  2 ports.
 
+    frequency can be an array, S is then stacked: (F, 6, 6).
+
     """
     r12, t12 = geo.FresnelNormal(n1, n2)
     r21, t21 = geo.FresnelNormal(n2, n1)
@@ -116,21 +140,14 @@ def ThinFilmNormal(n1, n2, n3, thickness, frequency, tb, attitude):
     r31 = a3 * a3 * r31
     t13 = a1 * a3 * t13
     t31 = a1 * a3 * t31
-    # Jones matrices.
-    I = np.identity(3, dtype=complex)  # Last column meaningless for transverse.
-    S11 = r13 * I
-    S12 = t31 * I
-    S21 = t13 * I
-    S22 = r31 * I
-    # Attitude corrections.
+    # Jones matrices, with the attitude corrections.
     R = tb.rot(*attitude)
-    Rt = R.T
-    S11 = R.dot(S11).dot(Rt)
-    S12 = R.dot(S12).dot(Rt)
-    S21 = R.dot(S21).dot(Rt)
-    S22 = R.dot(S22).dot(Rt)
-    #
-    S = np.array(np.bmat([[S11, S12],
-                          [S21, S22]]))
+    P = R.dot(R.T)  # Last column meaningless for transverse.
+    r13, r31, t13, t31 = np.broadcast_arrays(r13, r31, t13, t31)
+    S = np.empty(r13.shape + (6, 6), dtype=complex)
+    S[..., :3, :3] = r13[..., np.newaxis, np.newaxis] * P
+    S[..., :3, 3:] = t31[..., np.newaxis, np.newaxis] * P
+    S[..., 3:, :3] = t13[..., np.newaxis, np.newaxis] * P
+    S[..., 3:, 3:] = r31[..., np.newaxis, np.newaxis] * P
     return S
 
@@ -1,7 +1,29 @@
+from solver import AxisCouplings
+from solver import BatchSolver
 from solver import CheckCouplingSanity
 from solver import CheckUnusedCouplings
+from solver import CompileCouplings
+from solver import CompilePairs
+from solver import CompiledSolver
+from solver import EvaluateNetworks
+from solver import ExpandCouplingsTo2d
 from solver import ExpandCouplingsTo3d
 from solver import Solver
 from solver import Solveb
+from solver import SolvebBatch
 from solver import SolveNetworks
+from solver import SolveNetworksBatch
+from solver import SolveNetworksSparse
 from solver import SolveCouplings
+from solver import Separated
+from solver import SPARSE_THRESHOLD
+from solver import SYMMETRIC_THRESHOLD
+from solver import plan_cache
+from static import StaticSolver
+from reduction import Subnetwork
+from reduction import SubnetworkBatch
+from iterative import IterativeSolver
+from neumann import NeumannSolver
+from transfer import ApplyTransfer
+from transfer import Transfer
+from transfer import TransferSolver
@@ -0,0 +1,142 @@
+"""
+.. module:: sw.solver.iterative
+   :platform: Unix, Windows
+   :synopsis: Krylov solver for frequency sweeps of large benches.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+Adjacent frequencies of a sweep have nearly identical solutions.  Instead of a
+fresh LU per frequency, we solve I - S1ii.P with GMRES or BiCGSTAB, starting
+from the previous solution and preconditioned by the sparse LU of a reference
+frequency.  That LU is reused over a window of frequencies, and refreshed
+earlier if the iterations stop converging.
+
+"""
+import collections
+import numpy as np
+import scipy.sparse.linalg
+import solver
+
+IterationInfo = collections.namedtuple("IterationInfo",
+                                       "iterations residual refactored")
+
+METHODS = {"gmres": scipy.sparse.linalg.gmres,
+           "bicgstab": scipy.sparse.linalg.bicgstab}
+
+# Inner iterations of GMRES between restarts, the default of scipy.
+GMRES_RESTART = 20
+
+def Budget(method, maxiter):
+    """Arguments of the scipy method for about maxiter products by M.
+
+    gmres counts its maxiter in restart cycles, of `restart` inner iterations
+    and one product each.  bicgstab counts it in iterations, of two products.
+    Both also take a product for the residual at each start, so the count may
+    go a little over maxiter.
+
+    """
+    if method == "gmres":
+        restart = min(GMRES_RESTART, maxiter)
+        return {"restart": restart, "maxiter": -(-maxiter // restart)}
+    return {"maxiter": max(1, maxiter // 2)}
+
+class IterativeSolver(object):
+    """Solve successive frequencies of a sweep with warm-started Krylov iterations.
+
+    method: "gmres" or "bicgstab".
+    tol: relative residual at which the iterations stop.
+    maxiter: products by M = I - S1ii.P allowed before falling back to a
+        direct solve, whatever the method, see Budget.
+    window: number of frequencies that share the same preconditioner.
+
+    After each call to `solve`, `history` holds one IterationInfo per
+    excitation: the number of products by M, the relative residual
+    |x - M.b1i| / |x| and whether the preconditioner was refactored.  The
+    products are the same unit of work for both methods, unlike their
+    iterations: an iteration of BiCGSTAB takes two of them.
+
+    """
+    def __init__(self, n, couplings, method="gmres", tol=1e-10, maxiter=100, window=32):
+        object.__init__(self)
+        if method not in METHODS:
+            raise ValueError("Unknown method %r, expected one of %r." % (method, sorted(METHODS)))
+        self.solvedcouplings = solver.CompileCouplings(n, couplings)
+        self.method = METHODS[method]
+        self.tol = tol
+        self.budget = Budget(method, maxiter)
+        self.window = window
+        self.preconditioner = None
+        self.age = 0  # Number of frequencies solved with the preconditioner.
+        self.guess = None  # Previous b1i, to warm start the iterations.
+        self.history = []
+    def reset(self):
+        """Forget the preconditioner and the previous solution."""
+        self.preconditioner = None
+        self.age = 0
+        self.guess = None
+        self.history = []
+    def solve(self, networks, a, c, frequency=None):
+        """Same as Solver(n, couplings)(networks)(a, c), with a and c (n,) or (n, k).
+
+        The Network objects are evaluated at `frequency`.
+
+        """
+        p, q, no = self.solvedcouplings
+        networks = solver.EvaluateNetworks(networks, frequency)
+        S1oo, S1oi, S1io, M = solver.AssembleNetworksSparse(self.solvedcouplings, networks)
+        a1o = a[q][:no]
+        c1 = c[q]
+        c1o, c1i = c1[:no], c1[no:]
+        if M is None:
+            # There is no inside port.
+            b1 = S1oo.dot(a1o) + c1o
+        else:
+            entering = S1io.dot(a1o) + c1i
+            b1i = self.solveInside(M, entering)
+            b1o = S1oo.dot(a1o) + S1oi.dot(b1i[p]) + c1o
+            b1 = np.concatenate((b1o, b1i))
+        b = np.empty_like(b1)
+        b[q] = b1
+        return b
+    def solveInside(self, M, entering):
+        refactored = False
+        if self.preconditioner is None or self.age >= self.window:
+            self.preconditioner = scipy.sparse.linalg.splu(M)
+            self.age = 0
+            refactored = True
+        self.age += 1
+        columns = np.asarray(entering, dtype=complex).reshape(M.shape[0], -1)
+        if self.guess is None or self.guess.shape != columns.shape:
+            self.guess = np.zeros_like(columns)
+        self.history = []
+        for i in xrange(columns.shape[1]):
+            x = columns[:, i]
+            b1i, iterations = self.iterate(M, x, self.guess[:, i])
+            if b1i is None:
+                # No convergence: the reference frequency is too far away.  The
+                # LU of this frequency solves it directly and becomes the new
+                # preconditioner.
+                self.preconditioner = scipy.sparse.linalg.splu(M)
+                self.age = 1
+                refactored = True
+                b1i = self.preconditioner.solve(x)
+            norm = np.linalg.norm(x)
+            residual = np.linalg.norm(x - M.dot(b1i)) / norm if norm else 0.0
+            self.history.append(IterationInfo(iterations, residual, refactored))
+            self.guess[:, i] = b1i
+        return self.guess.reshape(np.shape(entering)).copy()
+    def iterate(self, M, x, x0):
+        """Return (b1i, products), b1i being None if it did not converge."""
+        counter = [0]
+        def product(v):
+            counter[0] += 1
+            return M.dot(v)
+        operator = scipy.sparse.linalg.LinearOperator(M.shape, matvec=product, dtype=complex)
+        preconditioner = scipy.sparse.linalg.LinearOperator(M.shape,
+                                                            matvec=self.preconditioner.solve,
+                                                            dtype=complex)
+        b1i, status = self.method(operator, x, x0=x0, tol=self.tol, atol=0,
+                                  M=preconditioner, **self.budget)
+        if status != 0:
+            return None, counter[0]
+        return b1i, counter[0]
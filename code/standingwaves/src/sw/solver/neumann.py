@@ -0,0 +1,134 @@
+"""
+.. module:: sw.solver.neumann
+   :platform: Unix, Windows
+   :synopsis: Multiple-reflection solver for weakly reflecting systems.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+The inside waves solve (I - S1ii.P) b1i = x.  When the system reflects little,
+the spectral radius of S1ii.P is small and
+
+    b1i = x + (S1ii.P) x + (S1ii.P)^2 x + ...
+
+converges fast.  Term k is the field after k bounces: it tells which round
+trips produce which ripple.  Frequencies where the series converges too slowly
+fall back to a direct solve.
+
+"""
+import numpy as np
+import solver
+
+def NeumannSeries(SiiP, x, tol, max_order, max_ratio, keep=False):
+    """Sum of the series (F, m), the converged frequencies, and the terms.
+
+    A frequency stops when its last term is below `tol` times the sum.  It
+    gives up after `max_order` bounces, or when the mean decay per bounce, an
+    estimate of the spectral radius, exceeds `max_ratio`.  We average from the
+    first term because a single bounce is a poor estimate: a lossless
+    propagation does not decay at all, only the reflections do.
+
+    Only the last term is kept along the way.  With `keep`, the terms are also
+    stacked as (K + 1, F, m), zero past the order where a frequency stopped.
+    Otherwise the third value is None.
+
+    """
+    nf, m = x.shape
+    total = x.copy()
+    terms = [x] if keep else None
+    first = np.linalg.norm(x, axis=-1)
+    converged = first == 0
+    # The frequencies still iterated, their matrices and their last term.  The
+    # stopped frequencies are dropped so that no product is spent on them.
+    index = np.flatnonzero(~converged)
+    M = SiiP[index] if len(index) < nf else SiiP
+    last = x[index]
+    for order in xrange(1, max_order + 1):
+        if len(index) == 0:
+            break
+        last = solver.BatchDot(M, last)
+        total[index] += last
+        if keep:
+            term = np.zeros((nf, m), dtype=complex)
+            term[index] = last
+            terms.append(term)
+        norm = np.linalg.norm(last, axis=-1)
+        done = norm <= tol * np.linalg.norm(total[index], axis=-1)
+        converged[index[done]] = True
+        going = ~done
+        if order >= 4:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rate = (norm / first[index]) ** (1. / order)
+            going &= ~(rate > max_ratio)
+        if not going.all():
+            index = index[going]
+            M = M[going]
+            last = last[going]
+    if keep:
+        terms = np.array(terms)
+    return total, converged, terms
+
+def SolvebNeumann((p, q, no), (S1oo, S1oi, S1io, ISiiP), a, c,
+                  tol=1e-12, max_order=200, max_ratio=.9, orders=False):
+    """Same as SolvebBatch, with the inside waves computed bounce by bounce.
+
+    With `orders`, return a (K + 2, F, n) array instead of b.  Row k holds the
+    contribution of the waves that bounced k times.  The last row holds what
+    the series missed at the frequencies that fell back to the direct solve,
+    and zeros elsewhere.  The sum over the first axis is b.
+
+    """
+    nf = S1oo.shape[0]
+    n = len(q)
+    a1 = a[..., q]
+    c1 = c[..., q]
+    a1o = a1[..., :no]
+    c1o, c1i = c1[..., :no], c1[..., no:]
+    BatchDot = solver.BatchDot
+    b1o0 = np.broadcast_to(BatchDot(S1oo, a1o) + c1o, (nf, no))
+    if ISiiP is None:
+        # There is no inside port.
+        terms = np.zeros((1, nf, 0), dtype=complex)
+        total = np.zeros((nf, 0), dtype=complex)
+        remainder = np.zeros((nf, 0), dtype=complex)
+    else:
+        m = ISiiP.shape[1]
+        x = np.array(np.broadcast_to(BatchDot(S1io, a1o) + c1i, (nf, m)), dtype=complex)
+        SiiP = np.identity(m) - ISiiP
+        total, converged, terms = NeumannSeries(SiiP, x, tol, max_order, max_ratio, orders)
+        remainder = np.zeros((nf, m), dtype=complex)
+        failed = ~converged
+        if failed.any():
+            direct = np.linalg.solve(ISiiP[failed], x[failed][..., np.newaxis])[..., 0]
+            remainder[failed] = direct - total[failed]
+    if orders:
+        b1 = np.empty((len(terms) + 1, nf, n), dtype=complex)
+        b1[:-1, :, no:] = terms
+        b1[:-1, :, :no] = BatchDot(S1oi, terms[..., p])
+        b1[0, :, :no] += b1o0
+        b1[-1, :, no:] = remainder
+        b1[-1, :, :no] = BatchDot(S1oi, remainder[..., p])
+        b = np.empty_like(b1)
+        b[..., q] = b1
+        return b
+    b1i = total + remainder
+    b1 = np.concatenate((b1o0 + BatchDot(S1oi, b1i[..., p]), b1i), axis=-1)
+    b = np.empty((nf, n), dtype=complex)
+    b[:, q] = b1
+    return b
+
+def NeumannSolver(n, couplings, tol=1e-12, max_order=200, max_ratio=.9):
+    """Same as BatchSolver, using the multiple-reflection series.
+
+    The returned solve function takes an extra `orders` flag, see
+    SolvebNeumann.
+
+    """
+    solvedcouplings = solver.CompileCouplings(n, couplings)
+    def sendNetworks(networks, frequencies=None):
+        networks = solver.EvaluateNetworks(networks, frequencies)
+        solvednetworks = solver.SolveNetworksBatch(solvedcouplings, networks)
+        def solve(a, c, orders=False):
+            return SolvebNeumann(solvedcouplings, solvednetworks, a, c,
+                                 tol, max_order, max_ratio, orders)
+        return solve
+    return sendNetworks
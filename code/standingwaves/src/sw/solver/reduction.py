@@ -0,0 +1,76 @@
+"""
+.. module:: sw.solver.reduction
+   :platform: Unix, Windows
+   :synopsis: Collapse coupled networks into one equivalent network.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+A group of networks coupled together behaves, seen from its outside ports, like
+a single network of scattering matrix
+
+    Sext = S1oo + S1oi.P.(I - S1ii.P)^-1.S1io
+
+The ports of that network are the outside ports of the group, in increasing
+order.  It can be used in a larger Solver call like any other network, which
+allows to build benches hierarchically.
+
+"""
+import numpy as np
+import scipy.sparse
+import solver
+
+def ExternalPorts((p, q, no)):
+    """Ports of the group that become the ports of the reduced network."""
+    return q[:no]
+
+def SolveExternal((p, q, no), (S1oo, S1oi, S1io, LU)):
+    if scipy.sparse.issparse(S1oo):
+        S1oo, S1io = S1oo.toarray(), S1io.toarray()
+    if LU is None:
+        # There is no inside port.
+        return np.array(S1oo, dtype=complex)
+    # All the outside ports go through lu_solve together.
+    X = solver.LUSolve(LU, S1io)
+    return S1oo + S1oi.dot(X[p])
+
+def Subnetwork(n, couplings, sparse=None, symmetric=None):
+    """Prepare the reduction of the networks of n ports coupled by `couplings`.
+
+    Return a function that takes the networks, and the frequency for the
+    Network objects, and returns the scattering matrix of the equivalent
+    network.  See solver.CompiledSolver for `sparse` and `symmetric`.
+
+    """
+    solvedcouplings = solver.CompileCouplings(n, couplings)
+    sparse = solver.UseSparse(len(solvedcouplings[0]), sparse, symmetric)
+    def reduce(networks, frequency=None):
+        networks = solver.EvaluateNetworks(networks, frequency)
+        if sparse:
+            solvednetworks = solver.SolveNetworksSparse(solvedcouplings, networks)
+        else:
+            solvednetworks = solver.SolveNetworks(solvedcouplings, networks, symmetric)
+        return SolveExternal(solvedcouplings, solvednetworks)
+    return reduce
+
+def SolveExternalBatch((p, q, no), (S1oo, S1oi, S1io, ISiiP)):
+    """SolveExternal for networks solved by SolveNetworksBatch: (F, no, no)."""
+    if ISiiP is None:
+        # There is no inside port.
+        return np.array(S1oo, dtype=complex)
+    # One solve per frequency, with all the outside ports as right-hand sides.
+    X = np.linalg.solve(ISiiP, np.broadcast_to(S1io, ISiiP.shape[:1] + S1io.shape[1:]))
+    return S1oo + np.matmul(S1oi, X[:, p])
+
+def SubnetworkBatch(n, couplings):
+    """Same as Subnetwork, with the networks stacked over a frequency axis.
+
+    Networks are given as for BatchSolver, and the result is the (F, no, no)
+    stack of the scattering matrices of the equivalent network.
+
+    """
+    solvedcouplings = solver.CompileCouplings(n, couplings)
+    def reduce(networks, frequencies=None):
+        networks = solver.EvaluateNetworks(networks, frequencies)
+        solvednetworks = solver.SolveNetworksBatch(solvedcouplings, networks)
+        return SolveExternalBatch(solvedcouplings, solvednetworks)
+    return reduce
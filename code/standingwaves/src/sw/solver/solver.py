@@ -4,8 +4,26 @@ Created on Jun 18, 2013
 @author: delforge
 '''
 
+import collections
 import numpy as np
 import scipy.linalg
+import scipy.sparse
+import scipy.sparse.linalg
+import sw.cache as cache
+
+# Above this many inside ports, Solver factors I - S1ii.P with a sparse LU.
+SPARSE_THRESHOLD = 150
+
+# Above this many inside ports, the dense backend factors a reciprocal bench
+# with LDL^T.  Below, the overhead of scipy.linalg.ldl outweighs the gain: at
+# 300 inside ports it is no faster than LU, at 1200 it takes 2/3 of the time.
+SYMMETRIC_THRESHOLD = 600
+
+# Relative tolerance of the symmetry check of S1ii.
+SYMMETRY_TOLERANCE = 1e-12
+
+# Compiled coupling plans, keyed by the canonical form of (n, couplings).
+plan_cache = cache.LRUCache(128)
 
 def ExpandCouplingsTo3d(couplings):
     couplings3d = []
@@ -19,6 +37,13 @@ def ExpandCouplingsTo3d(couplings):
         couplings3d.extend([{cax, cbx}, {cay, cby}, {caz, cbz}])
     return couplings3d
 
+def ExpandCouplingsTo2d(couplings):
+    """Same as ExpandCouplingsTo3d, for ports of two transverse components."""
+    couplings2d = []
+    for ca, cb in couplings:
+        couplings2d.extend([{ca * 2, cb * 2}, {ca * 2 + 1, cb * 2 + 1}])
+    return couplings2d
+
 def CheckUnusedCouplings(couplings, n, known_unused):
     """Return an exception if missing couplings, otherwise None."""
     unused = set(xrange(n))
@@ -51,34 +76,66 @@ def FindOutside(inside, n):
     return set(range(n)).difference(inside)
 
 def SeparateInsideOutside(inside, outside, n):
-    insorted = sorted(list(inside))
-    outsorted = sorted(list(outside))
-    Q = np.zeros((n, n))
-    for i, j in enumerate(outsorted):
-        Q[i, j] = 1
-    l = len(outsorted)
-    for i, j in enumerate(insorted):
-        Q[i + l, j] = 1
-    return Q
+    """Return the index array q that puts the outside ports first.
+
+    q is the permutation matrix Q in disguise: Q.dot(v) is v[q], and Q.T.dot(v)
+    is the scatter w[q] = v.  n is the total number of ports.
+
+    """
+    insorted = sorted(inside)
+    outsorted = sorted(outside)
+    q = np.array(outsorted + insorted, dtype=int)
+    assert len(q) == n
+    return q
 
 def CoupleInputsToOutputs(inside, couplings):
-    insorted = sorted(list(inside))
-    m = len(inside)
-    P = np.zeros((m, m))
+    """Return the index array p of the coupling permutation P.
+
+    p[i] is the inside index of the port coupled to the inside port i.  P is
+    symmetric, so P.dot(v) is v[p] and S.dot(P) is S[:, p].
+
+    """
+    insorted = sorted(inside)
+    index = dict((port, i) for i, port in enumerate(insorted))
+    p = np.zeros(len(insorted), dtype=int)
     for portA, portB in couplings:
-        indexA = insorted.index(portA)
-        indexB = insorted.index(portB)
-        P[indexA, indexB] = 1
-        P[indexB, indexA] = 1
-    return P
-
-def GatherNetworks(networks):
-    ns = [network.shape[0] for network in networks]
+        indexA = index[portA]
+        indexB = index[portB]
+        p[indexA] = indexB
+        p[indexB] = indexA
+    return p
+
+def IsDynamic(network):
+    """Plain matrices are assumed to change from one call to the next."""
+    return isinstance(network, np.ndarray) or network.dynamic
+
+def EvaluateNetworks(networks, frequency=None):
+    """Matrices of the networks, evaluating the Network objects at `frequency`.
+
+    Plain matrices are passed through, see sw.networks.Network.
+
+    """
+    return [network if isinstance(network, np.ndarray) else network.S(frequency)
+            for network in networks]
+
+def GatherNetworks(networks, frequency=None, S=None):
+    """Block diagonal matrix of the networks.
+
+    The Network objects are evaluated at `frequency`.  S is the result of a
+    previous call for the same networks, or None: when given, the blocks of the
+    static networks are already in place and only the others are written.
+
+    """
+    ns = [network.shape[0] if isinstance(network, np.ndarray) else network.size
+          for network in networks]
     n = sum(ns)
-    S = np.zeros((n, n), dtype=complex)
+    refresh = S is None
+    if refresh:
+        S = np.zeros((n, n), dtype=complex)
     offset = 0
     for ni, network in zip(ns, networks):
-        S[offset:offset + ni, offset:offset + ni] = network
+        if refresh or IsDynamic(network):
+            S[offset:offset + ni, offset:offset + ni] = EvaluateNetworks([network], frequency)[0]
         offset += ni
     return S
 
@@ -90,6 +147,72 @@ def FactorizeSiiP(SiiP):
     M = I - SiiP
     return scipy.linalg.lu_factor(M, False)
 
+LDLFactor = collections.namedtuple("LDLFactor", "L D perm p")
+
+def IsSymmetric(S):
+    """Whether S equals its transpose, up to SYMMETRY_TOLERANCE."""
+    if S.size == 0:
+        return True
+    return np.abs(S - S.T).max() <= SYMMETRY_TOLERANCE * np.abs(S).max()
+
+def UseSymmetric(S1ii, symmetric):
+    """Whether to factor with FactorizeSymmetric.
+
+    symmetric: True when the caller knows that the bench is reciprocal, no
+    check is made.  False for LU.  None to check, for large benches only.
+    Large benches go to the sparse backend unless sparse=False, see UseSparse,
+    so the check only runs when the dense backend is asked for.
+
+    """
+    m = S1ii.shape[0]
+    if m == 0 or symmetric is False:
+        return False
+    if symmetric:
+        return True
+    return m >= SYMMETRIC_THRESHOLD and IsSymmetric(S1ii)
+
+def FactorizeSymmetric(S1ii, p):
+    """LDL^T factorization of P - S1ii, S1ii being complex symmetric.
+
+    Reciprocal networks have symmetric matrices, and so does the coupling P.
+    I - S1ii.P is not symmetric, but I - S1ii.P = (P - S1ii).P and P - S1ii
+    is: solving (P - S1ii) z = x gives b1i = P.z = z[p].  The Bunch-Kaufman
+    factorization takes about half the arithmetic of an LU, but scipy hands L
+    back unpacked: it takes as much memory as the LU.
+
+    L is the unit lower triangular factor, rows already permuted by perm and
+    in Fortran order, so that the triangular solves use it without a copy.  D
+    holds the 1x1 and 2x2 diagonal blocks in the banded form of solve_banded.
+
+    """
+    m = len(p)
+    K = -S1ii
+    K[np.arange(m), p] += 1
+    lu, d, perm = scipy.linalg.ldl(K, lower=True, hermitian=False, overwrite_a=True)
+    D = np.zeros((3, m), dtype=complex)
+    D[0, 1:] = d.diagonal(1)
+    D[1] = d.diagonal()
+    D[2, :-1] = d.diagonal(-1)
+    return LDLFactor(np.asfortranarray(lu[perm]), D, perm, p)
+
+def LDLSolve(F, x):
+    x = np.asarray(x, dtype=complex)
+    y = scipy.linalg.solve_triangular(F.L, x[F.perm], lower=True, unit_diagonal=True,
+                                      check_finite=False)
+    y = scipy.linalg.solve_banded((1, 1), F.D, y, check_finite=False)
+    z = np.empty_like(y)
+    z[F.perm] = scipy.linalg.solve_triangular(F.L, y, trans='T', lower=True,
+                                              unit_diagonal=True, check_finite=False)
+    return z[F.p]
+
+def LUSolve(LU, x):
+    """Solve with a dense (lu, piv) factorization, an LDLFactor or a sparse SuperLU."""
+    if isinstance(LU, scipy.sparse.linalg.SuperLU):
+        return LU.solve(np.asarray(x, dtype=complex))
+    if isinstance(LU, LDLFactor):
+        return LDLSolve(LU, x)
+    return scipy.linalg.lu_solve(LU, x)
+
 def SeparateMatrixRegions(S1, no):
     S1oo = S1[:no, :no]
     S1oi = S1[:no, no:]
@@ -103,51 +226,503 @@ def SeparateVectorRegions(v, no):
 def SolveCouplings(couplings, n):
     inside = FindInside(couplings)
     outside = FindOutside(inside, n)
-    Q = SeparateInsideOutside(inside, outside, n)
-    P = CoupleInputsToOutputs(inside, couplings)
+    q = SeparateInsideOutside(inside, outside, n)
+    p = CoupleInputsToOutputs(inside, couplings)
     no = len(outside)
-    return P, Q, no
+    return p, q, no
 
-def SolveNetworks((P, Q, no), networks):
-    S = GatherNetworks(networks)
-    if Q.shape != S.shape:
-        raise ValueError("Declared number of ports (%i) does not match the sum of the ports of each network (%i)." % (Q.shape[0], P.shape[0]))
-    S1 = Q.dot(S).dot(Q.T)
+def CouplingsKey(n, couplings):
+    """Canonical, hashable form of a topology.
+
+    The order of the couplings, and of the two ports in a coupling, does not
+    matter.
+
+    """
+    return n, tuple(sorted(tuple(sorted(coupling)) for coupling in couplings))
+
+def CompileCouplings(n, couplings):
+    """Check and solve the couplings, or fetch them from plan_cache.
+
+    The index arrays of the plan are shared between all the solvers of the
+    same topology, so they are made read-only.
+
+    """
+    key = CouplingsKey(n, couplings)
+    plan = plan_cache.get(key)
+    if plan is None:
+        err = CheckCouplingSanity(couplings, n)
+        if err is not None:
+            raise err
+        plan = SolveCouplings(couplings, n)
+        for indices in plan[:2]:
+            indices.flags.writeable = False
+        plan_cache.put(key, plan)
+    return plan
+
+def CompilePairs(n, A, B):
+    """CompileCouplings for couplings given as two index arrays: A[i] to B[i].
+
+    Checked and solved with array operations, which pays off for benches of
+    thousands of ports.  The plan is the same as the one of CompileCouplings,
+    and is stored in plan_cache under the same key: solvers built later from
+    the list of couplings find it there.
+
+    """
+    A = np.asarray(A, dtype=int)
+    B = np.asarray(B, dtype=int)
+    lo = np.minimum(A, B)
+    hi = np.maximum(A, B)
+    order = np.lexsort((hi, lo))
+    key = n, tuple(zip(lo[order].tolist(), hi[order].tolist()))
+    plan = plan_cache.get(key)
+    if plan is None:
+        ports = np.concatenate((A, B))
+        outofrange = (ports < 0) | (ports >= n)
+        if outofrange.any():
+            raise ValueError("Port %i is outside the [0, %i] range." % (ports[outofrange][0], n - 1))
+        counts = np.bincount(ports, minlength=n)
+        if (counts > 1).any():
+            raise ValueError("Port %i is used more than once." % np.flatnonzero(counts > 1)[0])
+        used = counts == 1
+        inside = np.flatnonzero(used)
+        q = np.concatenate((np.flatnonzero(~used), inside))
+        indexA = np.searchsorted(inside, A)
+        indexB = np.searchsorted(inside, B)
+        p = np.zeros(len(inside), dtype=int)
+        p[indexA] = indexB
+        p[indexB] = indexA
+        plan = p, q, n - len(inside)
+        for indices in plan[:2]:
+            indices.flags.writeable = False
+        plan_cache.put(key, plan)
+    return plan
+
+def SolveNetworks((p, q, no), networks, symmetric=None):
+    """Factor the networks.  See UseSymmetric for `symmetric`."""
+    return SolveGathered((p, q, no), GatherNetworks(networks), symmetric)
+
+def SolveGathered((p, q, no), S, symmetric=None):
+    """SolveNetworks for the matrix made by GatherNetworks."""
+    if (len(q), len(q)) != S.shape:
+        raise ValueError("Declared number of ports (%i) does not match the sum of the ports of each network (%i)." % (len(q), S.shape[0]))
+    S1 = S[np.ix_(q, q)]
     S1oo, S1oi, S1io, S1ii = SeparateMatrixRegions(S1, no)
-    S1iiP = S1ii.dot(P)
-    LU = FactorizeSiiP(S1iiP)
+    if UseSymmetric(S1ii, symmetric):
+        LU = FactorizeSymmetric(S1ii, p)
+    else:
+        LU = FactorizeSiiP(S1ii[:, p])
     return S1oo, S1oi, S1io, LU
 
-def SolveInputs(P, S1oo, S1oi, S1io, LU, a1o, c1o, c1i):
+def GatherNetworksSparse(networks):
+    """Size and nonzero entries of the block diagonal S: n, rows, cols, values."""
+    rows = [np.zeros(0, dtype=int)]
+    cols = [np.zeros(0, dtype=int)]
+    values = [np.zeros(0, dtype=complex)]
+    offset = 0
+    for network in networks:
+        r, c = np.nonzero(network)
+        rows.append(r + offset)
+        cols.append(c + offset)
+        values.append(network[r, c])
+        offset += network.shape[0]
+    return offset, np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+def AssembleNetworksSparse((p, q, no), networks):
+    """Sparse S1oo, S1oi, S1io and CSC I - S1ii.P, or None if nothing is inside.
+
+    The network blocks go straight into the sparse matrices without ever
+    building the dense S.  Each row of I - S1ii.P holds at most as many
+    nonzeros as the largest network has ports.
+
+    """
+    return AssembleGatheredSparse((p, q, no), GatherNetworksSparse(networks))
+
+def AssembleGatheredSparse((p, q, no), (n, rows, cols, values)):
+    """AssembleNetworksSparse for the entries made by GatherNetworksSparse."""
+    if len(q) != n:
+        raise ValueError("Declared number of ports (%i) does not match the sum of the ports of each network (%i)." % (len(q), n))
+    m = len(p)
+    position = np.empty(n, dtype=int)
+    position[q] = np.arange(n)
+    rows = position[rows]
+    cols = position[cols]
+    oo = (rows < no) & (cols < no)
+    oi = (rows < no) & (cols >= no)
+    io = (rows >= no) & (cols < no)
+    ii = (rows >= no) & (cols >= no)
+    S1oo = scipy.sparse.csr_matrix((values[oo], (rows[oo], cols[oo])), shape=(no, no))
+    S1oi = scipy.sparse.csr_matrix((values[oi], (rows[oi], cols[oi] - no)), shape=(no, m))
+    S1io = scipy.sparse.csr_matrix((values[io], (rows[io] - no, cols[io])), shape=(m, no))
+    if m == 0:
+        return S1oo, S1oi, S1io, None
+    # S1ii.P moves column j of S1ii to column p[j], P being its own inverse.
+    diagonal = np.arange(m)
+    M = scipy.sparse.csc_matrix((np.concatenate((np.ones(m, dtype=complex), -values[ii])),
+                                 (np.concatenate((diagonal, rows[ii] - no)),
+                                  np.concatenate((diagonal, p[cols[ii] - no])))),
+                                shape=(m, m))
+    return S1oo, S1oi, S1io, M
+
+def SolveNetworksSparse(solvedcouplings, networks):
+    """Same as SolveNetworks, but with sparse matrices and a sparse LU.
+
+    splu scales far better than lu_factor on large benches.
+
+    """
+    return SolveGatheredSparse(solvedcouplings, GatherNetworksSparse(networks))
+
+def SolveGatheredSparse(solvedcouplings, gathered):
+    """SolveNetworksSparse for the entries made by GatherNetworksSparse."""
+    S1oo, S1oi, S1io, M = AssembleGatheredSparse(solvedcouplings, gathered)
+    if M is None:
+        return S1oo, S1oi, S1io, None
+    return S1oo, S1oi, S1io, scipy.sparse.linalg.splu(M)
+
+def SolveInputs(p, S1oo, S1oi, S1io, LU, a1o, c1o, c1i):
     if LU is None:
         # There is no inside port.
         b1 = S1oo.dot(a1o) + c1o
     else:
         entering = S1io.dot(a1o) + c1i
-        b1i = scipy.linalg.lu_solve(LU, entering)
-        b1o = S1oo.dot(a1o) + S1oi.dot(P).dot(b1i) + c1o
+        b1i = LUSolve(LU, entering)
+        b1o = S1oo.dot(a1o) + S1oi.dot(b1i[p]) + c1o
         b1 = np.concatenate((b1o, b1i))
     return b1
 
-def Solveb((P, Q, no), (S1oo, S1oi, S1io, LU), a, c):
-    a1 = Q.dot(a)
-    c1 = Q.dot(c)
+def Solveb((p, q, no), (S1oo, S1oi, S1io, LU), a, c):
+    """Outgoing waves b for the incoming waves a and the sources c.
+
+    a and c are either vectors of n ports, or (n, k) arrays holding one
+    excitation per column.  All the columns share the factorization and go
+    through lu_solve together.
+
+    """
+    a1 = a[q]
+    c1 = c[q]
     a1o, _ = SeparateVectorRegions(a1, no)
     c1o, c1i = SeparateVectorRegions(c1, no)
-    b1 = SolveInputs(P, S1oo, S1oi, S1io, LU, a1o, c1o, c1i)
-    b = (Q.T).dot(b1)
+    b1 = SolveInputs(p, S1oo, S1oi, S1io, LU, a1o, c1o, c1i)
+    b = np.empty_like(b1)
+    b[q] = b1
     return b
 
-def Solver(n, couplings):
-    err = CheckCouplingSanity(couplings, n)
-    if err is not None:
-        raise err
-    solvedcouplings = SolveCouplings(couplings, n)
-    def sendNetworks(networks):
-        solvednetworks = SolveNetworks(solvedcouplings, networks)
-        def solve(a, c):
-            return Solveb(solvedcouplings, solvednetworks, a, c)
-        return solve
+Separated = collections.namedtuple("Separated", "groups solved")
+
+def AxisCouplings(n, couplings):
+    """Couplings of the ports of a 3D bench, or None if it is not one.
+
+    The couplings of a 3D bench are those of ExpandCouplingsTo3d: each of the
+    three components of a port is coupled to the same component of the same
+    other port.  Only then can the bench be separated along the axes.
+
+    """
+    if n % 3:
+        return None
+    pairs = np.array([sorted(coupling) for coupling in couplings], dtype=int).reshape(-1, 2)
+    if (pairs[:, 0] % 3 != pairs[:, 1] % 3).any():
+        return None
+    axis = pairs[:, 0] % 3
+    ports = [set(map(tuple, pairs[axis == i] // 3)) for i in xrange(3)]
+    if ports[0] != ports[1] or ports[0] != ports[2]:
+        return None
+    return [set(pair) for pair in sorted(ports[0])]
+
+def IsAxisDiagonal(S):
+    """Whether no network of S mixes the x, y and z components."""
+    D = S.reshape(S.shape[0] // 3, 3, S.shape[1] // 3, 3)
+    return not any(D[:, i, :, j].any() for i in xrange(3) for j in xrange(3) if i != j)
+
+def GroupAxes(S):
+    """Axes of S grouped by identical per axis matrices: [(0, 1, 2)] at best."""
+    groups = []
+    for axis in xrange(3):
+        for group in groups:
+            if np.array_equal(S[group[0]::3, group[0]::3], S[axis::3, axis::3]):
+                group.append(axis)
+                break
+        else:
+            groups.append([axis])
+    return [tuple(group) for group in groups]
+
+def SolveSeparated(plan, S, symmetric=None):
+    """SolveGathered for an axis diagonal S, once per group of identical axes.
+
+    plan: the plan of the bench of the ports, see AxisCouplings.
+
+    """
+    groups = GroupAxes(S)
+    solved = [SolveGathered(plan, S[group[0]::3, group[0]::3], symmetric)
+              for group in groups]
+    return Separated(groups, solved)
+
+def SeparateAxesSparse((n, rows, cols, values)):
+    """Entries of each axis, as made by GatherNetworksSparse, or None.
+
+    None when the networks mix the x, y and z components.
+
+    """
+    axis = rows % 3
+    if (cols % 3 != axis).any():
+        return None
+    return [(n // 3, rows[axis == i] // 3, cols[axis == i] // 3, values[axis == i])
+            for i in xrange(3)]
+
+def GroupAxesSparse(axes):
+    """GroupAxes for the entries made by SeparateAxesSparse."""
+    groups = []
+    for axis in xrange(3):
+        for group in groups:
+            if all(np.array_equal(a, b) for a, b in zip(axes[group[0]], axes[axis])):
+                group.append(axis)
+                break
+        else:
+            groups.append([axis])
+    return [tuple(group) for group in groups]
+
+def SolveSeparatedSparse(plan, axes):
+    """SolveSeparated with the sparse backend, for the entries of SeparateAxesSparse."""
+    groups = GroupAxesSparse(axes)
+    solved = [SolveGatheredSparse(plan, axes[group[0]]) for group in groups]
+    return Separated(groups, solved)
+
+def IsSparseFactor(solvednetworks):
+    """Whether the factorization holds a sparse LU, which cannot be pickled."""
+    if isinstance(solvednetworks, Separated):
+        return any(IsSparseFactor(solved) for solved in solvednetworks.solved)
+    return solvednetworks is not None and \
+        isinstance(solvednetworks[3], scipy.sparse.linalg.SuperLU)
+
+def UseSparse(m, sparse, symmetric=None):
+    """Whether to factor a system of m inside ports with the sparse backend.
+
+    Only the dense backend has LDL^T: symmetric=True keeps the system dense
+    when sparse is None, and raises ValueError when sparse is True.
+
+    """
+    if symmetric and sparse:
+        raise ValueError("The sparse backend has no LDL^T factorization, symmetric=True needs a dense backend.")
+    if sparse is None:
+        return not symmetric and m > SPARSE_THRESHOLD
+    return sparse
+
+def SolvebSeparated(plan, (groups, solved), a, c):
+    """Solveb for a factorization made by SolveSeparated.
+
+    The axes of a group share its factorization: they go through it together,
+    as extra columns.
+
+    """
+    a = np.asarray(a)
+    c = np.asarray(c)
+    rest = np.broadcast(a, c).shape[1:]
+    shape = (a.shape[0] // 3, 3) + rest
+    a = np.broadcast_to(a, a.shape[:1] + rest).reshape(shape)
+    c = np.broadcast_to(c, c.shape[:1] + rest).reshape(shape)
+    b = np.empty(shape, dtype=complex)
+    for group, solvednetworks in zip(groups, solved):
+        group = list(group)
+        columns = (shape[0], len(group) * int(np.prod(rest)))
+        bg = Solveb(plan, solvednetworks, a[:, group].reshape(columns), c[:, group].reshape(columns))
+        b[:, group] = bg.reshape((shape[0], len(group)) + rest)
+    return b.reshape((3 * shape[0],) + rest)
+
+class CompiledSolver(object):
+    """Solver for n ports coupled by `couplings`, as a picklable object.
+
+    It holds the coupling plan (the index arrays p and q and the number of
+    outside ports no) and, once `factor` has been called, the factorization of
+    the networks.
+
+    sparse: True for the sparse LU backend, False for the dense one, None to
+    pick the sparse backend above SPARSE_THRESHOLD inside ports, see
+    UseSparse.
+    symmetric: whether the dense backend may factor reciprocal benches with
+    LDL^T, see UseSymmetric.  The sparse backend always uses LU: True picks
+    the dense backend when `sparse` is None, and cannot go with sparse=True.
+
+    separable: whether to solve the benches of 3D ports whose networks never
+    mix the x, y and z components as three benches of scalar ports, see
+    SolveSeparated.  None, the default, detects them at each `factor`.  The
+    axes with the same networks are factored once.  When `sparse` is None, the
+    backend of the separated benches is picked from their own, three times
+    smaller, number of inside ports.
+
+    A dense factorization is pickled along with the plan.  A sparse one cannot
+    be: it is dropped and `factor` must be called again after unpickling.
+
+    The dense backend keeps the matrix gathered by the last `factor`.  When
+    called again with the same networks, as in a sweep over a list of Network
+    objects, only the blocks of the dynamic networks are rewritten.
+
+    """
+    __slots__ = ("n", "p", "q", "no", "sparse", "symmetric", "axes", "axessparse",
+                 "solvednetworks", "gathered")
+    def __init__(self, n, couplings, sparse=None, symmetric=None, separable=None):
+        object.__init__(self)
+        self.n = n
+        self.p, self.q, self.no = CompileCouplings(n, couplings)
+        self.sparse = UseSparse(len(self.p), sparse, symmetric)
+        self.symmetric = symmetric
+        self.axes = None  # Plan of the bench of the ports, when separable.
+        self.axessparse = None
+        if separable is not False:
+            axiscouplings = AxisCouplings(n, couplings)
+            if axiscouplings is not None:
+                self.axes = CompileCouplings(n // 3, axiscouplings)
+                self.axessparse = UseSparse(len(self.axes[0]), sparse, symmetric)
+        self.solvednetworks = None
+        self.gathered = None  # (networks, S)
+    def __getstate__(self):
+        solvednetworks = None if IsSparseFactor(self.solvednetworks) else self.solvednetworks
+        return (self.n, self.p, self.q, self.no, self.sparse, self.symmetric,
+                self.axes, self.axessparse, solvednetworks)
+    def __setstate__(self, state):
+        (self.n, self.p, self.q, self.no, self.sparse, self.symmetric,
+         self.axes, self.axessparse, self.solvednetworks) = state
+        self.gathered = None
+    def copy(self):
+        """Unfactored solver sharing the same plan."""
+        other = CompiledSolver.__new__(CompiledSolver)
+        other.__setstate__((self.n, self.p, self.q, self.no, self.sparse,
+                            self.symmetric, self.axes, self.axessparse, None))
+        return other
+    def factor(self, networks, frequency=None):
+        """Factor the networks, the Network objects evaluated at `frequency`."""
+        plan = (self.p, self.q, self.no)
+        if self.sparse:
+            networks = EvaluateNetworks(networks, frequency)
+            aligned = all(network.shape[0] % 3 == 0 for network in networks)
+            gathered = GatherNetworksSparse(networks)
+            axes = SeparateAxesSparse(gathered) if self.axes is not None and aligned else None
+            if axes is not None and self.axessparse:
+                self.solvednetworks = SolveSeparatedSparse(self.axes, axes)
+            elif axes is not None:
+                # The separated benches are small enough for the dense backend.
+                self.solvednetworks = SolveSeparated(self.axes, GatherNetworks(networks),
+                                                     self.symmetric)
+            else:
+                self.solvednetworks = SolveGatheredSparse(plan, gathered)
+            return self
+        S = None
+        if self.gathered is not None:
+            previous, S = self.gathered
+            if len(previous) != len(networks) or \
+               any(a is not b for a, b in zip(previous, networks)):
+                S = None
+        S = GatherNetworks(networks, frequency, S)
+        self.gathered = (list(networks), S)
+        if self.axessparse is False and IsAxisDiagonal(S):
+            self.solvednetworks = SolveSeparated(self.axes, S, self.symmetric)
+        else:
+            self.solvednetworks = SolveGathered(plan, S, self.symmetric)
+        return self
+    def solve(self, a, c):
+        if self.solvednetworks is None:
+            raise ValueError("No networks have been factored.")
+        if isinstance(self.solvednetworks, Separated):
+            return SolvebSeparated(self.axes, self.solvednetworks, a, c)
+        return Solveb((self.p, self.q, self.no), self.solvednetworks, a, c)
+
+def Solver(n, couplings, sparse=None, symmetric=None, separable=None):
+    """Prepare the solver for n ports coupled by `couplings`.
+
+    Return a function that takes the networks, and the frequency for the
+    Network objects, and returns the solve function.  See CompiledSolver for
+    `sparse`, `symmetric` and `separable`.
+
+    """
+    compiled = CompiledSolver(n, couplings, sparse, symmetric, separable)
+    def sendNetworks(networks, frequency=None):
+        return compiled.copy().factor(networks, frequency).solve
     return sendNetworks
 
+def CountFrequencies(networks):
+    """Number of frequencies F of a list of stacked networks.
+
+    A stacked network has the shape (F, ni, ni).  A plain (ni, ni) network does
+    not depend on the frequency and is broadcast over all of them.
+
+    """
+    counts = set(network.shape[0] for network in networks if network.ndim == 3)
+    if len(counts) > 1:
+        raise ValueError("Networks are stacked over different numbers of frequencies: %r." % sorted(counts))
+    if len(counts) == 0:
+        return 1
+    return counts.pop()
+
+def GatherNetworksBatch(networks):
+    nf = CountFrequencies(networks)
+    ns = [network.shape[-1] for network in networks]
+    n = sum(ns)
+    S = np.zeros((nf, n, n), dtype=complex)
+    offset = 0
+    for ni, network in zip(ns, networks):
+        S[:, offset:offset + ni, offset:offset + ni] = network
+        offset += ni
+    return S
+
+def BatchDot(A, x):
+    """Matrix-vector product over a stack: A is (F, n, m), x is (m,) or (F, m)."""
+    return np.einsum('...ij,...j->...i', A, x)
+
+def SolveNetworksBatch((p, q, no), networks):
+    S = GatherNetworksBatch(networks)
+    if (len(q), len(q)) != S.shape[1:]:
+        raise ValueError("Declared number of ports (%i) does not match the sum of the ports of each network (%i)." % (len(q), S.shape[1]))
+    S1 = S[:, q[:, np.newaxis], q]
+    S1oo = S1[:, :no, :no]
+    S1oi = S1[:, :no, no:]
+    S1io = S1[:, no:, :no]
+    S1ii = S1[:, no:, no:]
+    m = S1ii.shape[1]
+    if m == 0:
+        return S1oo, S1oi, S1io, None
+    # numpy has no stacked LU.  Instead we keep I - S1ii.P and let
+    # np.linalg.solve factor and solve every frequency in one LAPACK loop.
+    ISiiP = np.identity(m, dtype=complex) - S1ii[:, :, p]
+    return S1oo, S1oi, S1io, ISiiP
+
+def SolveInputsBatch(p, S1oo, S1oi, S1io, ISiiP, a1o, c1o, c1i):
+    if ISiiP is None:
+        # There is no inside port.
+        b1 = BatchDot(S1oo, a1o) + c1o
+    else:
+        entering = BatchDot(S1io, a1o) + c1i
+        entering = np.broadcast_to(entering, ISiiP.shape[:2])
+        b1i = np.linalg.solve(ISiiP, entering[..., np.newaxis])[..., 0]
+        b1o = BatchDot(S1oo, a1o) + BatchDot(S1oi, b1i[..., p]) + c1o
+        b1 = np.concatenate((b1o, b1i), axis=-1)
+    return b1
+
+def SolvebBatch((p, q, no), (S1oo, S1oi, S1io, ISiiP), a, c):
+    """Solve all the frequencies at once.
+
+    a and c are either (n,), the same excitation for every frequency, or (F, n).
+    The result is always (F, n).
 
+    """
+    a1 = a[..., q]
+    c1 = c[..., q]
+    a1o = a1[..., :no]
+    c1o, c1i = c1[..., :no], c1[..., no:]
+    b1 = SolveInputsBatch(p, S1oo, S1oi, S1io, ISiiP, a1o, c1o, c1i)
+    b = np.empty((S1oo.shape[0], len(q)), dtype=complex)
+    b[:, q] = b1
+    return b
+
+def BatchSolver(n, couplings):
+    """Same as Solver, but the networks are stacked over a frequency axis.
+
+    Each network is either an (F, ni, ni) array, or an (ni, ni) array when it
+    does not depend on the frequency.  Network objects are evaluated at the
+    array of `frequencies` given with them.
+
+    """
+    solvedcouplings = CompileCouplings(n, couplings)
+    def sendNetworks(networks, frequencies=None):
+        networks = EvaluateNetworks(networks, frequencies)
+        solvednetworks = SolveNetworksBatch(solvedcouplings, networks)
+        def solve(a, c):
+            return SolvebBatch(solvedcouplings, solvednetworks, a, c)
+        return solve
+    return sendNetworks
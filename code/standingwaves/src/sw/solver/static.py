@@ -0,0 +1,188 @@
+"""
+.. module:: sw.solver.static
+   :platform: Unix, Windows
+   :synopsis: Eliminate the frequency independent networks once per sweep.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+In a sweep, most networks (sources, receivers, loads) do not depend on the
+frequency.  We split the ports into the static ones, that belong to these
+networks, and the dynamic ones.  With b the outgoing waves, a the external
+incoming waves, c the sources and Pi the couplings:
+
+    b_S = Sst (a_S + Pi_SS b_S + Pi_SD b_D) + c_S
+    b_D = Sdy (a_D + Pi_DS b_S + Pi_DD b_D) + c_D
+
+The first line gives b_S = u_S + X b_D with
+
+    u_S = (I - Sst Pi_SS)^-1 (Sst a_S + c_S)
+    X = (I - Sst Pi_SS)^-1 Sst Pi_SD
+
+and X is frequency independent.  Injected in the second line:
+
+    (I - Sdy Peff) b_D = Sdy (a_D + Pi_DS u_S) + c_D
+    Peff = Pi_DD + Pi_DS X
+
+So once X and Peff are known, each frequency only factors a matrix the size
+of the dynamic ports.
+
+"""
+import collections
+import numpy as np
+import scipy.linalg
+import solver
+
+StaticReduction = collections.namedtuple("StaticReduction",
+                                         "n static dynamic outside "
+                                         "Sst LU X Peff "
+                                         "linked_dynamic linked_static")
+
+def SplitStaticDynamic(networks, sizes):
+    """Global port numbers of the static and of the dynamic networks.
+
+    networks: the static networks, with None in place of the dynamic ones.
+    sizes: the number of ports of each dynamic network, in order.
+
+    """
+    if len(sizes) != sum(network is None for network in networks):
+        raise ValueError("Expected %i dynamic networks, got %i." % (sum(network is None for network in networks), len(sizes)))
+    static = []
+    dynamic = []
+    offset = 0
+    sizes = iter(sizes)
+    for network in networks:
+        if network is None:
+            ni = next(sizes)
+            dynamic.extend(xrange(offset, offset + ni))
+        else:
+            ni = network.shape[0]
+            static.extend(xrange(offset, offset + ni))
+        offset += ni
+    return np.array(static, dtype=int), np.array(dynamic, dtype=int), offset
+
+def SolveStaticNetworks((p, q, no), networks, sizes):
+    static, dynamic, n = SplitStaticDynamic(networks, sizes)
+    if len(q) != n:
+        raise ValueError("Declared number of ports (%i) does not match the sum of the ports of each network (%i)." % (len(q), n))
+    ns = len(static)
+    nd = len(dynamic)
+    # partner[g] is the port coupled to the port g, -1 for outside ports.
+    partner = -np.ones(n, dtype=int)
+    partner[q[no:]] = q[no:][p]
+    outside = partner < 0
+    # Where each port sits in the static or in the dynamic list.
+    is_static = np.zeros(n, dtype=bool)
+    is_static[static] = True
+    position = np.empty(n, dtype=int)
+    position[static] = np.arange(ns)
+    position[dynamic] = np.arange(nd)
+    static_partner = partner[static]
+    dynamic_partner = partner[dynamic]
+    ss = np.nonzero(~outside[static] & is_static[static_partner])[0]
+    sd = np.nonzero(~outside[static] & ~is_static[static_partner])[0]
+    dd = np.nonzero(~outside[dynamic] & ~is_static[dynamic_partner])[0]
+    ds = np.nonzero(~outside[dynamic] & is_static[dynamic_partner])[0]
+    Sst = solver.GatherNetworks([network for network in networks if network is not None])
+    # Sst.Pi moves column i of Sst to the column of the partner of i.
+    SstPss = np.zeros((ns, ns), dtype=complex)
+    SstPss[:, position[static_partner[ss]]] = Sst[:, ss]
+    SstPsd = np.zeros((ns, nd), dtype=complex)
+    SstPsd[:, position[static_partner[sd]]] = Sst[:, sd]
+    Peff = np.zeros((nd, nd), dtype=complex)
+    Peff[dd, position[dynamic_partner[dd]]] = 1
+    LU = solver.FactorizeSiiP(SstPss)
+    if LU is None:
+        X = np.zeros((0, nd), dtype=complex)
+    else:
+        X = scipy.linalg.lu_solve(LU, SstPsd)
+        Peff[ds, :] += X[position[dynamic_partner[ds]], :]
+    return StaticReduction(n=n, static=static, dynamic=dynamic, outside=outside,
+                           Sst=Sst, LU=LU, X=X, Peff=Peff,
+                           linked_dynamic=ds,
+                           linked_static=position[dynamic_partner[ds]])
+
+def SolveDynamicNetworks(reduction, dynamic):
+    Sdy = solver.GatherNetworksBatch(dynamic)
+    nd = len(reduction.dynamic)
+    if Sdy.shape[1:] != (nd, nd):
+        raise ValueError("The dynamic networks have %i ports, expected %i." % (Sdy.shape[1], nd))
+    K = np.identity(nd, dtype=complex) - np.matmul(Sdy, reduction.Peff)
+    return Sdy, K
+
+def SolveExcitations(reduction, (Sdy, K), a, c):
+    """b for excitations stacked as (F, k, n) or (1, k, n): (F, k, n).
+
+    Each frequency factors K once for all its k excitations.
+
+    """
+    r = reduction
+    nf, nd = K.shape[:2]
+    a = np.where(r.outside, a, 0)  # Inside ports are fed by their partner.
+    a_S, c_S = a[..., r.static], c[..., r.static]
+    a_D, c_D = a[..., r.dynamic], c[..., r.dynamic]
+    u_S = a_S.dot(r.Sst.T) + c_S
+    if r.LU is not None:
+        shape = u_S.shape
+        u_S = scipy.linalg.lu_solve(r.LU, u_S.reshape(-1, shape[-1]).T).T.reshape(shape)
+    entering = np.zeros(u_S.shape[:-1] + (nd,), dtype=complex)
+    entering[..., r.linked_dynamic] = u_S[..., r.linked_static]
+    entering = entering + a_D
+    rhs = solver.BatchDot(Sdy[:, np.newaxis], entering) + c_D
+    rhs = np.broadcast_to(rhs, (nf,) + rhs.shape[1:])
+    if nd == 0:
+        b_D = rhs
+    else:
+        b_D = np.swapaxes(np.linalg.solve(K, np.swapaxes(rhs, -1, -2)), -1, -2)
+    b = np.empty(rhs.shape[:-1] + (r.n,), dtype=complex)
+    b[..., r.static] = u_S + b_D.dot(r.X.T)
+    b[..., r.dynamic] = b_D
+    return b
+
+def SolvebStatic(reduction, solvednetworks, a, c, columns=False):
+    """Same as SolvebBatch: a and c are (n,) or (F, n), the result is (F, n).
+
+    With `columns`, a and c are (n, k) or (F, n, k), one excitation per
+    column, and the result is (F, n, k).
+
+    """
+    a = np.asarray(a)
+    c = np.asarray(c)
+    if columns:
+        # Excitations along the second to last axis, frequencies first.
+        a = np.swapaxes(a, -1, -2).reshape((-1,) + a.shape[-1:] + a.shape[-2:-1])
+        c = np.swapaxes(c, -1, -2).reshape((-1,) + c.shape[-1:] + c.shape[-2:-1])
+        return np.swapaxes(SolveExcitations(reduction, solvednetworks, a, c), -1, -2)
+    a = a.reshape((-1, 1) + a.shape[-1:])
+    c = c.reshape((-1, 1) + c.shape[-1:])
+    return SolveExcitations(reduction, solvednetworks, a, c)[:, 0]
+
+def StaticSolver(n, couplings, networks):
+    """Batched solver that eliminates the static networks once.
+
+    networks: the frequency independent networks as (ni, ni) arrays or static
+    Network objects, with None in place of the networks that depend on the
+    frequency.  The returned function takes the list of these dynamic
+    networks, in order, as (F, ni, ni) stacks or Network objects, and the
+    frequencies, like for BatchSolver.  The solve function takes an extra
+    `columns` flag, see SolvebStatic.
+
+    """
+    solvedcouplings = solver.CompileCouplings(n, couplings)
+    for i, network in enumerate(networks):
+        if network is not None and not isinstance(network, np.ndarray) and network.dynamic:
+            raise ValueError("Network %i depends on the frequency, give None in its place." % i)
+    networks = [None if network is None else solver.EvaluateNetworks([network])[0]
+                for network in networks]
+    reductions = {}
+    def sendNetworks(dynamic, frequencies=None):
+        dynamic = solver.EvaluateNetworks(dynamic, frequencies)
+        sizes = tuple(network.shape[-1] for network in dynamic)
+        reduction = reductions.get(sizes)
+        if reduction is None:
+            reduction = SolveStaticNetworks(solvedcouplings, networks, sizes)
+            reductions[sizes] = reduction
+        solvednetworks = SolveDynamicNetworks(reduction, dynamic)
+        def solve(a, c, columns=False):
+            return SolvebStatic(reduction, solvednetworks, a, c, columns)
+        return solve
+    return sendNetworks
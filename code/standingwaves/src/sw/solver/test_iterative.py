@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+import solver
+import iterative
+import sw.networks as networks
+import sw.testing as testing
+
+def MakeChain(nb_networks, phase):
+    return testing.Chain(.8 * np.exp(1j * phase * np.arange(1, nb_networks + 1)))
+
+class TestIterativeSolver(unittest.TestCase):
+    def sweep(self, method):
+        n, couplings, _ = MakeChain(20, 0)
+        isolver = iterative.IterativeSolver(n, couplings, method=method, window=8)
+        a = np.zeros(n)
+        a[0] = 1
+        c = np.zeros(n)
+        for phase in np.linspace(1, 1.01, 10):
+            _, _, networks = MakeChain(20, phase)
+            b = isolver.solve(networks, a, c)
+            e = solver.Solver(n, couplings)(networks)(a, c)
+            self.assertTrue(np.allclose(b, e))
+            info = isolver.history[0]
+            self.assertTrue(info.residual < 1e-8)
+        return isolver
+    def testGMRES(self):
+        self.sweep("gmres")
+    def testBiCGSTAB(self):
+        self.sweep("bicgstab")
+    def testPreconditionerWindow(self):
+        n, couplings, networks = MakeChain(5, 1)
+        isolver = iterative.IterativeSolver(n, couplings, window=2)
+        a = np.zeros(n)
+        a[0] = 1
+        refactored = []
+        for _ in xrange(5):
+            isolver.solve(networks, a, a)
+            refactored.append(isolver.history[0].refactored)
+        self.assertEquals(refactored, [True, False, True, False, True])
+    def testNoConvergence(self):
+        # Too few iterations allowed: falls back to the direct solve.
+        n, couplings, networks = MakeChain(20, 1)
+        isolver = iterative.IterativeSolver(n, couplings, maxiter=1, window=100)
+        a = np.zeros(n)
+        a[0] = 1
+        c = np.zeros(n)
+        isolver.solve(networks, a, c)
+        _, _, networks = MakeChain(20, 2)
+        b = isolver.solve(networks, a, c)
+        self.assertTrue(isolver.history[0].refactored)
+        e = solver.Solver(n, couplings)(networks)(a, c)
+        self.assertTrue(np.allclose(b, e))
+    def testProducts(self):
+        # Both methods count the products by M, within the same budget.
+        n, couplings, _ = MakeChain(20, 0)
+        _, _, networks = MakeChain(20, 1)
+        a = np.zeros(n)
+        a[0] = 1
+        for method in ("gmres", "bicgstab"):
+            isolver = iterative.IterativeSolver(n, couplings, method=method, maxiter=10)
+            isolver.solve(MakeChain(20, 1.001)[2], a, a)
+            isolver.solve(networks, a, a)
+            info = isolver.history[0]
+            self.assertFalse(info.refactored)
+            self.assertTrue(0 < info.iterations <= 10)
+        self.assertEquals(iterative.Budget("gmres", 50), {"restart": 20, "maxiter": 3})
+        self.assertEquals(iterative.Budget("bicgstab", 50), {"maxiter": 25})
+    def testSeveralExcitations(self):
+        n, couplings, networks = MakeChain(5, 1)
+        isolver = iterative.IterativeSolver(n, couplings)
+        a = np.zeros((n, 2))
+        a[0, 0] = 1
+        a[n - 1, 1] = 1
+        c = np.zeros((n, 2))
+        b = isolver.solve(networks, a, c)
+        e = solver.Solver(n, couplings)(networks)(a, c)
+        self.assertTrue(np.allclose(b, e))
+        self.assertEquals(len(isolver.history), 2)
+    def testNetworkObjects(self):
+        mirror = networks.StaticNetwork(testing.Mirror(), dimensions=1)
+        objects = [mirror, networks.Distance1Network(1, .5), mirror]
+        isolver = iterative.IterativeSolver(6, testing.CAVITY_COUPLINGS)
+        a = np.array([1, 0, 0, 0, 0, 0])
+        b = isolver.solve(objects, a, a, 500e9)
+        arrays = testing.Cavity(networks.Distance1(1, .5, 500e9))
+        e = solver.Solver(6, testing.CAVITY_COUPLINGS)(arrays)(a, a)
+        self.assertTrue(np.allclose(b, e))
+    def testUnknownMethod(self):
+        self.assertRaises(ValueError, iterative.IterativeSolver, 2, [], method="cg")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import numpy as np
+import solver
+import neumann
+import sw.networks as networks
+import sw.testing as testing
+
+def MakeCavity(nf, r):
+    networks = testing.Cavity(testing.SpaceSweep(nf), testing.LosslessMirror(r))
+    return testing.CAVITY_N, testing.CAVITY_COUPLINGS, networks
+
+class TestNeumannSolver(unittest.TestCase):
+    def setUp(self):
+        self.a = np.array([1, 0, 0, 0, 0, 0])
+        self.c = np.array([0, 0, 0, 0, 0, .5])
+    def compare(self, r):
+        n, couplings, networks = MakeCavity(7, r)
+        b = neumann.NeumannSolver(n, couplings)(networks)(self.a, self.c)
+        e = solver.BatchSolver(n, couplings)(networks)(self.a, self.c)
+        self.assertTrue(np.allclose(b, e))
+    def testWeakReflections(self):
+        self.compare(.1)
+    def testStrongReflections(self):
+        # Falls back to the direct solve.
+        self.compare(.99)
+    def testOrders(self):
+        n, couplings, networks = MakeCavity(3, .3)
+        solve = neumann.NeumannSolver(n, couplings)(networks)
+        orders = solve(self.a, self.c, orders=True)
+        self.assertEquals(orders.shape[1:], (3, n))
+        self.assertTrue(np.allclose(orders.sum(axis=0), solve(self.a, self.c)))
+        # No remainder: the series converged everywhere.
+        self.assertTrue(np.allclose(orders[-1], 0))
+        # Zero bounce: direct reflection on the first mirror only.
+        self.assertTrue(np.allclose(orders[0, :, 0], -.3))
+        # Port 5 first sees the source c, then the transmission after one pass.
+        self.assertTrue(np.allclose(orders[0, :, 5], .5))
+    def testOrdersWithFallback(self):
+        n, couplings, networks = MakeCavity(3, .99)
+        solve = neumann.NeumannSolver(n, couplings, max_order=5)(networks)
+        orders = solve(self.a, self.c, orders=True)
+        e = solver.BatchSolver(n, couplings)(networks)(self.a, self.c)
+        self.assertTrue(np.allclose(orders.sum(axis=0), e))
+        self.assertFalse(np.allclose(orders[-1], 0))
+    def testNetworkObjects(self):
+        frequencies = np.linspace(500e9, 501e9, 4)
+        mirror = networks.StaticNetwork(testing.Mirror(.1), dimensions=1)
+        objects = [mirror, networks.Distance1Network(1, .5), mirror]
+        b = neumann.NeumannSolver(6, testing.CAVITY_COUPLINGS)(objects, frequencies)(self.a, self.c)
+        arrays = testing.Cavity(networks.Distance1(1, .5, frequencies), testing.Mirror(.1))
+        e = solver.BatchSolver(6, testing.CAVITY_COUPLINGS)(arrays)(self.a, self.c)
+        self.assertTrue(np.allclose(b, e))
+    def testNoInside(self):
+        network = np.array([[.1, .5],
+                            [.5, 0]])
+        solve = neumann.NeumannSolver(2, [])([network])
+        b = solve(np.array([1, 0]), np.array([0, 3]))
+        self.assertTrue(np.allclose(b, np.array([[.1, 3.5]])))
+        orders = solve(np.array([1, 0]), np.array([0, 3]), orders=True)
+        self.assertEquals(orders.shape, (2, 1, 2))
+
+class TestNeumannSeries(unittest.TestCase):
+    def testGeometric(self):
+        SiiP = np.array([[[.5]]])
+        x = np.array([[1.]])
+        total, converged, terms = neumann.NeumannSeries(SiiP, x, 1e-3, 100, .9, keep=True)
+        self.assertTrue(converged.all())
+        self.assertTrue(np.allclose(terms[:, 0, 0], .5 ** np.arange(len(terms))))
+        self.assertTrue(np.allclose(total, terms.sum(axis=0)))
+        self.assertEquals(neumann.NeumannSeries(SiiP, x, 1e-3, 100, .9)[2], None)
+    def testStoppedFrequencies(self):
+        # The first frequency converges at once, the second one keeps going.
+        SiiP = np.array([[[1e-9]], [[.5]]])
+        x = np.array([[1.], [1.]])
+        total, converged, terms = neumann.NeumannSeries(SiiP, x, 1e-6, 100, .9, keep=True)
+        self.assertTrue(converged.all())
+        self.assertTrue(np.allclose(total[:, 0], [1 + 1e-9, 2]))
+        self.assertTrue(np.array_equal(terms[2:, 0], np.zeros((len(terms) - 2, 1))))
+    def testDiverging(self):
+        SiiP = np.array([[[.95]]])
+        x = np.array([[1.]])
+        _, converged, _ = neumann.NeumannSeries(SiiP, x, 1e-12, 100, .9)
+        self.assertFalse(converged.any())
+
+if __name__ == "__main__":
+    unittest.main()
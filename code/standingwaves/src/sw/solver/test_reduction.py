@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import solver
+import reduction
+import sw.networks as networks
+import sw.testing as testing
+
+class TestSubnetwork(unittest.TestCase):
+    def setUp(self):
+        #    0 [mirror] 1  -  2 [space] 3  -  4 [mirror] 5
+        self.networks = testing.Cavity(testing.Space(.8j))
+        self.couplings = testing.CAVITY_COUPLINGS
+    def testExternalPorts(self):
+        plan = solver.CompileCouplings(6, self.couplings)
+        self.assertTrue(np.array_equal(reduction.ExternalPorts(plan), [0, 5]))
+    def testMatchesSolver(self):
+        Sext = reduction.Subnetwork(6, self.couplings)(self.networks)
+        self.assertEquals(Sext.shape, (2, 2))
+        solve = solver.Solver(6, self.couplings)(self.networks)
+        c = np.zeros(6)
+        for i, port in enumerate([0, 5]):
+            a = np.zeros(6)
+            a[port] = 1
+            b = solve(a, c)
+            self.assertTrue(np.allclose(Sext[:, i], b[[0, 5]]))
+    def testSparse(self):
+        dense = reduction.Subnetwork(6, self.couplings, sparse=False)(self.networks)
+        sparse = reduction.Subnetwork(6, self.couplings, sparse=True)(self.networks)
+        self.assertTrue(np.allclose(dense, sparse))
+    def testSymmetric(self):
+        lu = reduction.Subnetwork(6, self.couplings, symmetric=False)(self.networks)
+        ldl = reduction.Subnetwork(6, self.couplings, symmetric=True)(self.networks)
+        self.assertTrue(np.allclose(lu, ldl))
+    def testHierarchical(self):
+        # Flat bench: the cavity followed by a load.
+        black = np.array([[.1]])
+        flat = solver.Solver(7, self.couplings + [{5, 6}])(self.networks + [black])
+        a = np.array([1, 0, 0, 0, 0, 0, 0])
+        c = np.zeros(7)
+        b = flat(a, c)
+        # Same bench with the cavity reduced to a two-port.
+        cavity = reduction.Subnetwork(6, self.couplings)(self.networks)
+        nested = solver.Solver(3, [{1, 2}])([cavity, black])
+        b_nested = nested(a[[0, 5, 6]], c[[0, 5, 6]])
+        self.assertTrue(np.allclose(b_nested, b[[0, 5, 6]]))
+    def testNetworkObjects(self):
+        mirror = networks.StaticNetwork(testing.Mirror(), dimensions=1)
+        objects = [mirror, networks.Distance1Network(1, .5), mirror]
+        Sext = reduction.Subnetwork(6, self.couplings)(objects, 500e9)
+        e = reduction.Subnetwork(6, self.couplings)(testing.Cavity(networks.Distance1(1, .5, 500e9)))
+        self.assertTrue(np.allclose(Sext, e))
+    def testNoInside(self):
+        mirror = testing.Mirror()
+        Sext = reduction.Subnetwork(2, [])([mirror])
+        self.assertTrue(np.allclose(Sext, mirror))
+
+class TestSubnetworkBatch(unittest.TestCase):
+    def setUp(self):
+        self.mirror = testing.Mirror()
+        self.space = .8 * testing.SpaceSweep(4)
+        self.couplings = testing.CAVITY_COUPLINGS
+    def testMatchesSubnetwork(self):
+        Sext = reduction.SubnetworkBatch(6, self.couplings)([self.mirror, self.space, self.mirror])
+        self.assertEquals(Sext.shape, (4, 2, 2))
+        reduce = reduction.Subnetwork(6, self.couplings)
+        for i in xrange(4):
+            e = reduce([self.mirror, self.space[i], self.mirror])
+            self.assertTrue(np.allclose(Sext[i], e))
+    def testReciprocal(self):
+        Sext = reduction.SubnetworkBatch(6, self.couplings)([self.mirror, self.space, self.mirror])
+        self.assertTrue(np.allclose(Sext, np.swapaxes(Sext, 1, 2)))
+    def testNoInside(self):
+        Sext = reduction.SubnetworkBatch(4, [])([self.mirror, self.space[0]])
+        self.assertEquals(Sext.shape, (1, 4, 4))
+        self.assertTrue(np.allclose(Sext[0, :2, :2], self.mirror))
+
+if __name__ == "__main__":
+    unittest.main()
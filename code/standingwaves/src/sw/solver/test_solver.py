@@ -1,7 +1,11 @@
 import unittest
 import numpy as np
+import pickle
 import scipy.linalg
+import scipy.sparse.linalg
 import solver
+import sw.networks as networks
+import sw.testing as testing
 
 class TestExpandCouplingsTo3d(unittest.TestCase):
     def testTrippleSize(self):
@@ -10,6 +14,12 @@ class TestExpandCouplingsTo3d(unittest.TestCase):
         expected = [{30, 60}, {31, 61}, {32, 62}, {90, 120}, {91, 121}, {92, 122}]
         self.assertTrue(all((c == e for c, e in zip(couplings3d, expected))))
 
+class TestExpandCouplingsTo2d(unittest.TestCase):
+    def testDoubleSize(self):
+        couplings2d = solver.ExpandCouplingsTo2d([{10, 20}, {40, 30}])
+        expected = [{20, 40}, {21, 41}, {60, 80}, {61, 81}]
+        self.assertEquals(couplings2d, expected)
+
 class TestFindInside(unittest.TestCase):
     def testSane(self):
         couplings = [{1, 2}, {3, 4}]
@@ -46,7 +56,9 @@ class TestSeparateInsideOutside(unittest.TestCase):
         inside = {1, 2, 3, 4}
         outside = {0, 5}
         n = 6
-        Q = solver.SeparateInsideOutside(inside, outside, n)
+        q = solver.SeparateInsideOutside(inside, outside, n)
+        self.assertTrue(np.array_equal(q, np.array([0, 5, 1, 2, 3, 4])))
+        Q = np.identity(n)[q]
         E = np.array([[1, 0, 0, 0, 0, 0],
                       [0, 0, 0, 0, 0, 1],
                       [0, 1, 0, 0, 0, 0],
@@ -58,7 +70,7 @@ class TestSeparateInsideOutside(unittest.TestCase):
         inside = set([])
         outside = {0, 1, 2}
         n = 3
-        Q = solver.SeparateInsideOutside(inside, outside, n)
+        Q = np.identity(n)[solver.SeparateInsideOutside(inside, outside, n)]
         E = np.array([[1, 0, 0],
                       [0, 1, 0],
                       [0, 0, 1]])
@@ -67,7 +79,7 @@ class TestSeparateInsideOutside(unittest.TestCase):
         inside = {0, 1, 2}
         outside = set([])
         n = 3
-        Q = solver.SeparateInsideOutside(inside, outside, n)
+        Q = np.identity(n)[solver.SeparateInsideOutside(inside, outside, n)]
         E = np.array([[1, 0, 0],
                       [0, 1, 0],
                       [0, 0, 1]])
@@ -76,14 +88,16 @@ class TestSeparateInsideOutside(unittest.TestCase):
         inside = set([])
         outside = set([])
         n = 0
-        Q = solver.SeparateInsideOutside(inside, outside, n)
-        self.assertEquals(Q.shape, (0, 0))
+        q = solver.SeparateInsideOutside(inside, outside, n)
+        self.assertEquals(q.shape, (0,))
 
 class TestCoupleInputsToOutputs(unittest.TestCase):
     def testSane(self):
         couplings = [{1, 2}, {3, 4}]
         inside = {1, 2, 3, 4}
-        P = solver.CoupleInputsToOutputs(inside, couplings)
+        p = solver.CoupleInputsToOutputs(inside, couplings)
+        self.assertTrue(np.array_equal(p, np.array([1, 0, 3, 2])))
+        P = np.identity(len(inside))[p]
         E = np.array([[0, 1, 0, 0],
                       [1, 0, 0, 0],
                       [0, 0, 0, 1],
@@ -92,8 +106,8 @@ class TestCoupleInputsToOutputs(unittest.TestCase):
     def testNoInside(self):
         couplings = []
         inside = set([])
-        P = solver.CoupleInputsToOutputs(inside, couplings)
-        self.assertEquals(P.shape, (0, 0))
+        p = solver.CoupleInputsToOutputs(inside, couplings)
+        self.assertEquals(p.shape, (0,))
 
 class TestGatherNetworks(unittest.TestCase):
     def testSane(self):
@@ -216,6 +230,253 @@ class TestSeparateMatrixRegions(unittest.TestCase):
         self.assertTrue(np.array_equal(S1io, E))
         self.assertTrue(np.array_equal(S1ii, E))
 
+class TestCompileCouplings(unittest.TestCase):
+    def setUp(self):
+        solver.plan_cache.clear()
+    def testReuse(self):
+        plan1 = solver.CompileCouplings(6, [{1, 2}, {3, 4}])
+        plan2 = solver.CompileCouplings(6, [{4, 3}, {2, 1}])
+        self.assertTrue(plan1 is plan2)
+        info = solver.plan_cache.info()
+        self.assertEquals((info.hits, info.misses), (1, 1))
+    def testDifferentTopologies(self):
+        plan1 = solver.CompileCouplings(6, [{1, 2}, {3, 4}])
+        plan2 = solver.CompileCouplings(7, [{1, 2}, {3, 4}])
+        self.assertFalse(plan1 is plan2)
+        self.assertEquals(solver.plan_cache.info().misses, 2)
+    def testInsane(self):
+        self.assertRaises(ValueError, solver.CompileCouplings, 2, [{1, 2}])
+        self.assertEquals(solver.plan_cache.info().size, 0)
+    def testReadOnly(self):
+        p, q, _ = solver.CompileCouplings(4, [{1, 2}])
+        self.assertFalse(p.flags.writeable)
+        self.assertFalse(q.flags.writeable)
+
+class TestCompilePairs(unittest.TestCase):
+    def testMatchesCompileCouplings(self):
+        solver.plan_cache.clear()
+        p, q, no = solver.CompilePairs(7, [5, 1], [2, 3])
+        e = solver.SolveCouplings([{5, 2}, {1, 3}], 7)
+        self.assertTrue(np.array_equal(p, e[0]))
+        self.assertTrue(np.array_equal(q, e[1]))
+        self.assertEquals(no, e[2])
+        self.assertTrue(solver.CompileCouplings(7, [{3, 1}, {2, 5}])[0] is p)
+    def testInsane(self):
+        self.assertRaises(ValueError, solver.CompilePairs, 4, [0, 1], [1, 2])
+        self.assertRaises(ValueError, solver.CompilePairs, 4, [0], [4])
+
+class TestCompiledSolver(unittest.TestCase):
+    def setUp(self):
+        self.networks = [np.array([[.1, .5],
+                                   [.5, 0]]),
+                         np.array([[0, .4],
+                                   [.4, 0]])]
+        self.a = np.array([1, 0, 0, 0])
+        self.c = np.array([0, 3, 0, 0])
+        self.e = np.array([.1, 3.5, 0, 1.4])
+    def testSane(self):
+        compiled = solver.CompiledSolver(4, [{1, 2}])
+        b = compiled.factor(self.networks).solve(self.a, self.c)
+        self.assertTrue(np.allclose(b, self.e))
+    def testNotFactored(self):
+        compiled = solver.CompiledSolver(4, [{1, 2}])
+        self.assertRaises(ValueError, compiled.solve, self.a, self.c)
+    def testPickleUnfactored(self):
+        compiled = pickle.loads(pickle.dumps(solver.CompiledSolver(4, [{1, 2}]), 2))
+        b = compiled.factor(self.networks).solve(self.a, self.c)
+        self.assertTrue(np.allclose(b, self.e))
+    def testPickleFactored(self):
+        compiled = solver.CompiledSolver(4, [{1, 2}], sparse=False).factor(self.networks)
+        for protocol in (0, 2):
+            clone = pickle.loads(pickle.dumps(compiled, protocol))
+            self.assertTrue(np.allclose(clone.solve(self.a, self.c), self.e))
+    def testPickleSparseDropsFactorization(self):
+        compiled = solver.CompiledSolver(4, [{1, 2}], sparse=True).factor(self.networks)
+        clone = pickle.loads(pickle.dumps(compiled, 2))
+        self.assertRaises(ValueError, clone.solve, self.a, self.c)
+        b = clone.factor(self.networks).solve(self.a, self.c)
+        self.assertTrue(np.allclose(b, self.e))
+    def testSolverKeepsEarlierFactorizations(self):
+        presolve = solver.Solver(4, [{1, 2}])
+        solve1 = presolve(self.networks)
+        presolve([np.zeros((2, 2)), np.zeros((2, 2))])
+        self.assertTrue(np.allclose(solve1(self.a, self.c), self.e))
+
+class TestNetworkObjects(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        def mirror(frequency):
+            self.calls.append(frequency)
+            return np.array([[.1, .5],
+                             [.5, 0]])
+        def space(frequency):
+            g = .4 * np.exp(1j * np.asarray(frequency))
+            S = np.zeros(np.shape(g) + (2, 2), dtype=complex)
+            S[..., 0, 1] = S[..., 1, 0] = g
+            return S
+        self.mirror = networks.Network(mirror, 2, 2, dynamic=False)
+        self.space = networks.Network(space, 2, 2)
+        self.a = np.array([1, 0, 0, 0])
+        self.c = np.array([0, 3, 0, 0])
+    def testStaticBlocksGatheredOnce(self):
+        compiled = solver.CompiledSolver(4, [{1, 2}], sparse=False)
+        for frequency in (.1, .2, .3):
+            b = compiled.factor([self.mirror, self.space], frequency).solve(self.a, self.c)
+            e = solver.Solver(4, [{1, 2}])([self.mirror.S(), self.space.S(frequency)])(self.a, self.c)
+            self.assertTrue(np.allclose(b, e))
+        self.assertEquals(len(self.calls), 1)
+    def testSolver(self):
+        b = solver.Solver(4, [{1, 2}])([self.mirror, self.space], .2)(self.a, self.c)
+        e = solver.Solver(4, [{1, 2}])([self.mirror.S(), self.space.S(.2)])(self.a, self.c)
+        self.assertTrue(np.allclose(b, e))
+    def testOtherNetworksRegathered(self):
+        compiled = solver.CompiledSolver(4, [{1, 2}], sparse=False)
+        compiled.factor([self.mirror, self.space], .1)
+        other = networks.StaticNetwork(np.array([[0, .3], [.3, 0]]), dimensions=1)
+        b = compiled.factor([self.mirror, other]).solve(self.a, self.c)
+        e = solver.Solver(4, [{1, 2}])([self.mirror.S(), other.S()])(self.a, self.c)
+        self.assertTrue(np.allclose(b, e))
+    def testSparse(self):
+        compiled = solver.CompiledSolver(4, [{1, 2}], sparse=True)
+        b = compiled.factor([self.mirror, self.space], .1).solve(self.a, self.c)
+        e = solver.CompiledSolver(4, [{1, 2}], sparse=False).factor([self.mirror, self.space], .1).solve(self.a, self.c)
+        self.assertTrue(np.allclose(b, e))
+    def testBatch(self):
+        frequencies = np.array([.1, .2, .3])
+        b = solver.BatchSolver(4, [{1, 2}])([self.mirror, self.space], frequencies)(self.a, self.c)
+        compiled = solver.CompiledSolver(4, [{1, 2}])
+        for i, frequency in enumerate(frequencies):
+            e = compiled.factor([self.mirror, self.space], frequency).solve(self.a, self.c)
+            self.assertTrue(np.allclose(b[i], e))
+
+def ReciprocalChain(count, randomizer):
+    """count random symmetric 2-ports chained: 0 [0] 1 - 2 [1] 3 - ..."""
+    networks = []
+    for _ in xrange(count):
+        S = .6 * (randomizer.normal(size=(2, 2)) + 1j * randomizer.normal(size=(2, 2)))
+        networks.append((S + S.T) / 2)
+    couplings = [{2 * i + 1, 2 * i + 2} for i in xrange(count - 1)]
+    return 2 * count, couplings, networks
+
+class TestSymmetric(unittest.TestCase):
+    def setUp(self):
+        randomizer = np.random.RandomState(0)
+        self.n, self.couplings, self.networks = ReciprocalChain(40, randomizer)
+        self.a = np.zeros((self.n, 2))
+        self.a[0, 0] = self.a[-1, 1] = 1
+        self.c = randomizer.normal(size=(self.n, 2))
+    def testMatchesLU(self):
+        lu = solver.Solver(self.n, self.couplings, sparse=False, symmetric=False)(self.networks)
+        ldl = solver.Solver(self.n, self.couplings, sparse=False, symmetric=True)(self.networks)
+        self.assertTrue(np.allclose(ldl(self.a, self.c), lu(self.a, self.c)))
+        self.assertTrue(np.allclose(ldl(self.a[:, 0], self.c[:, 0]), lu(self.a[:, 0], self.c[:, 0])))
+    def testFactorization(self):
+        compiled = solver.CompiledSolver(self.n, self.couplings, sparse=False, symmetric=True)
+        LU = compiled.factor(self.networks).solvednetworks[3]
+        self.assertTrue(isinstance(LU, solver.LDLFactor))
+        clone = pickle.loads(pickle.dumps(compiled, 2))
+        self.assertTrue(np.allclose(clone.solve(self.a, self.c), compiled.solve(self.a, self.c)))
+    def testDetection(self):
+        m = solver.SYMMETRIC_THRESHOLD
+        S = np.random.RandomState(1).normal(size=(m, m))
+        self.assertTrue(solver.UseSymmetric(S + S.T, None))
+        self.assertFalse(solver.UseSymmetric(S, None))
+        self.assertFalse(solver.UseSymmetric(S + S.T, False))
+        small = (S + S.T)[:10, :10]
+        self.assertFalse(solver.UseSymmetric(small, None))
+        self.assertTrue(solver.UseSymmetric(small, True))
+        self.assertFalse(solver.UseSymmetric(np.zeros((0, 0)), True))
+    def testLarge(self):
+        randomizer = np.random.RandomState(2)
+        n, couplings, networks = ReciprocalChain(solver.SYMMETRIC_THRESHOLD // 2 + 2, randomizer)
+        compiled = solver.CompiledSolver(n, couplings, sparse=False)
+        self.assertTrue(isinstance(compiled.factor(networks).solvednetworks[3], solver.LDLFactor))
+        a = np.zeros(n)
+        a[0] = 1
+        lu = solver.Solver(n, couplings, sparse=False, symmetric=False)(networks)
+        self.assertTrue(np.allclose(compiled.solve(a, np.zeros(n)), lu(a, np.zeros(n))))
+
+    def testBackend(self):
+        n, couplings, networks = ReciprocalChain(solver.SPARSE_THRESHOLD, np.random.RandomState(3))
+        ldl = solver.CompiledSolver(n, couplings, symmetric=True).factor(networks)
+        self.assertFalse(ldl.sparse)
+        self.assertTrue(isinstance(ldl.solvednetworks[3], solver.LDLFactor))
+        lu = solver.CompiledSolver(n, couplings).factor(networks)
+        self.assertTrue(isinstance(lu.solvednetworks[3], scipy.sparse.linalg.SuperLU))
+        a = np.zeros(n)
+        a[0] = 1
+        self.assertTrue(np.allclose(ldl.solve(a, np.zeros(n)), lu.solve(a, np.zeros(n))))
+        self.assertRaises(ValueError, solver.CompiledSolver, n, couplings, sparse=True, symmetric=True)
+
+# testing.Cavity with 3D ports.
+SEPARABLE_COUPLINGS = solver.ExpandCouplingsTo3d(testing.CAVITY_COUPLINGS)
+
+def Axes(x, y, z):
+    """3D network of the scalar networks of each axis."""
+    return sum(np.kron(S, np.diag(np.identity(3)[axis])) for axis, S in enumerate((x, y, z)))
+
+def SeparableCavity(ry):
+    mirror, space, _ = testing.Cavity(testing.Space(.5j))
+    return [Axes(mirror, mirror * ry, mirror), Axes(space, space, space), Axes(mirror, mirror, mirror)]
+
+class TestSeparable(unittest.TestCase):
+    def setUp(self):
+        randomizer = np.random.RandomState(0)
+        self.a = randomizer.normal(size=(18, 2))
+        self.c = randomizer.normal(size=(18, 2))
+    def testAxisCouplings(self):
+        self.assertEquals(solver.AxisCouplings(18, SEPARABLE_COUPLINGS), [{1, 2}, {3, 4}])
+        self.assertEquals(solver.AxisCouplings(6, [{1, 2}, {3, 4}]), None)
+        self.assertEquals(solver.AxisCouplings(6, [{0, 3}, {1, 5}]), None)
+        self.assertEquals(solver.AxisCouplings(7, []), None)
+    def check(self, networks, groups):
+        compiled = solver.CompiledSolver(18, SEPARABLE_COUPLINGS).factor(networks)
+        full = solver.CompiledSolver(18, SEPARABLE_COUPLINGS, separable=False).factor(networks)
+        if groups is None:
+            self.assertFalse(isinstance(compiled.solvednetworks, solver.Separated))
+        else:
+            self.assertEquals(compiled.solvednetworks.groups, groups)
+        self.assertTrue(np.allclose(compiled.solve(self.a, self.c), full.solve(self.a, self.c)))
+        self.assertTrue(np.allclose(compiled.solve(self.a[:, 0], self.c[:, 0]),
+                                    full.solve(self.a[:, 0], self.c[:, 0])))
+        return compiled
+    def testIsotropic(self):
+        self.check(SeparableCavity(1), [(0, 1, 2)])
+    def testAnisotropic(self):
+        self.check(SeparableCavity(-.5), [(0, 2), (1,)])
+    def testMixing(self):
+        networks = SeparableCavity(1)
+        networks[0] = networks[0].copy()
+        networks[0][0, 1] = .1
+        self.check(networks, None)
+    def testPickle(self):
+        compiled = self.check(SeparableCavity(-.5), [(0, 2), (1,)])
+        clone = pickle.loads(pickle.dumps(compiled, 2))
+        self.assertTrue(np.allclose(clone.solve(self.a, self.c), compiled.solve(self.a, self.c)))
+        self.assertTrue(np.allclose(compiled.copy().factor(SeparableCavity(1)).solve(self.a, self.c),
+                                    self.check(SeparableCavity(1), [(0, 1, 2)]).solve(self.a, self.c)))
+
+    def checkChain(self, count, sparse):
+        # Isotropic 3D chain of more than SPARSE_THRESHOLD inside ports.
+        n, couplings, networks = testing.Chain(np.exp(.1j * np.arange(count)))
+        networks = [np.kron(S, np.identity(3)) for S in networks]
+        couplings = solver.ExpandCouplingsTo3d(couplings)
+        compiled = solver.CompiledSolver(3 * n, couplings).factor(networks)
+        self.assertTrue(compiled.sparse)
+        self.assertEquals(compiled.solvednetworks.groups, [(0, 1, 2)])
+        LU = compiled.solvednetworks.solved[0][3]
+        self.assertEquals(isinstance(LU, scipy.sparse.linalg.SuperLU), sparse)
+        a = np.zeros((3 * n, 2))
+        a[0, 0] = a[-1, 1] = 1
+        full = solver.CompiledSolver(3 * n, couplings, separable=False).factor(networks)
+        self.assertTrue(np.allclose(compiled.solve(a, 0 * a), full.solve(a, 0 * a)))
+        return compiled
+    def testDefaultDense(self):
+        self.checkChain(solver.SPARSE_THRESHOLD // 2, False)
+    def testDefaultSparse(self):
+        compiled = self.checkChain(solver.SPARSE_THRESHOLD, True)
+        self.assertTrue(pickle.loads(pickle.dumps(compiled, 2)).solvednetworks is None)
+
 class TestSolve(unittest.TestCase):
     def testSane(self):
         network1 = np.array([[.1, .5],
@@ -260,6 +521,24 @@ class TestSolve(unittest.TestCase):
         # Port 1: same, starting with 0.1.
         e = np.array([1.01010101010101010101, 0.101010101010101010101])
         self.assertTrue(np.allclose(b, e))
+    def testSeveralExcitations(self):
+        network1 = np.array([[.1, .5],
+                             [.5, 0]])
+        network2 = np.array([[0, .4],
+                             [.4, 0]])
+        solve = solver.Solver(4, [{1, 2}])([network1, network2])
+        a = np.array([[1, 0, 0],
+                      [0, 0, 0],
+                      [0, 0, 0],
+                      [0, 2, 0]])
+        c = np.array([[0, 0, 0],
+                      [3, 0, 0],
+                      [0, 0, 0],
+                      [0, 0, 1]])
+        b = solve(a, c)
+        self.assertEquals(b.shape, (4, 3))
+        for i in xrange(3):
+            self.assertTrue(np.allclose(b[:, i], solve(a[:, i], c[:, i])))
     def testNothing(self):
         networks = []
         couplings = []
@@ -271,6 +550,84 @@ class TestSolve(unittest.TestCase):
         b = solvedNetworks(a, c)
         self.assertTrue(np.array_equal(b, np.zeros(shape=(0,))))
 
+class TestSolveSparse(unittest.TestCase):
+    def testMatchesDense(self):
+        # A chain of two-port networks, longer than what the dense solver likes.
+        nb_networks = 40
+        gains = np.exp(1j * np.arange(nb_networks))
+        networks = [np.array([[.3, .8 * g],
+                              [.8 * g, -.3]]) for g in gains]
+        couplings = [{2 * i + 1, 2 * i + 2} for i in xrange(nb_networks - 1)]
+        n = 2 * nb_networks
+        a = np.zeros(n)
+        a[0] = 1
+        c = np.zeros(n)
+        c[n - 1] = .5
+        dense = solver.Solver(n, couplings, sparse=False)(networks)(a, c)
+        sparse = solver.Solver(n, couplings, sparse=True)(networks)(a, c)
+        self.assertTrue(np.allclose(dense, sparse))
+    def testSane(self):
+        networks = [np.array([[.1, .5],
+                              [.5, 0]]),
+                    np.array([[0, .4],
+                              [.4, 0]])]
+        solve = solver.Solver(4, [{1, 2}], sparse=True)(networks)
+        b = solve(np.array([1, 0, 0, 0]), np.array([0, 3, 0, 0]))
+        self.assertTrue(np.allclose(b, np.array([.1, 3.5, 0, 1.4])))
+    def testNoOutside(self):
+        networks = [np.array([[.1]]), np.array([[.1]])]
+        solve = solver.Solver(2, [{0, 1}], sparse=True)(networks)
+        b = solve(np.array([0, 0]), np.array([1, 0]))
+        e = np.array([1.01010101010101010101, 0.101010101010101010101])
+        self.assertTrue(np.allclose(b, e))
+    def testNoInside(self):
+        networks = [np.array([[.1, .5],
+                              [.5, 0]])]
+        solve = solver.Solver(2, [], sparse=True)(networks)
+        b = solve(np.array([1, 0]), np.array([0, 3]))
+        self.assertTrue(np.allclose(b, np.array([.1, 3.5])))
+
+class TestSolveBatch(unittest.TestCase):
+    def MakeNetworks(self, nf):
+        return [testing.Mirror(), testing.SpaceSweep(nf), np.array([[.1]])]
+    def testMatchesSolver(self):
+        nf = 5
+        networks = self.MakeNetworks(nf)
+        couplings = [{1, 2}, {3, 4}]
+        n = 5
+        a = np.array([1, 0, 0, 0, 0])
+        c = np.array([0, 0, 0, 0, .5])
+        b = solver.BatchSolver(n, couplings)(networks)(a, c)
+        self.assertEquals(b.shape, (nf, n))
+        presolve = solver.Solver(n, couplings)
+        for i in xrange(nf):
+            frequency_networks = [network[i] if network.ndim == 3 else network
+                                  for network in networks]
+            e = presolve(frequency_networks)(a, c)
+            self.assertTrue(np.allclose(b[i], e))
+    def testPerFrequencyInputs(self):
+        nf = 3
+        networks = self.MakeNetworks(nf)
+        couplings = [{1, 2}, {3, 4}]
+        n = 5
+        a = np.zeros((nf, n))
+        a[:, 0] = [1, 2, 3]
+        c = np.zeros(n)
+        b = solver.BatchSolver(n, couplings)(networks)(a, c)
+        presolve = solver.Solver(n, couplings)
+        for i in xrange(nf):
+            e = presolve([networks[0], networks[1][i], networks[2]])(a[i], c)
+            self.assertTrue(np.allclose(b[i], e))
+    def testNoInside(self):
+        network1 = np.array([[[.1, .5],
+                              [.5, 0]]])
+        b = solver.BatchSolver(2, [])([network1])(np.array([1, 0]), np.array([0, 3]))
+        self.assertTrue(np.allclose(b, np.array([[.1, 3.5]])))
+    def testMismatchedFrequencies(self):
+        networks = [np.zeros((2, 1, 1)), np.zeros((3, 1, 1))]
+        presolve = solver.BatchSolver(2, [{0, 1}])
+        self.assertRaises(ValueError, presolve, networks)
+
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
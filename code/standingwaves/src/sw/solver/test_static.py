@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import solver
+import static
+import sw.networks as networks
+import sw.testing as testing
+
+class TestSplitStaticDynamic(unittest.TestCase):
+    def testSane(self):
+        networks = [np.zeros((1, 1)), None, np.zeros((2, 2))]
+        s, d, n = static.SplitStaticDynamic(networks, (3,))
+        self.assertTrue(np.array_equal(s, [0, 4, 5]))
+        self.assertTrue(np.array_equal(d, [1, 2, 3]))
+        self.assertEquals(n, 6)
+    def testWrongCount(self):
+        self.assertRaises(ValueError, static.SplitStaticDynamic, [None], (1, 2))
+
+class TestStaticSolver(unittest.TestCase):
+    def compare(self, n, couplings, networks, dynamic, a, c):
+        presolve = static.StaticSolver(n, couplings, networks)
+        b = presolve(dynamic)(a, c)
+        dynamic = iter(dynamic)
+        full = [next(dynamic) if network is None else network for network in networks]
+        e = solver.BatchSolver(n, couplings)(full)(a, c)
+        self.assertTrue(np.allclose(b, e))
+    def testCavity(self):
+        #    0 [mirror] 1  -  2 [space] 3  -  4 [mirror] 5  -  6 [black]
+        mirror = testing.Mirror()
+        black = np.array([[.1]])
+        networks = [mirror, None, mirror, black]
+        couplings = [{1, 2}, {3, 4}, {5, 6}]
+        a = np.array([1, 0, 0, 0, 0, 0, 0])
+        c = np.array([0, 0, .5, 0, 0, 0, .2])
+        self.compare(7, couplings, networks, [testing.SpaceSweep(4)], a, c)
+    def testDynamicOutside(self):
+        # The dynamic network also has an outside port.
+        mirror = testing.Mirror()
+        networks = [mirror, None]
+        a = np.zeros((3, 4))
+        a[:, 0] = 1
+        a[:, 3] = [1, 2, 3]
+        c = np.zeros(4)
+        self.compare(4, [{1, 2}], networks, [testing.SpaceSweep(3)], a, c)
+    def testAllStatic(self):
+        mirror = testing.Mirror()
+        a = np.array([1, 0, 0, 0])
+        c = np.zeros(4)
+        self.compare(4, [{1, 2}], [mirror, mirror], [], a, c)
+    def testAllDynamic(self):
+        a = np.array([1, 0, 0, 0])
+        c = np.zeros(4)
+        self.compare(4, [{1, 2}], [None, None], [testing.SpaceSweep(2), testing.SpaceSweep(2)], a, c)
+    def testNetworkObjects(self):
+        frequencies = np.linspace(500e9, 501e9, 3)
+        mirror = networks.StaticNetwork(testing.Mirror(), dimensions=1)
+        presolve = static.StaticSolver(6, testing.CAVITY_COUPLINGS, [mirror, None, mirror])
+        a = np.array([1, 0, 0, 0, 0, 0])
+        b = presolve([networks.Distance1Network(1, .5)], frequencies)(a, a)
+        arrays = testing.Cavity(networks.Distance1(1, .5, frequencies))
+        e = solver.BatchSolver(6, testing.CAVITY_COUPLINGS)(arrays)(a, a)
+        self.assertTrue(np.allclose(b, e))
+        self.assertRaises(ValueError, static.StaticSolver, 6, testing.CAVITY_COUPLINGS,
+                          [mirror, networks.Distance1Network(1, .5), None])
+    def testColumns(self):
+        presolve = static.StaticSolver(7, testing.CAVITY_COUPLINGS + [{5, 6}],
+                                       [testing.Mirror(), None, testing.Mirror(), np.array([[.1]])])
+        solve = presolve([testing.SpaceSweep(4)])
+        a = np.zeros((7, 2))
+        a[0, 0] = 1
+        c = np.zeros((7, 2))
+        c[2, 1] = .5
+        c[6, 0] = .2
+        b = solve(a, c, columns=True)
+        self.assertEquals(b.shape, (4, 7, 2))
+        for k in xrange(2):
+            self.assertTrue(np.allclose(b[..., k], solve(a[:, k], c[:, k])))
+        stacked = np.array([a, 2 * a, 3 * a, 4 * a])
+        b = solve(stacked, c, columns=True)
+        for k in xrange(2):
+            self.assertTrue(np.allclose(b[..., k], solve(stacked[..., k], c[:, k])))
+    def testReductionReused(self):
+        mirror = testing.Mirror()
+        presolve = static.StaticSolver(4, [{1, 2}], [mirror, None])
+        a = np.array([1, 0, 0, 0])
+        b1 = presolve([testing.SpaceSweep(3)])(a, a)
+        b2 = presolve([testing.SpaceSweep(3)])(a, a)
+        self.assertTrue(np.array_equal(b1, b2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+import solver
+import transfer
+import sw.testing as testing
+
+class TestTransferSolver(unittest.TestCase):
+    def setUp(self):
+        #    0 [mirror] 1  -  2 [space] 3  -  4 [mirror] 5  -  6 [load]
+        randomizer = np.random.RandomState(0)
+        self.mirror = testing.Mirror()
+        space = testing.Space(.8 * np.exp(1j * randomizer.uniform(0, 6, 5)))
+        self.networks = testing.Cavity(space) + [np.array([[.1]])]
+        self.couplings = testing.CAVITY_COUPLINGS + [{5, 6}]
+        self.a = randomizer.normal(size=(5, 7)) + 1j * randomizer.normal(size=(5, 7))
+        self.c = randomizer.normal(size=(5, 7)) + 1j * randomizer.normal(size=(5, 7))
+    def check(self, inputs, outputs):
+        T = transfer.TransferSolver(7, self.couplings, inputs, outputs)(self.networks)
+        self.assertEquals(T.a.shape, (5, len(outputs), len(inputs)))
+        a = np.zeros((5, 7), dtype=complex)
+        c = np.zeros((5, 7), dtype=complex)
+        a[:, inputs] = self.a[:, inputs]
+        c[:, inputs] = self.c[:, inputs]
+        b = solver.BatchSolver(7, self.couplings)(self.networks)(a, c)
+        e = transfer.ApplyTransfer(T, self.a[:, inputs], self.c[:, inputs])
+        self.assertTrue(np.allclose(e, b[:, outputs]))
+    def testOutsideToOutside(self):
+        self.check([0], [0])
+    def testOutsideToInside(self):
+        self.check([0], [3, 6, 2])
+    def testInsideSources(self):
+        self.check([4, 0, 1], [0, 5])
+    def testEverything(self):
+        self.check(range(7), range(7))
+    def testNoInside(self):
+        T = transfer.TransferSolver(2, [], [0, 1], [1])([self.mirror])
+        self.assertTrue(np.allclose(T.a[0], self.mirror[[1]]))
+        self.assertTrue(np.allclose(T.c[0], [[0, 1]]))
+    def testOutOfRange(self):
+        self.assertRaises(ValueError, transfer.TransferSolver, 7, self.couplings, [7], [0])
+
+if __name__ == "__main__":
+    unittest.main()
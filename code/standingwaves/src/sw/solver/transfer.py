@@ -0,0 +1,90 @@
+"""
+.. module:: sw.solver.transfer
+   :platform: Unix, Windows
+   :synopsis: Transfer from a few input ports to a few output ports.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+Most of the time we excite one or two ports and read one or two others.  The
+full b holds every inside port of the bench, for every frequency, only to be
+sliced.  Instead, with R the rows of the outputs,
+
+    b[outputs] = Ta a[inputs] + Tc c[inputs]
+
+and Ta and Tc only need R (I - S1ii.P)^-1, which is found by solving the
+transposed system for as many right-hand sides as there are outputs.
+
+"""
+import collections
+import numpy as np
+import solver
+
+Transfer = collections.namedtuple("Transfer", "a c")
+
+def CheckPorts(ports, n):
+    ports = np.asarray(ports, dtype=int).reshape(-1)
+    if ((ports < 0) | (ports >= n)).any():
+        raise ValueError("Ports outside the [0, %i] range: %r." % (n - 1, ports[(ports < 0) | (ports >= n)]))
+    return ports
+
+def TransferBatch((p, q, no), (S1oo, S1oi, S1io, ISiiP), inputs, outputs):
+    """Transfer operators of solved batch networks, see SolveNetworksBatch.
+
+    Return a Transfer of two (F, len(outputs), len(inputs)) stacks: a for the
+    incoming waves, c for the sources.  Incoming waves only enter through the
+    outside ports, their columns are zero for the inside inputs.
+
+    """
+    nf = S1oo.shape[0]
+    position = np.empty_like(q)
+    position[q] = np.arange(len(q))  # Position of each port in b1.
+    po = position[outputs]
+    pi = position[inputs]
+    outside_out = np.flatnonzero(po < no)
+    inside_out = np.flatnonzero(po >= no)
+    outside_in = np.flatnonzero(pi < no)
+    inside_in = np.flatnonzero(pi >= no)
+    Ta = np.zeros((nf, len(outputs), len(inputs)), dtype=complex)
+    Tc = np.zeros((nf, len(outputs), len(inputs)), dtype=complex)
+    # Direct paths between outside ports: b1o = S1oo a1o + c1o + ...
+    Ta[:, outside_out[:, np.newaxis], outside_in] = \
+        S1oo[:, po[outside_out][:, np.newaxis], pi[outside_in]]
+    Tc[:, outside_out[:, np.newaxis], outside_in] = \
+        outputs[outside_out][:, np.newaxis] == inputs[outside_in]
+    if ISiiP is None:
+        # There is no inside port.
+        return Transfer(Ta, Tc)
+    # The rows that read b1i: S1oi.P for the outside outputs, and identity
+    # rows for the inside ones.
+    m = ISiiP.shape[1]
+    R = np.zeros((nf, len(outputs), m), dtype=complex)
+    R[:, outside_out] = S1oi[:, po[outside_out]][:, :, p]
+    R[:, inside_out, po[inside_out] - no] = 1
+    # W = R (I - S1ii.P)^-1, from the transposed system.
+    W = np.linalg.solve(np.swapaxes(ISiiP, -1, -2), np.swapaxes(R, -1, -2))
+    W = np.swapaxes(W, -1, -2)
+    Ta[:, :, outside_in] += np.matmul(W, S1io[:, :, pi[outside_in]])
+    Tc[:, :, inside_in] += W[:, :, pi[inside_in] - no]
+    return Transfer(Ta, Tc)
+
+def ApplyTransfer(transfer, a, c):
+    """b[outputs] for a[inputs] and c[inputs], each (k,) or (F, k): (F, len(outputs))."""
+    return solver.BatchDot(transfer.a, a) + solver.BatchDot(transfer.c, c)
+
+def TransferSolver(n, couplings, inputs, outputs):
+    """Same as BatchSolver, for the outputs and inputs only.
+
+    inputs, outputs: sequences of port indices.
+
+    The returned function takes the networks, and the frequencies for the
+    Network objects, and returns their Transfer.  See ApplyTransfer.
+
+    """
+    solvedcouplings = solver.CompileCouplings(n, couplings)
+    inputs = CheckPorts(inputs, n)
+    outputs = CheckPorts(outputs, n)
+    def sendNetworks(networks, frequencies=None):
+        networks = solver.EvaluateNetworks(networks, frequencies)
+        solvednetworks = solver.SolveNetworksBatch(solvedcouplings, networks)
+        return TransferBatch(solvedcouplings, solvednetworks, inputs, outputs)
+    return sendNetworks
@@ -0,0 +1,71 @@
+"""
+.. module:: sw.sweep
+   :platform: Unix, Windows
+   :synopsis: Frequency sweeps spread over a pool of processes.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+The frequencies are cut into chunks, each chunk is solved by a worker process,
+and the outputs are put back together in the order of the frequencies.  Every
+frequency goes through exactly the same code whatever the number of processes,
+so the result does not depend on it.
+
+The network factory is sent to the workers, so it must be picklable: a
+function defined at the top level of a module, not a lambda or a closure.
+
+"""
+from __future__ import division
+import multiprocessing
+import numpy as np
+import solver
+
+def Chunks(frequencies, chunksize):
+    """Cut the frequencies in consecutive slices of at most `chunksize`."""
+    return [frequencies[i:i + chunksize] for i in xrange(0, len(frequencies), chunksize)]
+
+def SolveChunk((compiled, couplings, factory, frequencies, a, c, batched)):
+    if batched:
+        networks = factory(frequencies)
+        return solver.BatchSolver(compiled.n, couplings)(networks)(a, c)
+    b = np.zeros((len(frequencies),) + np.shape(a), dtype=complex)
+    for i, frequency in enumerate(frequencies):
+        b[i] = compiled.factor(factory(frequency)).solve(a, c)
+    return b
+
+def Sweep(n, couplings, factory, frequencies, a, c,
+          processes=None, chunksize=None, batched=False):
+    """Solve the bench of n ports coupled by `couplings` at each frequency.
+
+    factory: function of a frequency that returns the list of networks.  With
+        `batched`, it receives the array of frequencies of a chunk and returns
+        stacked networks as for BatchSolver.
+    a, c: the excitations, (n,) or, when not batched, (n, k).
+    processes: size of the pool, None for one process per CPU.  With 1, no
+        pool is created and everything runs in the calling process.
+    chunksize: frequencies per chunk.  By default each process gets about four
+        chunks, which evens out the load without too much overhead.
+
+    Return b, stacked over the frequencies: (F, n) or (F, n, k).
+
+    """
+    frequencies = np.asarray(frequencies)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, int(np.ceil(len(frequencies) / (4 * processes))))
+    # Compiled once here, then pickled to the workers.
+    compiled = solver.CompiledSolver(n, couplings)
+    tasks = [(compiled, couplings, factory, chunk, a, c, batched)
+             for chunk in Chunks(frequencies, chunksize)]
+    if processes == 1:
+        results = map(SolveChunk, tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(SolveChunk, tasks, 1)
+        finally:
+            pool.close()
+            pool.join()
+    if len(results) == 0:
+        return np.zeros((0,) + np.shape(a), dtype=complex)
+    return np.concatenate(results)
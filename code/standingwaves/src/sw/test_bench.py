@@ -0,0 +1,100 @@
+import unittest
+import numpy as np
+import bench
+import networks
+import solver
+import testing
+
+def Cavity():
+    """The bench of testing.Cavity."""
+    cavity = bench.Bench()
+    cavity.add("m1", 2, dimensions=1)
+    cavity.add("space", 2, dimensions=1)
+    cavity.add("m2", 2, dimensions=1)
+    cavity.connect("m1.1", "space.0")
+    cavity.connect("space.1", "m2.0")
+    return cavity
+
+class TestBench(unittest.TestCase):
+    def testPlan(self):
+        plan = Cavity().compile()
+        self.assertEquals(plan.n, 6)
+        self.assertEquals(sorted(map(sorted, plan.couplings)), [[1, 2], [3, 4]])
+        expected = solver.SolveCouplings([{1, 2}, {3, 4}], 6)
+        for a, b in zip(plan.plan[:2], expected[:2]):
+            self.assertTrue(np.array_equal(a, b))
+        self.assertEquals(plan.plan[2], expected[2])
+        self.assertEquals(plan.slices["m2.1"], slice(5, 6))
+        self.assertEquals(plan.slices["space"], slice(2, 4))
+    def testCompiledOnce(self):
+        cavity = Cavity()
+        self.assertTrue(cavity.compile() is cavity.compile())
+        cavity.add("load", 1, dimensions=1)
+        cavity.connect("m2.1", "load.0")
+        self.assertEquals(cavity.compile().n, 7)
+    def testSolve(self):
+        plan = Cavity().compile()
+        space = networks.Distance1(1, .5, 500e9)
+        mirror = testing.Mirror()
+        ordered = bench.Networks(plan, {"m1": mirror, "space": space, "m2": mirror})
+        a = bench.Vector(plan, {"m1.0": [1]})
+        b = solver.Solver(plan.n, plan.couplings)(ordered)(a, np.zeros(plan.n))
+        e = solver.Solver(testing.CAVITY_N, testing.CAVITY_COUPLINGS)(testing.Cavity(space))(a, np.zeros(6))
+        self.assertTrue(np.allclose(b, e))
+        self.assertTrue(np.allclose(b[plan.slices["m2.1"]], e[5]))
+    def test3d(self):
+        setup = bench.Bench()
+        setup.add("source", 1)
+        setup.add("space", 2)
+        setup.connect("source.0", "space.0")
+        plan = setup.compile()
+        self.assertEquals(plan.n, 9)
+        self.assertEquals(sorted(map(sorted, plan.couplings)),
+                          sorted(map(sorted, solver.ExpandCouplingsTo3d([{0, 1}]))))
+        self.assertEquals(plan.slices["space.1"], slice(6, 9))
+    def testVectorStack(self):
+        plan = Cavity().compile()
+        v = bench.Vector(plan, {"m1.0": np.ones((4, 1)), "m2.1": [2]})
+        self.assertEquals(v.shape, (4, 6))
+        self.assertTrue(np.array_equal(v[:, 5], [2, 2, 2, 2]))
+    def testPorts(self):
+        plan = Cavity().compile()
+        self.assertEquals(list(bench.Ports(plan, ["m2.1", "m1"])), [5, 0, 1])
+        self.assertEquals(len(bench.Ports(plan, [])), 0)
+    def testUnknownNetwork(self):
+        cavity = Cavity()
+        cavity.connect("m1.0", "nothing.0")
+        self.assertRaises(ValueError, cavity.compile)
+        self.assertRaises(ValueError, bench.Networks, Cavity().compile(), {"nothing": testing.Mirror()})
+    def testBadNames(self):
+        cavity = Cavity()
+        self.assertRaises(ValueError, cavity.add, "m1", 2)
+        self.assertRaises(ValueError, cavity.add, "a.b", 2)
+        self.assertRaises(ValueError, cavity.connect, "m1", "m2.1")
+    def testMissingPort(self):
+        cavity = Cavity()
+        cavity.connect("m1.0", "m2.2")
+        self.assertRaises(ValueError, cavity.compile)
+    def testConnectedTwice(self):
+        cavity = Cavity()
+        cavity.connect("m1.0", "space.0")
+        self.assertRaises(ValueError, cavity.compile)
+    def testDimensionMismatch(self):
+        cavity = Cavity()
+        cavity.add("film", 4)
+        cavity.connect("m1.0", "film.0")
+        self.assertRaises(ValueError, cavity.compile)
+    def testLarge(self):
+        # A chain of 1000 two-ports.
+        chain = bench.Bench()
+        for i in xrange(1000):
+            chain.add("s%i" % i, 2)
+        for i in xrange(999):
+            chain.connect("s%i.1" % i, "s%i.0" % (i + 1))
+        plan = chain.compile()
+        self.assertEquals(plan.n, 6000)
+        self.assertEquals(plan.plan[2], 6)
+        self.assertTrue(solver.CompileCouplings(plan.n, plan.couplings) is plan.plan)
+
+if __name__ == "__main__":
+    unittest.main()
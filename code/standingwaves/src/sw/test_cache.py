@@ -0,0 +1,78 @@
+import unittest
+import multiprocessing.pool
+import numpy as np
+import cache
+
+class TestLRUCache(unittest.TestCase):
+    def testHitsAndMisses(self):
+        lru = cache.LRUCache(2)
+        self.assertEquals(lru.get("a"), None)
+        lru.put("a", 1)
+        self.assertEquals(lru.get("a"), 1)
+        info = lru.info()
+        self.assertEquals((info.hits, info.misses, info.size), (1, 1, 1))
+    def testEvictsLeastRecentlyUsed(self):
+        lru = cache.LRUCache(2)
+        lru.put("a", 1)
+        lru.put("b", 2)
+        lru.get("a")  # b becomes the least recently used.
+        lru.put("c", 3)
+        self.assertEquals(lru.get("b"), None)
+        self.assertEquals(lru.get("a"), 1)
+        self.assertEquals(lru.get("c"), 3)
+        self.assertEquals(lru.info().evictions, 1)
+        self.assertEquals(len(lru), 2)
+    def testClear(self):
+        lru = cache.LRUCache(1)
+        lru.put("a", 1)
+        lru.put("b", 2)
+        lru.clear()
+        self.assertEquals(lru.info(), cache.CacheInfo(0, 0, 0, 0, 1))
+    def testInvalidSize(self):
+        self.assertRaises(ValueError, cache.LRUCache, 0)
+
+class TestCached(unittest.TestCase):
+    def testKey(self):
+        a = np.array([0., 0., 1.])
+        self.assertEquals(cache.Key("x", a, (1, 2)), cache.Key("x", a.copy(), (1, 2)))
+        self.assertNotEquals(cache.Key(a), cache.Key(a[::-1]))
+        hash(cache.Key(a, [a, 3]))
+    def testComputesOnce(self):
+        lru = cache.LRUCache(4)
+        calls = []
+        def compute():
+            calls.append(1)
+            return np.arange(3)
+        first = cache.Cached(lru, ("k",), compute)
+        second = cache.Cached(lru, ("k",), compute)
+        self.assertTrue(first is second)
+        self.assertEquals(len(calls), 1)
+        self.assertEquals(lru.info().hits, 1)
+    def testFrozen(self):
+        lru = cache.LRUCache(4)
+        value = cache.Cached(lru, ("k",), lambda: (np.zeros(2), 1))
+        self.assertRaises(ValueError, value[0].__setitem__, 0, 1)
+    def testCachedNone(self):
+        lru = cache.LRUCache(4)
+        cache.Cached(lru, ("k",), lambda: None)
+        cache.Cached(lru, ("k",), lambda: None)
+        self.assertEquals(lru.info().hits, 1)
+    def testNoCache(self):
+        self.assertEquals(cache.Cached(None, ("k",), lambda: 3), 3)
+    def testThreads(self):
+        lru = cache.LRUCache(8)
+        def work(i):
+            return cache.Cached(lru, (i % 16,), lambda: i % 16)
+        pool = multiprocessing.pool.ThreadPool(4)
+        try:
+            results = pool.map(work, range(1000))
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEquals(results, [i % 16 for i in range(1000)])
+        info = lru.info()
+        self.assertEquals(info.hits + info.misses, 1000)
+        self.assertTrue(info.size <= 8)
+
+if __name__ == "__main__":
+    unittest.main()
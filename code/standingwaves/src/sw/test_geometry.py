@@ -7,6 +7,7 @@ from __future__ import division
 import itertools
 import unittest
 import random
+import warnings
 import numpy as np
 import geometry as geo
 
@@ -180,7 +181,11 @@ class TestSnell(unittest.TestCase):
         angle_t = geo.Snell(2, 3, 0)
         self.assertEqual(angle_t, 0)
     def testTotalReflection(self):
-        self.assertTrue(np.isnan(geo.Snell(10, 1, geo.TAU / 3)))
+        # Complex angle: Snell's law still holds, and the wave decays.
+        angle_t = geo.Snell(10, 1, geo.TAU / 6)
+        self.assertAlmostEqual(np.sin(angle_t), 10 * np.sin(geo.TAU / 6))
+        self.assertTrue(np.cos(angle_t).imag > 0)
+        self.assertTrue(geo.TotalInternalReflection(10, 1, geo.TAU / 6))
     def testStupidAngle(self):
         # Angle on the wrong side of the surface.
         self.assertTrue(np.isnan(geo.Snell(1, 1, 2 * geo.TAU / 3)))
@@ -251,13 +256,42 @@ class TestFresnelOblique(unittest.TestCase):
         self.assertAlmostEqual(rs, 1)
         self.assertAlmostEqual(ts, 2)
         # Beyond the critical angle theta_c, there is no refraction, everything
-        # is reflected.  We do not support this functionality for now.
+        # is reflected.
         above_c = theta_c * 1.0001
         rp, tp, rs, ts = geo.FresnelOblique(ni, nt, above_c)
-        self.assertTrue(np.isnan(rp))
-        self.assertTrue(np.isnan(tp))
-        self.assertTrue(np.isnan(rs))
-        self.assertTrue(np.isnan(ts))
+        self.assertAlmostEqual(abs(rp), 1)
+        self.assertAlmostEqual(abs(rs), 1)
+        self.assertFalse(np.isnan(tp))
+        self.assertFalse(np.isnan(ts))
+
+class TestSnellBatch(unittest.TestCase):
+    def testMatchesScalar(self):
+        ni = np.array([1, 1.5, 2, 2])
+        nt = np.array([1.5, 1, 1, 1])
+        anglei = np.radians([30, -20, 20, 60])
+        anglet = geo.SnellBatch(ni, nt, anglei)
+        for i in xrange(4):
+            self.assertAlmostEqual(anglet[i], geo.Snell(ni[i], nt[i], anglei[i]))
+    def testRealUnlessNeeded(self):
+        anglet = geo.SnellBatch(1, 1.5, np.radians([0, 30, 60]))
+        self.assertFalse(np.iscomplexobj(anglet))
+        anglet = geo.SnellBatch(2, 1, np.radians([0, 30, 60]))
+        self.assertTrue(np.iscomplexobj(anglet))
+        self.assertTrue(np.array_equal(geo.TotalInternalReflection(2, 1, np.radians([0, 30, 60])),
+                                       [False, False, True]))
+    def testSingleWarning(self):
+        anglei = np.radians([10, 100, 200, -100])
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            anglet = geo.SnellBatch(1, 1, anglei)
+        self.assertEquals(len(caught), 1)
+        self.assertTrue(np.array_equal(np.isnan(anglet), geo.IncidenceOutOfRange(anglei)))
+        self.assertTrue(np.array_equal(np.isnan(anglet), [False, True, True, True]))
+    def testFresnelTotalReflection(self):
+        anglei = np.radians([40, 50, 70])
+        rp, tp, rs, ts = geo.FresnelObliqueBatch(2, 1, anglei)
+        self.assertTrue(np.allclose(np.abs(rp), 1))
+        self.assertTrue(np.allclose(np.abs(rs), 1))
 
 class TestComputeIncidencePlaneNormal(unittest.TestCase):
     def testNoIncidencePlane(self):
@@ -306,6 +340,84 @@ class TestQuaternion(unittest.TestCase):
                 vq = geo.QuatRotate(q, v)  # Quaternion Hamilton product.
                 self.assertTrue(np.allclose(vr, vq))
 
+class TestBatchRotations(unittest.TestCase):
+    def setUp(self):
+        randomizer = np.random.RandomState(0)
+        self.angles = randomizer.uniform(-geo.TAU, geo.TAU, (3, 20))
+        axes = randomizer.normal(size=(20, 3))
+        self.axes = axes / np.linalg.norm(axes, axis=-1)[:, np.newaxis]
+        self.vectors = randomizer.normal(size=(20, 3))
+    def testAxisRotations(self):
+        for axis, rot in enumerate([geo.rotX, geo.rotY, geo.rotZ]):
+            M = geo.AxisRotations(axis, self.angles[0])
+            self.assertEquals(M.shape, (20, 3, 3))
+            for i, angle in enumerate(self.angles[0]):
+                self.assertTrue(np.array_equal(M[i], rot(angle)))
+    def testTaitBryan(self):
+        for H, P, R in itertools.permutations(range(3)):
+            tb = geo.TaitBryan(H, P, R)
+            M = tb.rotBatch(*self.angles)
+            for i, (h, p, r) in enumerate(self.angles.T):
+                self.assertTrue(np.array_equal(M[i], tb.rot(h, p, r)))
+    def testTaitBryanBroadcast(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        M = tb.rotBatch(self.angles[0], 0, .5)
+        self.assertTrue(np.array_equal(M[3], tb.rot(self.angles[0, 3], 0, .5)))
+    def testQuaternions(self):
+        quats = geo.RotationAroundAxisQuaternions(self.axes, self.angles[0])
+        self.assertEquals(quats.shape, (20, 4))
+        M = geo.RotationMatricesFromQuaternions(quats)
+        rotated = geo.QuatRotateBatch(quats, self.vectors)
+        products = geo.QuatMultBatch(quats, quats[::-1])
+        for i in xrange(20):
+            q = geo.RotationAroundAxisQuaternion(self.axes[i], self.angles[0, i])
+            self.assertTrue(np.array_equal(quats[i], q))
+            self.assertTrue(np.array_equal(M[i], geo.RotationMatrixFromQuaternion(q)))
+            self.assertTrue(np.array_equal(rotated[i], geo.QuatRotate(q, self.vectors[i])))
+            self.assertTrue(np.array_equal(products[i], geo.QuatMult(q, quats[19 - i])))
+            self.assertTrue(np.allclose(rotated[i], M[i].dot(self.vectors[i])))
+
+class TestRotationCache(unittest.TestCase):
+    def setUp(self):
+        self.lru = geo.EnableRotationCache(2)
+    def tearDown(self):
+        geo.DisableRotationCache()
+    def testHits(self):
+        tb = geo.TaitBryan(0, 1, 2)
+        A = tb.rot(.1, .2, .3)
+        B = tb.rot(.1, .2, .3)
+        self.assertTrue(A is B)
+        self.assertTrue(np.array_equal(A, tb.rotBatch(.1, .2, .3)))
+        self.assertFalse(A.flags.writeable)
+        self.assertEquals(self.lru.info().hits, 1)
+    def testConvention(self):
+        # Same attitude, other convention: another entry.
+        geo.TaitBryan(0, 1, 2).rot(.1, .2, .3)
+        A = geo.TaitBryan(2, 1, 0).rot(.1, .2, .3)
+        self.assertTrue(np.array_equal(A, geo.TaitBryan(2, 1, 0).rotBatch(.1, .2, .3)))
+        geo.TaitBryan(1, 0, 2).rot(.1, .2, .3)
+        info = self.lru.info()
+        self.assertEquals((info.hits, info.misses, info.evictions), (0, 3, 1))
+
+class TestTransverseFrames(unittest.TestCase):
+    def testOrthonormal(self):
+        k = np.random.RandomState(0).normal(size=(20, 3))
+        k[0] = [0, 0, 1]
+        k[1] = [0, -1, 0]
+        E = geo.TransverseFrames(k)
+        self.assertEquals(E.shape, (20, 3, 2))
+        k /= np.linalg.norm(k, axis=-1)[:, np.newaxis]
+        for Ei, ki in zip(E, k):
+            self.assertTrue(np.allclose(Ei.T.dot(Ei), np.identity(2)))
+            self.assertTrue(np.allclose(ki.dot(Ei), 0))
+            self.assertTrue(np.allclose(np.cross(Ei[:, 0], Ei[:, 1]), ki))
+    def testOpposite(self):
+        k = np.array([.3, -.4, .5])
+        E = geo.TransverseFrames(k)
+        F = geo.TransverseFrames(-k)
+        self.assertTrue(np.allclose(E[:, 0], -F[:, 0]))
+        self.assertTrue(np.allclose(E[:, 1], F[:, 1]))
+
 class TestComputeSignedAngleBetween(unittest.TestCase):
     def testHealthy(self):
         u = np.array([0, 0, 1])
@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+import sweep
+import networks
+import solver
+import testing
+
+N = testing.CAVITY_N
+COUPLINGS = testing.CAVITY_COUPLINGS
+
+def Cavity(frequency):
+    """Factory of the sweeps, at a frequency or at an array of them."""
+    return testing.Cavity(networks.Distance1(1, .5, frequency))
+
+class TestChunks(unittest.TestCase):
+    def testSane(self):
+        chunks = sweep.Chunks(np.arange(5), 2)
+        self.assertEquals([list(chunk) for chunk in chunks], [[0, 1], [2, 3], [4]])
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.frequencies = np.linspace(500e9, 501e9, 11)
+        self.a = np.array([1, 0, 0, 0, 0, 0])
+        self.c = np.zeros(N)
+    def testSerial(self):
+        b = sweep.Sweep(N, COUPLINGS, Cavity, self.frequencies, self.a, self.c, processes=1)
+        self.assertEquals(b.shape, (11, N))
+        presolve = solver.Solver(N, COUPLINGS)
+        for i, frequency in enumerate(self.frequencies):
+            e = presolve(Cavity(frequency))(self.a, self.c)
+            self.assertTrue(np.array_equal(b[i], e))
+    def testParallelIdentical(self):
+        serial = sweep.Sweep(N, COUPLINGS, Cavity, self.frequencies, self.a, self.c, processes=1)
+        parallel = sweep.Sweep(N, COUPLINGS, Cavity, self.frequencies, self.a, self.c,
+                               processes=2, chunksize=3)
+        self.assertTrue(np.array_equal(serial, parallel))
+    def testBatched(self):
+        serial = sweep.Sweep(N, COUPLINGS, Cavity, self.frequencies, self.a, self.c, processes=1)
+        batched = sweep.Sweep(N, COUPLINGS, Cavity, self.frequencies, self.a, self.c,
+                              processes=2, chunksize=4, batched=True)
+        self.assertTrue(np.allclose(serial, batched))
+    def testSeveralExcitations(self):
+        a = np.zeros((N, 2))
+        a[0, 0] = a[5, 1] = 1
+        c = np.zeros((N, 2))
+        b = sweep.Sweep(N, COUPLINGS, Cavity, self.frequencies, a, c, processes=1)
+        self.assertEquals(b.shape, (11, N, 2))
+    def testNoFrequency(self):
+        b = sweep.Sweep(N, COUPLINGS, Cavity, [], self.a, self.c, processes=1)
+        self.assertEquals(b.shape, (0, N))
+
+if __name__ == "__main__":
+    unittest.main()
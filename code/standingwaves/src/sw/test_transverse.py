@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+import geometry as geo
+import networks
+import solver
+import transverse
+
+#         LO                     5
+# [source]0 --- 1[space]2 --- 3[film]4 --- 7[space]8 --- 9[receiver]10
+#                                6
+PORTS = 11
+COUPLINGS = [{0, 1}, {2, 3}, {4, 7}, {8, 9}]
+TB = geo.TaitBryan(0, 1, 2)
+ATT = (-geo.TAU / 8, 0, 0)
+K1 = np.array([0, 0, 1.])
+
+def BeamSplitter():
+    film = networks.ThinFilmObliqueNetwork(1, 1.83 + .018j, 10e-6, TB, ATT, K1)
+    bench = [networks.MirrorNormal(-np.sqrt(.1)),
+             networks.DistanceNetwork(1, .1),
+             film,
+             networks.DistanceNetwork(1, .2),
+             networks.SemiTransparentMirrorNormal(-np.sqrt(.1), np.sqrt(.9))]
+    return bench, transverse.Directions(bench), transverse.InlinePairs(bench)
+
+class TestPortFrames(unittest.TestCase):
+    def testInline(self):
+        self.assertEquals(BeamSplitter()[2], [(1, 2), (7, 8), (9, 10)])
+    def testShared(self):
+        _, directions, inline = BeamSplitter()
+        frames = transverse.PortFrames(PORTS, COUPLINGS, directions, inline)
+        for a, b in COUPLINGS + inline:
+            self.assertTrue(np.array_equal(frames[a], frames[b]))
+        # Ports 0 to 2 take the direction of port 3 of the film, 7 to 10 that of port 4.
+        self.assertTrue(np.allclose(K1.dot(frames[0]), 0))
+        self.assertTrue(np.allclose(directions[4].dot(frames[10]), 0))
+    def testMissing(self):
+        _, directions, _ = BeamSplitter()
+        with self.assertRaises(ValueError):
+            transverse.PortFrames(PORTS, COUPLINGS, directions)
+    def testSkew(self):
+        _, directions, inline = BeamSplitter()
+        directions[8] = K1
+        with self.assertRaises(ValueError):
+            transverse.PortFrames(PORTS, COUPLINGS, directions, inline)
+
+class TestProject(unittest.TestCase):
+    def testRoundTrip(self):
+        frames = geo.TransverseFrames(np.random.RandomState(0).normal(size=(4, 3)))
+        v2 = np.random.RandomState(1).normal(size=(8, 3))
+        self.assertTrue(np.allclose(transverse.Drop(transverse.Lift(v2, frames), frames), v2))
+        self.assertEquals(transverse.Lift(v2[:, 0], frames).shape, (12,))
+    def testStacked(self):
+        frames = geo.TransverseFrames(np.random.RandomState(0).normal(size=(2, 3)))
+        # A random S on the frames, lifted to 3D.
+        expected = np.random.RandomState(1).normal(size=(5, 4, 4))
+        E = np.zeros((6, 4))
+        E[:3, :2], E[3:, 2:] = frames
+        S = np.matmul(np.matmul(E, expected), E.T)
+        S2 = transverse.Project(S, frames)
+        self.assertEquals(S2.shape, (5, 4, 4))
+        self.assertTrue(np.allclose(S2, expected))
+        self.assertTrue(np.allclose(S2[3], transverse.Project(S[3], frames)))
+    def testLost(self):
+        # A distance keeps the line, its port 1 cannot propagate along x.
+        frames = geo.TransverseFrames(np.array([K1, [1, 0, 0]]))
+        with self.assertRaises(ValueError):
+            transverse.Project(networks.Distance(1, .1, 500e9), frames)
+
+class TestTransverseSolver(unittest.TestCase):
+    def testSameAs3d(self):
+        bench, directions, inline = BeamSplitter()
+        a = np.zeros((3 * PORTS, 2), dtype=complex)
+        a[15:18, 1] = np.cross(K1, directions[5])
+        c = np.zeros((3 * PORTS, 2), dtype=complex)
+        c[0:3, 0] = [1, 1, 0]
+        c[30:33, 1] = [.5j, 0, 0]
+        compiled = solver.CompiledSolver(3 * PORTS, solver.ExpandCouplingsTo3d(COUPLINGS))
+        presolve = transverse.TransverseSolver(PORTS, COUPLINGS, directions, inline)
+        for frequency in (499e9, 500e9):
+            expected = compiled.factor(bench, frequency).solve(a, c)
+            b = presolve(bench, frequency)(a, c)
+            self.assertEquals(b.shape, (3 * PORTS, 2))
+            # The reflection on the film leaves along -y, with some field along z.
+            self.assertTrue(abs(expected[14, 0]) > .05)
+            self.assertTrue(np.allclose(b, expected))
+    def testWrongDefault(self):
+        # Without the inline pairs, ports 7 to 10 would take the default
+        # direction, but the film reflects along -y.
+        bench, directions, _ = BeamSplitter()
+        presolve = transverse.TransverseSolver(PORTS, COUPLINGS, directions, default=K1)
+        with self.assertRaises(ValueError):
+            presolve(bench, 500e9)
+
+if __name__ == "__main__":
+    unittest.main()
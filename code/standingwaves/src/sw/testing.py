@@ -0,0 +1,54 @@
+"""
+.. module:: sw.testing
+   :platform: Unix, Windows
+   :synopsis: Small benches shared by the tests.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+Most tests solve the same cavity of scalar ports:
+
+    0 [mirror] 1  -  2 [space] 3  -  4 [mirror] 5
+
+"""
+import numpy as np
+
+CAVITY_N = 6
+CAVITY_COUPLINGS = [{1, 2}, {3, 4}]
+
+def Mirror(r=.3, t=.9):
+    """Two-port mirror, -r on the side of port 0."""
+    return np.array([[-r, t],
+                     [t, r]])
+
+def LosslessMirror(r):
+    """Mirror with t = sqrt(1 - r^2)."""
+    return Mirror(r, np.sqrt(1 - r ** 2))
+
+def Space(gains):
+    """Two-port free space: (2, 2) for a scalar gain, (F, 2, 2) for an array."""
+    gains = np.asarray(gains)
+    space = np.zeros(gains.shape + (2, 2), dtype=complex)
+    space[..., 0, 1] = gains
+    space[..., 1, 0] = gains
+    return space
+
+def SpaceSweep(nf):
+    """Lossless space over nf frequencies, the phase going from 0 to 3."""
+    return Space(np.exp(1j * np.linspace(0, 3, nf)))
+
+def Cavity(space, mirror=None):
+    """Networks of the cavity, for the space of a frequency or of a sweep."""
+    if mirror is None:
+        mirror = Mirror()
+    return [mirror, space, mirror]
+
+def Chain(gains, r=.3):
+    """Two-ports [[r, g], [g, -r]], one per gain, chained: 0 [0] 1 - 2 [1] 3 - ...
+
+    Return n, couplings, networks.
+
+    """
+    networks = [np.array([[r, g],
+                          [g, -r]]) for g in gains]
+    couplings = [{2 * i + 1, 2 * i + 2} for i in xrange(len(networks) - 1)]
+    return 2 * len(networks), couplings, networks
@@ -0,0 +1,208 @@
+"""
+.. module:: sw.transverse
+   :platform: Unix, Windows
+   :synopsis: Solve on the two transverse components of each port.
+
+.. moduleauthor:: Bertrand Delforge <b.delforge@sron.nl>
+
+The networks carry three field components per port, but the waves are
+transverse: in the frame of the port, the component along the direction of
+propagation is always zero.  Describe each port by two components instead, on
+a frame (u, v) orthogonal to its direction, and the bench has 2n ports instead
+of 3n: the factorization is 3.4 times cheaper and takes 2.25 times less
+memory.
+
+The networks are still built in 3D, then projected on the frames:
+
+    S2 = E.T S E
+
+with E the block diagonal of the frames of the ports of the network.  This is
+exact for transverse inputs, for which the networks give transverse outputs.
+Two coupled ports exchange the same components, so they share a frame.  So do
+the two ports of a two-port without directions, such as Distance: it keeps the
+line of propagation.  Project checks that no wave leaves the frames.
+
+"""
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+import geometry as geo
+import networks
+import solver
+
+# Largest sine of the angle between the directions of two joined ports.
+COLLINEAR_TOLERANCE = 1e-9
+
+# Largest part of S.E, relative to its norm, allowed outside of the frames.
+TRANSVERSE_TOLERANCE = 1e-9
+
+def Directions(networklist):
+    """Direction of propagation of each port of the networks, or None.
+
+    The Network objects that define directions give them, the other networks
+    give None for each of their ports.
+
+    """
+    directions = []
+    for network in networklist:
+        if isinstance(network, networks.Network):
+            if network.directions is not None:
+                directions.extend(network.directions)
+            else:
+                directions.extend([None] * network.ports)
+        else:
+            directions.extend([None] * (np.shape(network)[-1] // 3))
+    return directions
+
+def InlinePairs(networklist):
+    """Pairs of ports of the two-ports without directions, such as Distance.
+
+    Such a two-port is taken to keep the line of propagation: the wave that
+    enters its port 0 along k leaves its port 1 along k, so port 1 lies on the
+    same line, its direction being -k.  Project checks it.
+
+    """
+    pairs = []
+    offset = 0
+    for network in networklist:
+        if isinstance(network, networks.Network):
+            ports = network.ports
+            known = network.directions is not None
+        else:
+            ports = np.shape(network)[-1] // 3
+            known = False
+        if ports == 2 and not known:
+            pairs.append((offset, offset + 1))
+        offset += ports
+    return pairs
+
+def PortFrames(ports, couplings, directions, inline=(), default=None):
+    """Frames (ports, 3, 2) of the transverse components of each port.
+
+    couplings: pairs of ports, as for ExpandCouplingsTo3d.
+    directions: direction of propagation of each port, None when unknown, see
+        Directions.
+    inline: pairs of ports of the same network on the same line, see
+        InlinePairs.
+
+    The couplings and the inline pairs join the ports into lines of
+    propagation.  Every port of a line gets the same frame, made from a known
+    direction of the line.  The lines without any known direction take
+    `default`, or ValueError is raised when it is None.
+
+    """
+    if len(directions) != ports:
+        raise ValueError("Expected %i directions, got %i." % (ports, len(directions)))
+    known = np.flatnonzero([d is not None for d in directions])
+    k = np.full((ports, 3), np.nan)
+    if len(known):
+        k[known] = [directions[i] for i in known]
+    pairs = np.array([sorted(coupling) for coupling in couplings] + list(inline),
+                     dtype=int).reshape(-1, 2)
+    graph = scipy.sparse.coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])),
+                                    shape=(ports, ports))
+    count, line = scipy.sparse.csgraph.connected_components(graph, directed=False)
+    # The first known direction of each line is its reference.
+    lines, first = np.unique(line[known], return_index=True)
+    reference = np.full((count, 3), np.nan)
+    reference[lines] = k[known[first]]
+    kr = reference[line[known]]
+    sines = np.linalg.norm(np.cross(k[known], kr), axis=-1) / \
+        (np.linalg.norm(k[known], axis=-1) * np.linalg.norm(kr, axis=-1))
+    skew = np.flatnonzero(sines > COLLINEAR_TOLERANCE)
+    if len(skew):
+        i = known[skew[0]]
+        j = known[first[np.searchsorted(lines, line[i])]]
+        raise ValueError("Ports %i and %i are joined but propagate along different lines." % (j, i))
+    k = reference[line]
+    missing = np.isnan(k).any(axis=-1)
+    if missing.any():
+        if default is None:
+            raise ValueError("No direction for ports %r." % np.flatnonzero(missing).tolist())
+        k[missing] = default
+    return geo.TransverseFrames(k)
+
+def Project(S, frames):
+    """(..., 3p, 3p) scattering matrix of p ports to (..., 2p, 2p).
+
+    Raise ValueError when the outputs for the transverse inputs are not
+    transverse to the frames of the output ports: the projection would lose
+    them.
+
+    """
+    p = len(frames)
+    shape = np.shape(S)[:-2]
+    S = np.reshape(S, shape + (p, 3, p, 3))
+    SE = np.einsum('...iajb,jbl->...iajl', S, frames)
+    S2 = np.einsum('iak,...iajl->...ikjl', frames, SE)
+    lost = SE - np.einsum('iak,...ikjl->...iajl', frames, S2)
+    if np.linalg.norm(lost) > TRANSVERSE_TOLERANCE * np.linalg.norm(SE):
+        raise ValueError("The network sends waves out of the frames of its ports, "
+                         "check the directions of propagation.")
+    return S2.reshape(shape + (2 * p, 2 * p))
+
+def ProjectNetwork(network, frames):
+    """Project a matrix, or wrap a Network to project its S on evaluation."""
+    if isinstance(network, networks.Network):
+        return networks.Network(lambda frequency: Project(network.S(frequency), frames),
+                                2 * network.ports, network.ports,
+                                network.directions, network.dynamic)
+    return Project(network, frames)
+
+def ProjectNetworks(networklist, frames):
+    """Project each network on the frames of its own ports.
+
+    The frames are those of all the ports of the bench, in order.  Stacked
+    networks stay stacked, so the result also goes to BatchSolver.
+
+    """
+    projected = []
+    offset = 0
+    for network in networklist:
+        if isinstance(network, networks.Network):
+            ports = network.ports
+        else:
+            ports = np.shape(network)[-1] // 3
+        projected.append(ProjectNetwork(network, frames[offset:offset + ports]))
+        offset += ports
+    if offset != len(frames):
+        raise ValueError("The networks have %i ports, there are %i frames." % (offset, len(frames)))
+    return projected
+
+def Drop(v, frames):
+    """Transverse components (2p, ...) of a 3D vector, or stack of, (3p, ...)."""
+    v = np.asarray(v)
+    p = len(frames)
+    v2 = np.einsum('iak,ia...->ik...', frames, v.reshape((p, 3) + v.shape[1:]))
+    return v2.reshape((2 * p,) + v.shape[1:])
+
+def Lift(v2, frames):
+    """3D vector (3p, ...) of the transverse components (2p, ...)."""
+    v2 = np.asarray(v2)
+    p = len(frames)
+    v = np.einsum('iak,ik...->ia...', frames, v2.reshape((p, 2) + v2.shape[1:]))
+    return v.reshape((3 * p,) + v2.shape[1:])
+
+def TransverseSolver(ports, couplings, directions, inline=(), default=None,
+                     sparse=None, symmetric=None):
+    """Same as Solver, but the system is solved on the transverse components.
+
+    ports: number of ports of the bench, 3 components each.
+    couplings: pairs of ports, as for ExpandCouplingsTo3d.
+    directions, inline, default: see PortFrames.
+
+    The returned function takes the 3D networks, and the frequency for the
+    Network objects.  It returns the solve function, which takes and returns 3D
+    vectors, (3 ports,) or (3 ports, k).  Their longitudinal components are
+    dropped.
+
+    """
+    frames = PortFrames(ports, couplings, directions, inline, default)
+    compiled = solver.CompiledSolver(2 * ports, solver.ExpandCouplingsTo2d(couplings),
+                                     sparse, symmetric)
+    def sendNetworks(networklist, frequency=None):
+        solve = compiled.copy().factor(ProjectNetworks(networklist, frames), frequency).solve
+        def solve3d(a, c):
+            return Lift(solve(Drop(a, frames), Drop(c, frames)), frames)
+        return solve3d
+    return sendNetworks